@@ -0,0 +1,128 @@
+"""
+In-memory, precompressed static assets.
+
+Assets are read once at startup, compressed with gzip (and brotli when
+the ``brotli`` package is installed) and served from memory with
+content negotiation and ETags. Each static file is also available under
+a fingerprinted name (``unit-converter.<hash>.js``) that is cached as
+immutable.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(APP_DIR, "static")
+TEMPLATE_DIR = os.path.join(APP_DIR, "templates")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+STATIC_CACHE = "public, max-age=3600"
+
+
+class Asset:
+    """A file held in memory together with its compressed variants"""
+
+    def __init__(self, body: bytes, content_type: str):
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        self.variants = {"identity": body}
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gz) < len(body):
+            self.variants["gzip"] = gz
+        if brotli is not None:
+            br = brotli.compress(body, quality=11)
+            if len(br) < len(body):
+                self.variants["br"] = br
+
+    def etag(self, encoding: str) -> str:
+        if encoding == "identity":
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        """Build a response using the best encoding the client accepts"""
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), self.variants)
+        etag = self.etag(encoding)
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=self.variants[encoding], media_type=self.content_type, headers=headers)
+
+
+def negotiate_encoding(accept_encoding: str, available) -> str:
+    """Pick br, then gzip, then identity from an Accept-Encoding header"""
+    accepted = set()
+    refused = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    refused.add(name)
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name)
+    for encoding in ("br", "gzip"):
+        if encoding in available and encoding not in refused and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+def fingerprint(name: str, digest: str) -> str:
+    """Insert a content digest before the file extension"""
+    root, ext = os.path.splitext(name)
+    return f"{root}.{digest}{ext}"
+
+
+class AssetStore:
+    """Static files and the index page, loaded once"""
+
+    def __init__(self, static_dir: str = STATIC_DIR, template_dir: str = TEMPLATE_DIR):
+        self.static: Dict[str, Asset] = {}
+        self.immutable: Dict[str, Asset] = {}
+        self.urls: Dict[str, str] = {}
+        for name in sorted(os.listdir(static_dir)):
+            path = os.path.join(static_dir, name)
+            if not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                asset = Asset(f.read(), content_type)
+            self.static[name] = asset
+            hashed = fingerprint(name, asset.digest)
+            self.immutable[hashed] = asset
+            self.urls[name] = f"/static/{hashed}"
+
+        with open(os.path.join(template_dir, "index.html"), "r", encoding="utf-8") as f:
+            html = f.read()
+        for name, url in self.urls.items():
+            html = html.replace(f'src="{name}"', f'src="{url}"')
+        self.index = Asset(html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def static_response(self, request: Request, name: str) -> Optional[Response]:
+        """Serve a static file, or None if it does not exist"""
+        if name in self.immutable:
+            return self.immutable[name].response(request, IMMUTABLE_CACHE)
+        if name in self.static:
+            return self.static[name].response(request, STATIC_CACHE)
+        return None
+
+    def index_response(self, request: Request) -> Response:
+        return self.index.response(request, REVALIDATE_CACHE)
@@ -0,0 +1,262 @@
+"""
+Concurrency limits, load shedding and time budgets.
+
+Each limited endpoint (a path prefix, longest match wins) runs at most
+``concurrency`` requests at once and queues at most ``queue`` more. When
+the queue is full, ``LoadSheddingMiddleware`` answers 429 at once; a
+request that cannot finish within the endpoint's time budget, counted
+from its arrival, gets 503. Both carry a Retry-After estimated from the
+recent service time. A request over its budget is cancelled; work
+running in a worker thread stops at its next ``current_deadline().check()``
+and keeps its slot until then, so overload does not pile up threads.
+
+Limits are set with ``UNIUNIT_LIMITS``, comma-separated
+``prefix:concurrency:queue:budget_seconds`` entries that replace the
+defaults for those prefixes (``UNIUNIT_LIMITS=off`` disables shedding).
+``GET /api/limits`` reports the limits and counters.
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+DEFAULT_LIMITS = {
+    "/api/unit-system": (8, 32, 2.0),
+    "/api/quick-convert": (16, 64, 2.0),
+    "/api/convert/bulk": (4, 8, 10.0),
+    "/api/compatibility": (4, 16, 5.0),
+    "/api/": (64, 256, 5.0),
+}
+
+
+class BudgetExceeded(Exception):
+    """Raised by Deadline.check() once the request's time budget is spent"""
+
+
+class Deadline:
+    """Time budget of the current request"""
+
+    __slots__ = ("at",)
+
+    def __init__(self, at: float):
+        self.at = at
+
+    def remaining(self) -> float:
+        return self.at - time.monotonic()
+
+    def check(self) -> None:
+        """Stop the current work if the budget is spent"""
+        if time.monotonic() > self.at:
+            raise BudgetExceeded("Request exceeded its time budget")
+
+
+class _NoDeadline:
+    """Stand-in used outside limited endpoints"""
+
+    __slots__ = ()
+
+    def remaining(self) -> float:
+        return math.inf
+
+    def check(self) -> None:
+        pass
+
+
+NO_DEADLINE = _NoDeadline()
+_deadline = ContextVar("request_deadline", default=NO_DEADLINE)
+
+
+def current_deadline():
+    """The Deadline of the current request, or a no-op outside limited endpoints"""
+    return _deadline.get()
+
+
+class EndpointLimiter:
+    """Concurrency slots, queue and counters of one endpoint"""
+
+    def __init__(self, prefix: str, concurrency: int, queue: int, budget: float):
+        if concurrency < 1 or queue < 0 or budget <= 0:
+            raise ValueError(f"Invalid limits for {prefix}: {concurrency}:{queue}:{budget}")
+        self.prefix = prefix
+        self.concurrency = concurrency
+        self.queue = queue
+        self.budget = budget
+        self.active = 0
+        self.rejected = 0
+        self.expired = 0
+        self.service_time = min(budget, 0.05)
+        self._waiters = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the recent service time"""
+        return max(1, math.ceil(self.service_time * (self.waiting + 1) / self.concurrency))
+
+    def saturated(self) -> bool:
+        return self.active >= self.concurrency or bool(self._waiters)
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, queueing for up to `timeout` seconds if none is free"""
+        if not self.saturated():
+            self.active += 1
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # A released slot is handed over directly to the first waiter
+            await asyncio.wait_for(waiter, max(timeout, 0))
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, elapsed: float) -> None:
+        self.service_time += 0.2 * (elapsed - self.service_time)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def summary(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "budget": self.budget,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "service_time_ms": round(self.service_time * 1000, 3),
+        }
+
+
+def parse_limits(value: str) -> Dict[str, tuple]:
+    """Parse UNIUNIT_LIMITS entries into {prefix: (concurrency, queue, budget)}"""
+    limits = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        prefix, concurrency, queue, budget = entry.rsplit(":", 3)
+        limits[prefix] = (int(concurrency), int(queue), float(budget))
+    return limits
+
+
+class LimitSettings:
+    """Endpoint limiters, configured from UNIUNIT_LIMITS"""
+
+    def __init__(self):
+        value = os.environ.get("UNIUNIT_LIMITS", "").strip()
+        self.enabled = value.lower() not in ("off", "0")
+        limits = dict(DEFAULT_LIMITS)
+        if self.enabled and value:
+            limits.update(parse_limits(value))
+        self.configure(limits)
+
+    def configure(self, limits: Dict[str, tuple]) -> None:
+        """Replace every limiter; prefixes are matched longest first"""
+        self.limiters = [EndpointLimiter(prefix, *limits[prefix])
+                         for prefix in sorted(limits, key=len, reverse=True)]
+
+    def match(self, path: str) -> Optional[EndpointLimiter]:
+        for limiter in self.limiters:
+            if path.startswith(limiter.prefix):
+                return limiter
+        return None
+
+    def summary(self) -> dict:
+        return {"enabled": self.enabled,
+                "endpoints": {limiter.prefix: limiter.summary() for limiter in self.limiters}}
+
+
+settings = LimitSettings()
+
+
+async def _reject(send, status: int, detail: str, retry_after: int) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(retry_after).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class LoadSheddingMiddleware:
+    """ASGI middleware enforcing concurrency limits, queue depths and time budgets"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope["type"] == "http" and settings.enabled:
+            limiter = settings.match(scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.monotonic()
+        deadline = arrived + limiter.budget
+        if limiter.saturated() and limiter.waiting >= limiter.queue:
+            limiter.rejected += 1
+            await _reject(send, 429, "Too many requests queued for this endpoint", limiter.retry_after())
+            return
+        if not await limiter.acquire(deadline - time.monotonic()):
+            limiter.expired += 1
+            await _reject(send, 503, "Server busy: request could not start within its time budget",
+                          limiter.retry_after())
+            return
+
+        started = time.monotonic()
+        state = {"started": False, "timed_out": False}
+
+        async def guarded_send(message):
+            if state["timed_out"]:
+                return
+            if message["type"] == "http.response.start":
+                state["started"] = True
+            await send(message)
+
+        def finished(task):
+            # The slot is held until the work really stops, even after a 503
+            limiter.release(time.monotonic() - started)
+            if not task.cancelled():
+                task.exception()
+
+        token = _deadline.set(Deadline(deadline))
+        try:
+            task = asyncio.ensure_future(self.app(scope, receive, guarded_send))
+        finally:
+            _deadline.reset(token)
+        task.add_done_callback(finished)
+        done, _ = await asyncio.wait({task}, timeout=max(deadline - time.monotonic(), 0))
+        if task in done:
+            try:
+                task.result()
+                return
+            except BudgetExceeded:
+                pass  # the handler noticed the deadline before the wait did
+        else:
+            task.cancel()
+
+        state["timed_out"] = True
+        limiter.expired += 1
+        if not state["started"]:
+            await _reject(send, 503, "Request exceeded its time budget", limiter.retry_after())
@@ -1,24 +1,80 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from app.warmup import logger, profile, warm_up
+
+with profile.stage("import fastapi"):
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+import asyncio
 import os
 
+from app.assets import AssetStore
+from app.limits import LoadSheddingMiddleware
+from app.timing import ServerTimingMiddleware
+
+
+def run_warm_up():
+    """Warm caches (unless UNIUNIT_WARMUP=0) and mark the app ready"""
+    try:
+        if os.environ.get("UNIUNIT_WARMUP", "1") != "0":
+            warm_up(tasks={
+                "search index": get_unit_index,
+                "unit catalogue": get_unit_catalogue,
+                "conversion table": _conversion_table_payload,
+            })
+    except Exception:
+        logger.exception("uniUnit warm-up failed, caches will be built on demand")
+    profile.mark_ready()
+    summary = profile.summary()
+    logger.info("uniUnit ready after %.1f ms: %s", summary["ready_after_ms"], summary["stages_ms"])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background: requests are served meanwhile (building
+    # caches on demand) and /health answers 503 until it is done
+    warming = asyncio.create_task(run_in_threadpool(run_warm_up))
+    yield
+    await warming
+
+
 app = FastAPI(
     title="uniUnit Web",
     description="Unit Conversion Web Application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(LoadSheddingMiddleware)
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+with profile.stage("load assets"):
+    assets = AssetStore()
 
-from app.routes import router
+with profile.stage("import routes"):
+    from app.routes import router, get_unit_index, get_unit_catalogue, _conversion_table_payload, conversion_table_url
 app.include_router(router)
 
-@app.get("/", response_class=HTMLResponse)
-async def read_root():
-    with open("app/templates/index.html", "r", encoding="utf-8") as f:
-        return f.read()
+@app.get("/static/{name}", include_in_schema=False)
+async def read_static(name: str, request: Request):
+    response = assets.static_response(request, name)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return response
+
+@app.get("/", include_in_schema=False)
+async def read_root(request: Request):
+    return assets.index_response(request)
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "message": "uniUnit API is running"}
+    if not profile.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "starting", "message": "uniUnit API is warming up", "startup": profile.summary()}
+        )
+    return {
+        "status": "ok",
+        "message": "uniUnit API is running",
+        "startup": profile.summary(),
+        "conversion_table": await run_in_threadpool(conversion_table_url),
+    }
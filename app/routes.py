@@ -1,13 +1,36 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
+from functools import lru_cache
 from typing import Dict, List, Optional, Union
+import hmac
+import json
+import struct
 import sys
 import os
 
+import numpy as np
+
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from uniunit import uniUnit, UnitSystem, ureg, unit, CHINESE_UNITS
-from uniunit.uniunit import convert_value, get_unit_info, quick_convert
+from uniunit.uniunit import (
+    RegistryOverlay,
+    convert_value,
+    get_unit_info,
+    quick_convert,
+    check_unit_compatibility_matrix,
+    build_conversion_table,
+    get_unit_index,
+    parse_quantity,
+    compile_conversion,
+    best_unit,
+    get_unit_catalogue,
+)
+
+from app.assets import Asset, IMMUTABLE_CACHE
+from app.limits import BudgetExceeded, current_deadline, settings as limit_settings
+from app.timing import current_timing, settings as timing_settings
 
 router = APIRouter()
 
@@ -16,17 +39,31 @@ class ConversionRequest(BaseModel):
     value: float = Field(..., description="Numeric value to convert")
     from_unit: str = Field(..., description="Source unit")
     to_unit: str = Field(..., description="Target unit")
+    custom_units: Optional[Dict[str, str]] = Field(
+        None, description="Custom units for this request (e.g., {'Long': '1000 * km'})"
+    )
 
 
 class UnitSystemRequest(BaseModel):
     value: Union[str, float] = Field(..., description="Value with units (e.g., '100 kg') or just number")
     units: Dict[str, str] = Field(..., description="Unit mapping dictionary")
+    readable: bool = Field(False, description="Express the result in the most readable unit and prefix")
 
 
 class QuickConvertRequest(BaseModel):
     value: Union[float, str] = Field(..., description="Value with units")
     from_system: str = Field(..., description="Source system name")
     to_system: str = Field(..., description="Target system name")
+    readable: bool = Field(False, description="Express the result in the most readable unit and prefix")
+
+
+class ServerTimingRequest(BaseModel):
+    enabled: bool = Field(..., description="Emit Server-Timing headers")
+
+
+class CompatibilityRequest(BaseModel):
+    units: List[str] = Field(..., description="Candidate units to check")
+    references: List[str] = Field(..., description="Reference units to check against")
 
 
 @router.get("/api/units/presets")
@@ -45,18 +82,35 @@ async def get_preset(name: str):
         preset = UnitSystem.get_preset(name)
         return {
             "name": preset.name,
-            "units": preset.units,
+            "units": dict(preset.units),
             "description": preset.description
         }
     except KeyError:
         raise HTTPException(status_code=404, detail=f"Preset '{name}' not found")
 
 
+@lru_cache(maxsize=256)
+def _custom_registry(custom_units):
+    """Build a registry overlay for a set of custom units, reused across requests"""
+    overlay = RegistryOverlay()
+    for name, expr in custom_units:
+        overlay.define(f"{name} = {expr}")
+    return overlay
+
+
 @router.post("/api/convert")
-async def convert_units(request: ConversionRequest):
+def convert_units(request: ConversionRequest):
     """Simple unit conversion between two units"""
+    timing = current_timing()
+    timing.mark("request")
     try:
-        result = convert_value(request.value, request.from_unit, request.to_unit)
+        if request.custom_units:
+            overlay = _custom_registry(tuple(request.custom_units.items()))
+            timing.mark("plan")
+            result = overlay.convert(request.value, request.from_unit, request.to_unit)
+        else:
+            result = convert_value(request.value, request.from_unit, request.to_unit)
+        timing.mark("convert")
         return {
             "value": request.value,
             "from_unit": request.from_unit,
@@ -68,23 +122,38 @@ async def convert_units(request: ConversionRequest):
 
 
 @router.post("/api/unit-system")
-async def convert_with_system(request: UnitSystemRequest):
+def convert_with_system(request: UnitSystemRequest):
     """Convert using a custom unit system"""
+    timing = current_timing()
+    deadline = current_deadline()
+    timing.mark("request")
     try:
-        converter = uniUnit(request.units)
-        
         if isinstance(request.value, str):
-            q = ureg(request.value)
+            q = parse_quantity(request.value)
         else:
             q = request.value * ureg.meter
+        timing.mark("units")
+        deadline.check()
+        
+        converter = uniUnit(request.units)
+        plan = converter.compile(q.units)
+        timing.mark("plan")
+        deadline.check()
         
-        result = converter.to_unit(q)
+        result = ureg.Quantity(plan(q.magnitude), plan.target)
+        if request.readable:
+            result = best_unit(result, system=converter)
+        timing.mark("convert")
         
+        formatted = format_quantity(result)
+        timing.mark("format")
         return {
             "value": request.value,
             "units": request.units,
-            "result": format_quantity(result)
+            "result": formatted
         }
+    except BudgetExceeded:
+        raise  # answered 503 by LoadSheddingMiddleware
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -99,25 +168,76 @@ def format_quantity(q):
 
 
 @router.post("/api/quick-convert")
-async def convert_systems(request: QuickConvertRequest):
+def convert_systems(request: QuickConvertRequest):
     """Quick convert between two preset unit systems"""
+    timing = current_timing()
+    deadline = current_deadline()
+    timing.mark("request")
     try:
-        result = quick_convert(request.value, request.from_system, request.to_system)
+        value = parse_quantity(request.value) if isinstance(request.value, str) else request.value
+        timing.mark("units")
+        deadline.check()
+        from_system = UnitSystem.get_preset(request.from_system)
+        to_system = UnitSystem.get_preset(request.to_system)
+        timing.mark("plan")
+        result = quick_convert(value, from_system, to_system)
+        if request.readable:
+            result = best_unit(result, system=to_system)
+        timing.mark("convert")
+        formatted = format_quantity(result)
+        timing.mark("format")
         return {
             "value": str(request.value),
             "from_system": request.from_system,
             "to_system": request.to_system,
-            "result": format_quantity(result)
+            "result": formatted
+        }
+    except BudgetExceeded:
+        raise  # answered 503 by LoadSheddingMiddleware
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/api/compatibility")
+def check_compatibility(request: CompatibilityRequest):
+    """Check every candidate unit against every reference unit"""
+    try:
+        matrix = check_unit_compatibility_matrix(request.units, request.references)
+        return {
+            "units": request.units,
+            "references": request.references,
+            "matrix": matrix
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@lru_cache(maxsize=1)
+def _conversion_table_payload():
+    """Build the conversion table once and keep its encoded and compressed bodies"""
+    table = build_conversion_table()
+    body = json.dumps(table, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return table["version"], Asset(body, "application/json")
+
+
+def conversion_table_url() -> str:
+    """Versioned URL of the conversion table, cached by browsers as immutable"""
+    return f"/api/conversion-table?v={_conversion_table_payload()[0]}"
+
+
+@router.get("/api/conversion-table")
+async def get_conversion_table(request: Request, v: Optional[str] = None):
+    """Get the unit conversion table used by the browser converter (see conversion_table_url)"""
+    version, asset = _conversion_table_payload()
+    cache_control = IMMUTABLE_CACHE if v == version else "public, max-age=86400"
+    return asset.response(request, cache_control)
+
+
 @router.get("/api/unit-info")
-async def get_info(value: str):
+def get_info(value: str):
     """Get detailed information about a unit"""
     try:
-        q = ureg(value)
+        q = parse_quantity(value)
         info = get_unit_info(q)
         return info
     except Exception as e:
@@ -131,8 +251,15 @@ async def get_chinese_units():
 
 
 @router.get("/api/ureg/units")
-async def list_common_units():
-    """List common units from Pint registry"""
+async def list_common_units(dimension: Optional[str] = None, like: Optional[str] = None):
+    """List common units, or every unit of a dimension (or compatible with a unit) with its SI factor"""
+    if dimension is not None or like is not None:
+        try:
+            catalogue = get_unit_catalogue()
+            units = catalogue.units(dimension=dimension, like=like)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"dimension": dimension, "like": like, "version": catalogue.version, "units": units}
     common_units = [
         "meter", "kilometer", "centimeter", "millimeter", "nanometer",
         "kilogram", "gram", "milligram", "microgram",
@@ -143,3 +270,199 @@ async def list_common_units():
         "meter/second", "kilogram/meter**3", "newton/meter**2"
     ]
     return {"units": common_units}
+
+
+@router.get("/api/ureg/dimensions")
+async def list_dimensions():
+    """List the dimensions of the unit catalogue with their unit counts"""
+    catalogue = get_unit_catalogue()
+    return {"version": catalogue.version, "dimensions": catalogue.dimensions()}
+
+
+@router.get("/api/ureg/search")
+async def search_units(q: str = "", limit: int = 20, dimension: Optional[str] = None):
+    """Search unit names, aliases, prefixed units and Chinese units by prefix"""
+    try:
+        results = get_unit_index().search(q, limit=min(max(limit, 1), 100), dimension=dimension)
+        return {"query": q, "dimension": dimension, "results": results}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+STREAM_DTYPES = {"float64": "<f8", "float32": "<f4"}
+
+# Binary bulk format: MAGIC, uint32 LE header length, JSON header padded
+# with spaces to a multiple of 8 bytes, then packed little-endian floats.
+BINARY_CONTENT_TYPE = "application/x-uniunit-array"
+BINARY_MAGIC = b"UUA1"
+
+
+def pack_array(header: dict, values) -> bytes:
+    """Encode a header and an array in the binary bulk format"""
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    padding = -(len(BINARY_MAGIC) + 4 + len(encoded)) % 8
+    encoded += b" " * padding
+    return BINARY_MAGIC + struct.pack("<I", len(encoded)) + encoded + values.tobytes()
+
+
+def _stream_dtype(name) -> str:
+    if name not in STREAM_DTYPES:
+        raise ValueError(f"Unsupported dtype {name!r}, expected one of {sorted(STREAM_DTYPES)}")
+    return STREAM_DTYPES[name]
+
+
+def unpack_array(body: bytes):
+    """Decode the binary bulk format into (header, array) without copying the values"""
+    if len(body) < 8 or body[:4] != BINARY_MAGIC:
+        raise ValueError("Not a uniUnit binary array")
+    (length,) = struct.unpack_from("<I", body, 4)
+    if length % 8 or 8 + length > len(body):
+        raise ValueError("Truncated or misaligned binary array header")
+    header = json.loads(body[8:8 + length])
+    dtype = _stream_dtype(header.get("dtype", "float64"))
+    if (len(body) - 8 - length) % np.dtype(dtype).itemsize:
+        raise ValueError("Binary array payload is not a whole number of values")
+    values = np.frombuffer(body, dtype=dtype, offset=8 + length)
+    return header, values
+
+
+def unpack_json_array(body: bytes):
+    """Decode a JSON bulk request into (declaration, array)"""
+    spec = json.loads(body)
+    values = np.asarray(spec["values"], dtype=_stream_dtype(spec.get("dtype", "float64")))
+    return spec, values
+
+
+def _compile_declared_plan(spec: dict):
+    """Compile the conversion declared by a bulk or WebSocket client"""
+    if "from_unit" in spec and "to_unit" in spec:
+        return compile_conversion(spec["from_unit"], spec["to_unit"])
+    if "from_system" in spec and "to_system" in spec:
+        from_system = UnitSystem.get_preset(spec["from_system"])
+        to_system = UnitSystem.get_preset(spec["to_system"])
+        return to_system.compile(from_system.get_new_unit(ureg(spec["unit"])))
+    if "units" in spec:
+        return uniUnit(spec["units"]).compile(spec["unit"])
+    raise ValueError("Declare from_unit/to_unit, from_system/to_system/unit or units/unit")
+
+
+@router.websocket("/ws/convert")
+async def convert_stream(websocket: WebSocket):
+    """
+    Stream conversions over one connection.
+    
+    The client first sends a JSON declaration, then frames of values:
+    JSON lists (or {"values": [...]}) are answered with {"values": [...]},
+    binary frames of packed little-endian floats with binary frames of the
+    same dtype. A new declaration replaces the current conversion.
+    """
+    await websocket.accept()
+    plan = None
+    dtype = STREAM_DTYPES["float64"]
+    while True:
+        try:
+            message = await websocket.receive()
+        except WebSocketDisconnect:
+            break
+        if message["type"] == "websocket.disconnect":
+            break
+        try:
+            if message.get("bytes") is not None:
+                if plan is None:
+                    raise ValueError("Declare a conversion before sending values")
+                values = np.frombuffer(message["bytes"], dtype=dtype)
+                await websocket.send_bytes(plan.apply(values, workers=1, precision=dtype).tobytes())
+                continue
+            
+            data = json.loads(message["text"])
+            if isinstance(data, dict) and "values" not in data:
+                plan = _compile_declared_plan(data)
+                dtype = _stream_dtype(data.get("dtype", "float64"))
+                await websocket.send_json({
+                    "status": "ready",
+                    "from_unit": str(plan.source),
+                    "to_unit": str(plan.target),
+                    "factor": plan.factor,
+                    "max_relative_error": plan.relative_error(dtype)
+                })
+                continue
+            if plan is None:
+                raise ValueError("Declare a conversion before sending values")
+            values = data["values"] if isinstance(data, dict) else data
+            await websocket.send_json({"values": plan(values)})
+        except WebSocketDisconnect:
+            break
+        except Exception as e:
+            await websocket.send_json({"error": str(e)})
+
+
+@router.post("/api/convert/bulk")
+async def convert_bulk(request: Request):
+    """
+    Convert many values with one compiled plan.
+    
+    Accepts JSON ({"values": [...], plus a declaration as for /ws/convert})
+    or the binary format (Content-Type application/x-uniunit-array), and
+    answers in the same format.
+    """
+    binary = request.headers.get("content-type", "").startswith(BINARY_CONTENT_TYPE)
+    body = await request.body()
+    try:
+        # Decoding, conversion and encoding all scale with the payload: keep them off the event loop
+        content = await run_in_threadpool(_convert_bulk_body, body, binary)
+    except BudgetExceeded:
+        raise  # answered 503 by LoadSheddingMiddleware
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=content, media_type=BINARY_CONTENT_TYPE if binary else "application/json")
+
+
+def _convert_bulk_body(body: bytes, binary: bool) -> bytes:
+    """Decode a bulk request, convert its values and encode the answer in the same format"""
+    timing = current_timing()
+    spec, values = unpack_array(body) if binary else unpack_json_array(body)
+    timing.mark("request")
+    plan = _compile_declared_plan(spec)
+    timing.mark("plan")
+    current_deadline().check()
+    result = plan.apply(values, workers=1, precision=values.dtype)
+    timing.mark("convert")
+    
+    header = {
+        "from_unit": str(plan.source),
+        "to_unit": str(plan.target),
+        "dtype": spec.get("dtype", "float64"),
+        "count": int(result.size),
+        "max_relative_error": plan.relative_error(values.dtype),
+    }
+    if binary:
+        content = pack_array(header, result)
+    else:
+        header["values"] = result.tolist()
+        content = json.dumps(header, separators=(",", ":"), allow_nan=False).encode("utf-8")
+    timing.mark("format")
+    return content
+
+
+@router.get("/api/limits")
+async def get_limits():
+    """Concurrency limits, queue depths, time budgets and shedding counters per endpoint"""
+    return limit_settings.summary()
+
+
+@router.get("/api/server-timing")
+async def get_server_timing():
+    """Whether Server-Timing headers are emitted"""
+    return {"enabled": timing_settings.enabled}
+
+
+@router.put("/api/server-timing")
+async def set_server_timing(request: ServerTimingRequest, x_admin_token: Optional[str] = Header(None)):
+    """Switch Server-Timing headers on or off (requires UNIUNIT_ADMIN_TOKEN, sent as X-Admin-Token)"""
+    token = os.environ.get("UNIUNIT_ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=403, detail="Runtime switch disabled: UNIUNIT_ADMIN_TOKEN is not set")
+    if not hmac.compare_digest(x_admin_token or "", token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    timing_settings.enabled = request.enabled
+    return {"enabled": timing_settings.enabled}
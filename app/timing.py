@@ -0,0 +1,93 @@
+"""
+Per-stage Server-Timing headers.
+
+When enabled, ``ServerTimingMiddleware`` starts a ``ServerTiming`` for each
+HTTP request and adds a ``Server-Timing`` header to the response. Handlers
+call ``current_timing().mark(stage)`` at the end of each stage, so every
+stage is the time since the previous mark, the first one ("request")
+covering body reading and validation. When disabled, ``current_timing()``
+returns a no-op and the middleware passes requests straight through.
+
+Timing is off unless ``UNIUNIT_SERVER_TIMING=1``; it can be switched at
+runtime with ``PUT /api/server-timing`` when ``UNIUNIT_ADMIN_TOKEN`` is set.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+
+
+class ServerTiming:
+    """Consecutive stage durations of one request"""
+
+    __slots__ = ("started", "last", "entries")
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.entries = []
+
+    def mark(self, name: str) -> None:
+        """End the current stage, named `name`, and start the next one"""
+        now = time.perf_counter()
+        self.entries.append((name, now - self.last))
+        self.last = now
+
+    def header(self) -> str:
+        parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.entries]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.3f}")
+        return ", ".join(parts)
+
+
+class _NoTiming:
+    """Stand-in used when timing is disabled"""
+
+    __slots__ = ()
+
+    def mark(self, name: str) -> None:
+        pass
+
+
+NO_TIMING = _NoTiming()
+_current = ContextVar("server_timing", default=NO_TIMING)
+
+
+def current_timing():
+    """The ServerTiming of the current request, or a no-op when disabled"""
+    return _current.get()
+
+
+class TimingSettings:
+    """Runtime switch for Server-Timing headers"""
+
+    def __init__(self):
+        self.enabled = os.environ.get("UNIUNIT_SERVER_TIMING", "0") == "1"
+
+
+settings = TimingSettings()
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a Server-Timing header when timing is enabled"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        timing = ServerTiming()
+        token = _current.set(timing)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,141 @@
+"""
+Startup profiling and warm-up.
+
+``profile`` records how long each startup stage takes, from the first
+import of the app to the end of the warm-up run by the lifespan handler.
+``warm_up`` preloads the unit registry, interns every preset unit system
+and compiles plans for hot units and preset pairs, so the first requests
+after a deploy do not pay for them.
+
+Hot units and preset pairs can be configured with the environment
+variables ``UNIUNIT_WARM_UNITS`` (comma-separated units) and
+``UNIUNIT_WARM_PAIRS`` (comma-separated ``from:to`` preset pairs, or
+``*`` for every pair). Run ``python -m app.warmup`` to print the startup
+profile.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("uvicorn.error")
+
+DEFAULT_HOT_UNITS = (
+    "m", "km", "cm", "mm", "inch", "ft", "mile",
+    "kg", "g", "lb", "s", "min", "hour",
+    "N", "Pa", "kPa", "MPa", "bar", "psi", "J", "kJ", "W", "kW",
+    "m/s", "km/h", "L", "degC", "degF", "K",
+)
+
+
+class StartupProfile:
+    """Durations of the startup stages and the readiness flag"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.ready = False
+        self.ready_after: Optional[float] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    def mark_ready(self) -> None:
+        self.ready = True
+        self.ready_after = round((time.perf_counter() - self.started) * 1000, 3)
+
+    def summary(self) -> dict:
+        return {"ready": self.ready, "ready_after_ms": self.ready_after, "stages_ms": dict(self.stages)}
+
+
+profile = StartupProfile()
+
+with profile.stage("import uniunit"):
+    from uniunit.uniunit import UnitSystem, _parse_units, registry_version, ureg
+
+
+def _env_list(name: str) -> Optional[List[str]]:
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def hot_units() -> List[str]:
+    """Units to pre-parse, from UNIUNIT_WARM_UNITS or the defaults"""
+    return _env_list("UNIUNIT_WARM_UNITS") or list(DEFAULT_HOT_UNITS)
+
+
+def preset_pairs() -> List[Tuple[str, str]]:
+    """Preset pairs to compile plans for, from UNIUNIT_WARM_PAIRS or SI to/from every preset"""
+    names = UnitSystem.list_presets()
+    items = _env_list("UNIUNIT_WARM_PAIRS")
+    if items == ["*"]:
+        return [(a, b) for a in names for b in names if a != b]
+    if items is None:
+        return [("SI", name) for name in names if name != "SI"] + [(name, "SI") for name in names if name != "SI"]
+    pairs = []
+    for item in items:
+        source, _, target = item.partition(":")
+        pairs.append((source.strip(), target.strip()))
+    return pairs
+
+
+def warm_up(
+    units: Optional[Iterable[str]] = None,
+    pairs: Optional[Iterable[Tuple[str, str]]] = None,
+    tasks: Optional[Dict[str, Callable[[], object]]] = None,
+) -> None:
+    """Preload the registry, presets, hot units and plans, then any extra named tasks"""
+    units = hot_units() if units is None else list(units)
+    pairs = preset_pairs() if pairs is None else list(pairs)
+
+    with profile.stage("warm registry"):
+        registry_version()
+
+    with profile.stage("warm presets"):
+        systems = {name: UnitSystem.get_preset(name) for name in UnitSystem.list_presets()}
+
+    parsed = []
+    with profile.stage("warm units"):
+        for name in units:
+            try:
+                parsed.append(_parse_units(name))
+                ureg.get_base_units(name)
+            except Exception as e:
+                logger.warning("Skipping warm-up unit %r: %s", name, e)
+
+    with profile.stage("warm plans"):
+        for source_name, target_name in pairs:
+            source, target = systems.get(source_name), systems.get(target_name)
+            if source is None or target is None:
+                logger.warning("Skipping warm-up pair %s:%s: unknown preset", source_name, target_name)
+                continue
+            for units_ in parsed:
+                target.compile(source.get_new_unit(units_))
+                target.compile(units_)
+
+    for name, task in (tasks or {}).items():
+        with profile.stage(f"warm {name}"):
+            task()
+
+
+if __name__ == "__main__":
+    import json
+
+    import app.main  # noqa: F401  (records the import stages)
+    from app.main import run_warm_up
+    from app.warmup import profile as app_profile
+
+    # Run as a script, this module was imported first: count from its start
+    app_profile.started = profile.started
+    app_profile.stages.update(profile.stages)
+    run_warm_up()
+    print(json.dumps(app_profile.summary(), indent=2))
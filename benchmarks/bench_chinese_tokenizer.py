@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding:utf-8
+"""
+Benchmark the Chinese unit tokenizer against Pint's expression parser.
+
+Run with: python benchmarks/bench_chinese_tokenizer.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from uniunit import ureg, parse_quantity
+
+SINGLE = ['3米', '1.5千克', '250毫升', '7千瓦时', '20摄氏度', '2刻钟']
+COMPOUND = ['3斤2两', '5丈3尺', '1丈2尺3寸']
+NUMBER = 20000
+
+
+def pint_compound(text):
+    """Parse a compound measure by splitting it and summing Pint quantities"""
+    parts = []
+    current = ''
+    for ch in text:
+        current += ch
+        if not (ch.isdigit() or ch == '.'):
+            if parts and not current[0].isdigit():
+                parts[-1] += current
+            else:
+                parts.append(current)
+            current = ''
+    total = ureg(parts[0])
+    for part in parts[1:]:
+        total = total + ureg(part)
+    return total
+
+
+def report(name, func, texts):
+    seconds = timeit.timeit(lambda: [func(t) for t in texts], number=NUMBER // len(texts))
+    per_call = seconds / (NUMBER // len(texts) * len(texts)) * 1e6
+    print(f"{name:<28}{per_call:10.2f} us/parse")
+    return per_call
+
+
+def main():
+    print(f"{'Single units':<28}")
+    base = report('  pint ureg()', ureg, SINGLE)
+    fast = report('  parse_quantity()', parse_quantity, SINGLE)
+    print(f"  speedup: {base / fast:.1f}x")
+    print(f"{'Compound measures':<28}")
+    base = report('  pint split + sum', pint_compound, COMPOUND)
+    fast = report('  parse_quantity()', parse_quantity, COMPOUND)
+    print(f"  speedup: {base / fast:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding:utf-8
+"""
+Report import time and memory of uniunit for each registry profile.
+
+Each profile is measured in a fresh interpreter started with
+UNIUNIT_REGISTRY_PROFILE set ("full" leaves it unset and loads Pint's
+whole registry). RSS is the resident set size after import and after a
+first conversion, from /proc/self/status where available.
+
+Run with: python benchmarks/bench_registry_profiles.py [profile ...]
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RUNS = 3
+
+PROBE = r'''
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+
+def rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+before = rss_kb()
+start = time.perf_counter()
+import uniunit
+imported = time.perf_counter()
+after_import = rss_kb()
+uniunit.quick_convert(uniunit.ureg.Quantity(1, 'kg * m / s ** 2'), 'SI', 'Imperial')
+converted = time.perf_counter()
+print(json.dumps({{
+    'units': len(uniunit.ureg._units),
+    'import_ms': (imported - start) * 1000,
+    'first_ms': (converted - imported) * 1000,
+    'rss_before_kb': before,
+    'rss_import_kb': after_import,
+    'rss_kb': rss_kb(),
+}}))
+'''
+
+
+def measure(profile):
+    """Best of RUNS fresh imports with the given profile"""
+    env = dict(os.environ)
+    env.pop('UNIUNIT_REGISTRY_PROFILE', None)
+    env.pop('UNIUNIT_PLAN_CACHE', None)
+    if profile != 'full':
+        env['UNIUNIT_REGISTRY_PROFILE'] = profile
+    results = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, '-c', PROBE.format(root=ROOT)], env=env,
+                                check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output))
+    return min(results, key=lambda result: result['import_ms'])
+
+
+def main():
+    from uniunit import REGISTRY_PROFILES
+    profiles = sys.argv[1:] or ['full'] + list(REGISTRY_PROFILES)
+    print(f"{'profile':<16}{'units':>7}{'import ms':>11}{'first ms':>10}{'RSS MiB':>9}{'+uniunit MiB':>14}")
+    for profile in profiles:
+        r = measure(profile)
+        print(f"{profile:<16}{r['units']:>7}{r['import_ms']:>11.1f}{r['first_ms']:>10.1f}"
+              f"{r['rss_kb'] / 1024:>9.1f}{(r['rss_kb'] - r['rss_before_kb']) / 1024:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
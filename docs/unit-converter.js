@@ -8,7 +8,6 @@ const unitConversions = {
         nanometer: 1e-9,
         picometer: 1e-12,
         femtometer: 1e-15,
-        kilometer: 1000,
         decimeter: 0.1,
         inch: 0.0254,
         foot: 0.3048,
@@ -190,11 +189,9 @@ const unitConversions = {
         Pa: 1,
         kPa: 1000,
         MPa: 1e6,
-        bar: 1e5,
         mbar: 100,
         atm: 101325,
         Torr: 133.322,
-        psi: 6894.76,
     },
     energy: {
         joule: 1,
@@ -218,7 +215,6 @@ const unitConversions = {
         eV: 1.6022e-19,
         BTU: 1055.06,
         ft_lb: 1.35582,
-        erg: 1e-7,
     },
     power: {
         watt: 1,
@@ -257,7 +253,6 @@ const unitConversions = {
         mA: 0.001,
         uA: 1e-6,
         nA: 1e-9,
-        ohm: 1,
         mohm: 0.001,
     },
 };
@@ -302,7 +297,6 @@ function normalizeUnit(unit) {
         'celsius': 'celsius',
         'fahrenheit': 'fahrenheit',
         'rankine': 'rankine',
-        'fahrenheit': 'fahrenheit',
         'degc': 'degC',
         'degf': 'degF',
         'degk': 'kelvin',
@@ -310,15 +304,12 @@ function normalizeUnit(unit) {
         'degree_fahrenheit': 'degF',
         'degree_kelvin': 'kelvin',
         'lbs': 'lb',
-        'lbs': 'lb',
         'oz': 'oz',
         'inches': 'in',
-        'inches': 'in',
         'feet': 'ft',
         'yards': 'yd',
         'miles': 'mi',
         'knots': 'kn',
-        'knots': 'kn',
         'mph': 'mph',
         'kph': 'km_h',
         'kmh': 'km_h',
@@ -362,13 +353,70 @@ function convert(value, fromUnit, toUnit) {
 }
 
 function isTemperatureUnit(unit) {
-    const tempUnits = ['kelvin', 'celsius', 'fahrenheit', 'rankine', 'k', 'degc', 'degf', 'r', 'degc', 'degf'];
+    const tempUnits = ['kelvin', 'celsius', 'fahrenheit', 'rankine', 'k', 'degc', 'degf', 'r'];
     return tempUnits.includes(normalizeUnit(unit));
 }
 
+// Conversion table generated by the server from the Pint registry.
+// Entries are [dimsIndex, factor] or [dimsIndex, factor, offset],
+// where SI value = value * factor + offset.
+let conversionTable = null;
+
+async function loadConversionTable(url = '/api/conversion-table') {
+    try {
+        const response = await fetch(url);
+        if (response.ok) {
+            conversionTable = await response.json();
+        }
+    } catch (e) {
+        conversionTable = null;
+    }
+    return conversionTable;
+}
+
+function resolveTableUnit(unit) {
+    const units = conversionTable.units;
+    if (unit in units) {
+        return units[unit];
+    }
+    let best = null;
+    let bestLength = 0;
+    for (const [prefix, scale] of Object.entries(conversionTable.prefixes)) {
+        if (prefix.length > bestLength && unit.length > prefix.length && unit.startsWith(prefix)) {
+            const base = units[unit.slice(prefix.length)];
+            if (base && base.length === 2) {
+                best = [base[0], base[1] * scale];
+                bestLength = prefix.length;
+            }
+        }
+    }
+    if (!best && unit.length > 1 && unit.endsWith('s')) {
+        return resolveTableUnit(unit.slice(0, -1));
+    }
+    return best;
+}
+
+function convertWithTable(value, fromUnit, toUnit) {
+    if (!conversionTable) {
+        return null;
+    }
+    const from = resolveTableUnit(fromUnit.trim());
+    const to = resolveTableUnit(toUnit.trim());
+    if (!from || !to) {
+        return null;
+    }
+    if (from[0] !== to[0]) {
+        throw new Error(`Cannot convert from ${fromUnit} to ${toUnit}`);
+    }
+    const siValue = value * from[1] + (from[2] || 0);
+    return (siValue - (to[2] || 0)) / to[1];
+}
+
 window.jsUnitConverter = {
     convert,
     isTemperatureUnit,
     getUnitCategory,
     normalizeUnit,
+    loadConversionTable,
+    convertWithTable,
 };
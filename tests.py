@@ -6,8 +6,23 @@ Tests for uniunit package.
 Run with: python tests.py
 """
 
+import array
+import dataclasses
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
 import unittest
+import unittest.mock
 import math
+import pint
+try:
+    import numpy as np
+except ImportError:
+    np = None
 from uniunit import (
     ureg,
     unit,
@@ -16,12 +31,45 @@ from uniunit import (
     get_base_unit_with_value,
     simplify_unit,
     check_unit_compatibility,
+    check_unit_compatibility_matrix,
+    get_dimension_vector,
     convert_value,
     create_custom_unit,
     quick_convert,
     get_unit_info,
     UnitSystem,
+    CompoundParser,
+    parse_quantity,
+    RegistryOverlay,
+    ConversionPlan,
+    compile_conversion,
+    unit_dataclass,
+    unit_field,
+    PlanStore,
+    set_plan_store,
+    BestUnitIndex,
+    best_unit,
+    UnitCatalogue,
+    get_unit_catalogue,
+    LazyQuantity,
+    REGISTRY_PROFILES,
+    build_registry,
+    Q_,
+    DeckSchema,
+    DeckConverter,
+    convert_deck,
+    unit_function,
+    set_unit_checks,
+    GroupedQuantities,
 )
+from uniunit.uniunit import build_conversion_table, get_unit_index, registry_version
+
+try:
+    import asyncio
+    import httpx
+    from fastapi import FastAPI
+except ImportError:  # the web app's dependencies are optional
+    FastAPI = None
 
 
 class TestBasicConversion(unittest.TestCase):
@@ -224,6 +272,28 @@ class TestUnitSystemPresets(unittest.TestCase):
         expected = ['SI', 'MKS', 'CGS', 'mmkgms', 'mmgms', 'nm_ug_ps', 'Imperial', 'FPS', 'British']
         for p in expected:
             self.assertIn(p, presets)
+    
+    def test_presets_interned(self):
+        """Test presets are shared and refreshed when re-registered."""
+        self.assertIs(UnitSystem.get_preset('CGS'), UnitSystem.get_preset('CGS'))
+        UnitSystem.register_preset('_interned', {'meter': 'cm'})
+        first = UnitSystem.get_preset('_interned')
+        UnitSystem.register_preset('_interned', {'meter': 'mm'})
+        self.assertIsNot(UnitSystem.get_preset('_interned'), first)
+        self.assertAlmostEqual(UnitSystem.get_preset('_interned').to_unit(1 * ureg.m).magnitude, 1000.0)
+        del UnitSystem.PRESETS['_interned']
+    
+    def test_presets_read_only(self):
+        """Test the shared preset instances cannot be modified."""
+        cgs = UnitSystem.get_preset('CGS')
+        with self.assertRaises(TypeError):
+            cgs.units['length'] = 'm'
+        with self.assertRaises(AttributeError):
+            cgs.units = {'length': 'm'}
+        self.assertEqual(cgs.to_unit(1 * ureg.m).units, ureg.cm)
+        custom = UnitSystem('custom', dict(cgs.units))
+        custom.description = 'editable'
+        self.assertEqual(custom.to_unit(1 * ureg.m).units, ureg.cm)
 
 
 class TestCustomUnitSystem(unittest.TestCase):
@@ -297,6 +367,880 @@ class TestHelperFunctions(unittest.TestCase):
         self.assertAlmostEqual(result.magnitude, 1, places=2)
 
 
+class TestCompatibilityMatrix(unittest.TestCase):
+    """Test bulk dimensional compatibility checks."""
+    
+    def test_matrix_shape(self):
+        """Test the matrix has one row per candidate and one column per reference."""
+        matrix = check_unit_compatibility_matrix(['km', 'kg', 'N'], ['m', 'kg*m/s**2'])
+        self.assertEqual(matrix, [[True, False], [False, False], [False, True]])
+    
+    def test_matrix_mixed_inputs(self):
+        """Test Quantities, Units and strings can be mixed."""
+        matrix = check_unit_compatibility_matrix([1 * ureg.Pa, ureg.g], ['bar', ureg.kg])
+        self.assertEqual(matrix, [[True, False], [False, True]])
+    
+    def test_matrix_rows_independent(self):
+        """Test repeated candidates do not share row objects."""
+        matrix = check_unit_compatibility_matrix(['m', 'm'], ['km'])
+        matrix[0][0] = False
+        self.assertTrue(matrix[1][0])
+    
+    def test_matrix_matches_pairwise(self):
+        """Test the matrix agrees with check_unit_compatibility."""
+        units = [ureg.m, ureg.s, ureg.J, ureg.W, ureg.degC, ureg.K]
+        matrix = check_unit_compatibility_matrix(units, units)
+        for i, u1 in enumerate(units):
+            for j, u2 in enumerate(units):
+                self.assertEqual(matrix[i][j], check_unit_compatibility(u1, u2))
+    
+    def test_dimension_vector(self):
+        """Test dimension vector of Pascal."""
+        self.assertEqual(get_dimension_vector(ureg.Pa), (1, -1, -2, 0, 0, 0, 0))
+        self.assertEqual(get_dimension_vector('km/h'), (0, 1, -1, 0, 0, 0, 0))
+
+
+class TestScaleVector(unittest.TestCase):
+    """Test cached base dimension scale factors."""
+    
+    def test_scale_vector(self):
+        """Test scale vector covers all seven base dimensions."""
+        u = uniUnit({'kg': 'g', 'm': 'cm'})
+        scale = u.get_scale_vector()
+        self.assertEqual(len(scale), 7)
+        self.assertAlmostEqual(scale['[mass]'], 1000)
+        self.assertAlmostEqual(scale['[length]'], 100)
+        self.assertAlmostEqual(scale['[time]'], 1)
+    
+    def test_conversion_factor(self):
+        """Test conversion factor by base unit name."""
+        u = uniUnit({'kilogram': 'gram'})
+        self.assertAlmostEqual(u.get_conversion_factor('kilogram'), 1000)
+        self.assertAlmostEqual(u.get_conversion_factor('[mass]'), 1000)
+        self.assertAlmostEqual(u.get_conversion_factor('meter'), 1)
+        with self.assertRaises(KeyError):
+            u.get_conversion_factor('newton')
+    
+    def test_derived_factor_matches_to_unit(self):
+        """Test derived factor agrees with to_unit."""
+        u = uniUnit({'kg': 'microgram', 'm': 'nm', 's': 'ps'})
+        for q in [1 * ureg.Pa, 1 * ureg.kJ, 1 * ureg.km / ureg.hour]:
+            self.assertAlmostEqual(u.get_derived_factor(q) / u.to_unit(q).magnitude, 1)
+    
+    def test_invalid_target_raises(self):
+        """Test invalid targets fail when the converter is built."""
+        with self.assertRaises(ValueError):
+            uniUnit({'meter': 'second'})
+        with self.assertRaises(ValueError):
+            uniUnit({'meter': 'not_a_unit'})
+    
+    def test_mole_conversion(self):
+        """Test mole converts with the substance dimension."""
+        u = uniUnit({'mole': 'millimole'})
+        result = u.to_unit(1 * ureg.mol)
+        self.assertAlmostEqual(result.magnitude, 1000, places=6)
+    
+    def test_unit_system_scale_vector(self):
+        """Test UnitSystem exposes the scale vector."""
+        cgs = UnitSystem.get_preset('CGS')
+        self.assertAlmostEqual(cgs.get_scale_vector()['[length]'], 100)
+
+
+class TestConversionTable(unittest.TestCase):
+    """Test the generated conversion table."""
+    
+    def test_table_contents(self):
+        """Test table entries carry dimension index and SI factor."""
+        table = build_conversion_table()
+        index, factor = table['units']['inch']
+        self.assertEqual(table['dims'][index], list(get_dimension_vector('m')))
+        self.assertAlmostEqual(factor, 0.0254)
+        self.assertAlmostEqual(table['prefixes']['kilo'], 1000)
+        self.assertIn('米', table['units'])
+        self.assertIn('CGS', table['presets'])
+    
+    def test_offset_units(self):
+        """Test offset units carry their offset."""
+        table = build_conversion_table()
+        _, factor, offset = table['units']['degC']
+        self.assertEqual(factor, 1)
+        self.assertAlmostEqual(offset, 273.15)
+    
+    def test_version_stable(self):
+        """Test the version only depends on the content."""
+        self.assertEqual(build_conversion_table()['version'], build_conversion_table()['version'])
+
+
+class TestUnitIndex(unittest.TestCase):
+    """Test unit name search."""
+    
+    def test_prefix_search(self):
+        """Test prefix search finds names and symbols."""
+        names = [r['name'] for r in get_unit_index().search('pasc')]
+        self.assertIn('pascal', names)
+        results = get_unit_index().search('km', limit=1)
+        self.assertEqual(results[0]['unit'], 'kilometer')
+    
+    def test_common_prefixed_units_rank_first(self):
+        """Test readable prefixed units rank above registry names as they are typed."""
+        index = get_unit_index()
+        self.assertEqual(index.search('kilom')[0]['name'], 'kilometer')
+        self.assertEqual(index.search('ki', dimension='[length]', limit=1)[0]['unit'], 'kilometer')
+        self.assertEqual(index.search('kpa', limit=1)[0]['name'], 'kPa')
+    
+    def test_prefixed_combinations(self):
+        """Test prefixed unit names are indexed."""
+        names = [r['name'] for r in get_unit_index().search('kilonewton')]
+        self.assertIn('kilonewton', names)
+    
+    def test_chinese_units(self):
+        """Test CHINESE_UNITS keys are indexed."""
+        results = get_unit_index().search('千克')
+        self.assertEqual(results[0]['unit'], 'kilogram')
+    
+    def test_dimension_filter(self):
+        """Test results can be restricted to a dimension."""
+        results = get_unit_index().search('k', limit=50, dimension='[length]')
+        self.assertTrue(results)
+        for r in results:
+            self.assertEqual(r['dimensionality'], '[length]')
+    
+    def test_fuzzy_search(self):
+        """Test misspelled names are found by trigram matching."""
+        names = [r['unit'] for r in get_unit_index().search('pscal', fuzzy=True)]
+        self.assertIn('pascal', names)
+    
+    def test_limit(self):
+        """Test the number of results is limited."""
+        self.assertEqual(len(get_unit_index().search('m', limit=3)), 3)
+    
+    def test_rebuilt_after_definitions(self):
+        """Test the shared index picks up new units."""
+        index = get_unit_index()
+        self.assertIs(get_unit_index(), index)
+        ureg.define('index_test_furlong = 201 * meter')
+        results = get_unit_index().search('index_test', dimension='[length]')
+        self.assertEqual([r['name'] for r in results], ['index_test_furlong'])
+        self.assertEqual(get_unit_index().search('m', dimension='[bogus]'), [])
+
+
+class TestRegistryOverlay(unittest.TestCase):
+    """Test per-scope custom unit definitions."""
+    
+    def test_define_and_convert(self):
+        """Test converting with a custom unit."""
+        overlay = RegistryOverlay()
+        overlay.define('Long = 1000 * kilometer = Lg')
+        self.assertAlmostEqual(overlay.convert(3, 'Long', 'km'), 3000)
+        self.assertAlmostEqual(overlay.convert(3000, 'm', 'Lg'), 0.003)
+        self.assertAlmostEqual(overlay.convert(1, 'Long / hour', 'm/s'), 1e6 / 3600)
+    
+    def test_isolation(self):
+        """Test definitions do not leak to the shared registry or siblings."""
+        tenant_a = RegistryOverlay()
+        tenant_b = RegistryOverlay()
+        tenant_a.define('overlay_only_unit = 7 * meter')
+        self.assertIn('overlay_only_unit', tenant_a)
+        self.assertNotIn('overlay_only_unit', tenant_b)
+        self.assertNotIn('overlay_only_unit', ureg)
+    
+    def test_child_falls_through(self):
+        """Test child overlays see parent definitions."""
+        tenant = RegistryOverlay()
+        tenant.define('Long = 1000 * kilometer')
+        request = tenant.child()
+        request.define('Short = Long / 1e6')
+        self.assertAlmostEqual(request.parse('2 Short').to('m').magnitude, 2)
+        self.assertNotIn('Short', tenant)
+    
+    def test_quantities_mix_with_shared_registry(self):
+        """Test overlay quantities work with shared registry quantities."""
+        overlay = RegistryOverlay()
+        overlay.define('score = 20')
+        total = overlay.Quantity(2, 'score') + 5 * ureg.dimensionless
+        self.assertAlmostEqual(total.magnitude, 45)
+    
+    def test_resolution_ignores_text_formatting(self):
+        """Test custom names are resolved without formatting units as text."""
+        overlay = RegistryOverlay()
+        overlay.define('e6 = 5 * meter')
+        self.assertAlmostEqual(overlay.convert(1, '1e6 * m', 'km'), 1000)
+        self.assertAlmostEqual(overlay.convert(2, 'e6', 'm'), 10)
+        default_format = ureg.formatter.default_format
+        ureg.formatter.default_format = '~P'
+        try:
+            overlay.define('Long = 1000 * kilometer')
+            self.assertAlmostEqual(overlay.convert(1, 'Long / hour', 'm/s'), 1e6 / 3600)
+        finally:
+            ureg.formatter.default_format = default_format
+    
+    def test_create_custom_unit_in_overlay(self):
+        """Test create_custom_unit returns one of the new unit, with or without an overlay."""
+        overlay = RegistryOverlay()
+        one = create_custom_unit('overlay_long', 1000 * ureg.km, registry=overlay)
+        self.assertIsInstance(one, ureg.Quantity)
+        self.assertAlmostEqual(one.to('m').magnitude, 1e6)
+        self.assertNotIn('overlay_long', ureg)
+        shared = create_custom_unit('shared_long', 1000 * ureg.km)
+        self.assertIsInstance(shared, ureg.Quantity)
+        self.assertAlmostEqual((3 * shared).to('km').magnitude, 3000)
+    
+    def test_invalid_definition(self):
+        """Test malformed definitions raise ValueError."""
+        with self.assertRaises(ValueError):
+            RegistryOverlay().define('no_expression')
+
+
+class TestConversionPlan(unittest.TestCase):
+    """Test compiled conversion plans."""
+    
+    def test_compile_conversion(self):
+        """Test a plan between two units."""
+        plan = compile_conversion('km/h', 'm/s')
+        self.assertAlmostEqual(plan(36.0), 10.0)
+        self.assertEqual(len(plan([1, 2, 3])), 3)
+    
+    def test_exact_temperature_plans(self):
+        """Test degC <-> degF plans have exact factors and offsets."""
+        plan = compile_conversion('degC', 'degF')
+        self.assertEqual((plan.factor, plan.offset), (1.8, 32.0))
+        self.assertEqual([plan(v) for v in (100.0, 0.0, -40.0)], [212.0, 32.0, -40.0])
+        back = compile_conversion('degF', 'degC')
+        self.assertEqual([back(v) for v in (212.0, 32.0, -40.0)], [100.0, 0.0, -40.0])
+        self.assertEqual(compile_conversion('K', 'degC').offset, -273.15)
+    
+    def test_plan_cached(self):
+        """Test plans for unit strings are reused."""
+        self.assertIs(compile_conversion('kg', 'g'), compile_conversion('kg', 'g'))
+    
+    def test_incompatible_units(self):
+        """Test incompatible units raise DimensionalityError."""
+        with self.assertRaises(pint.errors.DimensionalityError):
+            compile_conversion('m', 's')
+    
+    def test_unit_system_plan_matches_to_unit(self):
+        """Test a system plan gives the same result as to_unit."""
+        u = uniUnit({'kilogram': 'gram', 'meter': 'millimeter', 'second': 'millisecond'})
+        for q in [3 * ureg.Pa, 2 * ureg.J, 5 * ureg.km / ureg.hour]:
+            plan = u.compile(q)
+            expected = u.to_unit(q)
+            self.assertEqual(plan.target, expected.units)
+            self.assertAlmostEqual(plan(q.magnitude) / expected.magnitude, 1)
+    
+    def test_plan_quantity(self):
+        """Test a plan can return a Quantity."""
+        result = UnitSystem.get_preset('CGS').compile('N').quantity(1)
+        self.assertAlmostEqual(result.to('N').magnitude, 1)
+    
+    def test_offset_units_absolute(self):
+        """Test offset units convert as absolute temperatures by default."""
+        for source, target in [('degC', 'degF'), ('degF', 'K'), ('K', 'degC'), ('摄氏度', '华氏度')]:
+            plan = compile_conversion(source, target)
+            for value in [-40.0, 0.0, 37.5]:
+                expected = ureg.Quantity(value, source).to(target).magnitude
+                self.assertAlmostEqual(plan(value), expected, places=9)
+        self.assertAlmostEqual(compile_conversion('degC', 'K')([0, 100])[1], 373.15)
+    
+    def test_offset_units_delta(self):
+        """Test delta plans and offset units inside compound units."""
+        self.assertAlmostEqual(compile_conversion('degC', 'degF', delta=True)(10.0), 18.0)
+        self.assertAlmostEqual(compile_conversion('degF/s', 'K/s')(9.0), 5.0)
+        self.assertEqual(compile_conversion('degC/s', 'K/s').offset, 0.0)
+    
+    def test_unit_system_offset_target(self):
+        """Test systems whose temperature target is an offset unit."""
+        u = uniUnit({'kelvin': 'degC'})
+        self.assertAlmostEqual(u.compile('degF')(212.0), 100.0)
+        self.assertAlmostEqual(u.compile('degF', delta=True)(18.0), 10.0)
+        self.assertAlmostEqual(u.to_unit(9 * ureg.K / ureg.s).magnitude, 9.0)
+    
+    def test_chinese_temperature_offset(self):
+        """Test Chinese temperature names keep their offsets."""
+        self.assertAlmostEqual(ureg.Quantity(20, '摄氏度').to('K').magnitude, 293.15)
+        self.assertAlmostEqual(ureg.Quantity(68, '华氏度').to('degC').magnitude, 20.0)
+
+
+class TestUnitCatalogue(unittest.TestCase):
+    """Test the dimension-indexed unit catalogue."""
+    
+    def test_units_of_dimension(self):
+        """Test names, aliases and Chinese units are listed with SI factors."""
+        entries = {e['name']: e for e in get_unit_catalogue().units('[mass]')}
+        self.assertEqual(entries['kg']['unit'], 'kilogram')
+        self.assertAlmostEqual(entries['lb']['factor'], 0.45359237)
+        self.assertEqual(entries['斤']['unit'], 'shi_jin')
+        self.assertNotIn('m', entries)
+        factors = [e['factor'] for e in get_unit_catalogue().units('[mass]')]
+        self.assertEqual(factors, sorted(factors))
+    
+    def test_compatible_units_and_offsets(self):
+        """Test listing by compatible unit, with offsets for temperature units."""
+        entries = {e['name']: e for e in get_unit_catalogue().units(like='K')}
+        self.assertAlmostEqual(entries['degC']['offset'], 273.15)
+        self.assertNotIn('offset', entries['K'])
+        self.assertEqual(get_unit_catalogue().units((0, 1, -1, 0, 0, 0, 0)),
+                         get_unit_catalogue().units(like='km/h'))
+        with self.assertRaises(ValueError):
+            get_unit_catalogue().units()
+    
+    def test_rebuilt_after_definitions(self):
+        """Test the shared catalogue picks up new units."""
+        catalogue = get_unit_catalogue()
+        self.assertIs(get_unit_catalogue(), catalogue)
+        ureg.define('catalogue_test_unit = 7 * meter')
+        names = [e['name'] for e in get_unit_catalogue().units('[length]')]
+        self.assertIn('catalogue_test_unit', names)
+    
+    def test_dimensions(self):
+        """Test the dimension listing."""
+        dimensions = {d['dimension']: d for d in UnitCatalogue().dimensions()}
+        self.assertEqual(dimensions['[length]']['vector'], [0, 1, 0, 0, 0, 0, 0])
+        self.assertGreater(dimensions['[length]']['count'], 50)
+
+
+class TestBestUnit(unittest.TestCase):
+    """Test readable unit selection."""
+    
+    def assertReadable(self, quantity, magnitude, units):
+        result = best_unit(quantity)
+        self.assertEqual(result.units, ureg.Unit(units))
+        self.assertAlmostEqual(result.magnitude, magnitude)
+    
+    def test_prefix_selection(self):
+        """Test the largest candidate not bigger than the value is chosen."""
+        self.assertReadable(1.2e-7 * ureg.m, 120.0, 'nanometer')
+        self.assertReadable(0.5 * ureg.m, 500.0, 'millimeter')
+        self.assertReadable(1500 * ureg.m, 1.5, 'kilometer')
+        self.assertReadable(-2500 * ureg.J, -2.5, 'kilojoule')
+        self.assertReadable(2e5 * ureg.Pa, 200.0, 'kilopascal')
+    
+    def test_non_prefix_candidates(self):
+        """Test time and volume candidates, and zero."""
+        self.assertReadable(5400 * ureg.s, 1.5, 'hour')
+        self.assertReadable(0.002 * ureg.m ** 3, 2.0, 'liter')
+        self.assertReadable(0 * ureg.km, 0.0, 'meter')
+    
+    def test_bare_magnitude_and_system(self):
+        """Test SI magnitudes with a dimension, and imperial systems."""
+        result = best_unit(1.5e-3, dimension='[mass]')
+        self.assertEqual(str(result.units), 'gram')
+        self.assertAlmostEqual(result.magnitude, 1.5)
+        self.assertEqual(str(best_unit(100 * ureg.m, system='Imperial').units), 'yard')
+        self.assertEqual(str(best_unit(100 * ureg.m, system='CGS').units), 'meter')
+        with self.assertRaises(ValueError):
+            best_unit(1.0)
+    
+    def test_unchanged_values(self):
+        """Test offset units and dimensions without candidates are returned as is."""
+        temperature = ureg.Quantity(20, 'degC')
+        self.assertIs(best_unit(temperature), temperature)
+        self.assertEqual(best_unit(1 * ureg.m ** 4).units, ureg.Unit('meter ** 4'))
+    
+    def test_index_sorted(self):
+        """Test candidates are sorted by scale, one per scale."""
+        scales = [scale for scale, _ in BestUnitIndex().candidates((0, 3, 0, 0, 0, 0, 0))]
+        self.assertEqual(scales, sorted(set(scales)))
+
+
+class TestPlanStore(unittest.TestCase):
+    """Test the persistent plan store."""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'plans.sqlite')
+        self.store = set_plan_store(self.path)
+    
+    def tearDown(self):
+        set_plan_store(None)
+        self.tmpdir.cleanup()
+    
+    def test_plans_persisted(self):
+        """Test compiled plans are written to the store."""
+        u = uniUnit(UnitSystem.PRESETS['CGS'])
+        plan = u.compile('N')
+        self.assertEqual(len(self.store), 1)
+        stored = PlanStore(self.path).get(u._system_key, plan.source)
+        self.assertEqual(stored.target, plan.target)
+        self.assertEqual(stored.factor, plan.factor)
+    
+    def test_cold_converter_reads_store(self):
+        """Test a new converter uses plans stored by another one."""
+        u = uniUnit({'kg': 'g'})
+        source = ureg.Unit('kilogram')
+        self.store.put(u._system_key, ConversionPlan(source, ureg.Unit('gram'), 999.0))
+        self.assertEqual(uniUnit({'kg': 'g'}).compile('kg').factor, 999.0)
+        self.assertEqual(uniUnit({'kg': 'mg'}).compile('kg').factor, 1e6)
+    
+    def test_unusable_path_from_environment(self):
+        """Test an unusable UNIUNIT_PLAN_CACHE disables the store instead of failing the import."""
+        env = dict(os.environ, UNIUNIT_PLAN_CACHE=os.path.join(self.path, 'missing', 'plans.sqlite'))
+        result = subprocess.run(
+            [sys.executable, '-c', 'import uniunit.uniunit as m; print(m._plan_store)'],
+            env=env, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), 'None')
+        self.assertIn('Plan cache', result.stderr)
+    
+    def test_offset_plans_round_trip(self):
+        """Test offset and delta plans are stored separately."""
+        uniUnit({'K': 'degC'}).compile('degF')
+        uniUnit({'K': 'degC'}).compile('degF', delta=True)
+        cold = uniUnit({'K': 'degC'})
+        self.assertAlmostEqual(cold.compile('degF')(212.0), 100.0)
+        self.assertAlmostEqual(cold.compile('degF', delta=True)(18.0), 10.0)
+        self.assertEqual(len(self.store), 2)
+    
+    def test_registry_version(self):
+        """Test the registry version is stable until units are defined."""
+        self.assertEqual(registry_version(), registry_version())
+        self.assertEqual(len(registry_version()), 16)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestArrayConversion(unittest.TestCase):
+    """Test chunked and threaded array conversion."""
+    
+    def test_chunked_threads_match_vectorized(self):
+        """Test chunked parallel conversion matches a single multiplication."""
+        values = np.random.rand(10007)
+        plan = compile_conversion('degF', 'degC')
+        expected = ureg.Quantity(values, 'degF').to('degC').magnitude
+        for workers in (1, 4):
+            result = plan.apply(values, workers=workers, chunk_size=1000)
+            np.testing.assert_allclose(result, expected)
+    
+    def test_out_in_place(self):
+        """Test in-place conversion into the input array."""
+        values = np.arange(6.0).reshape(2, 3)
+        result = compile_conversion('km', 'm').apply(values, out=values, workers=2, chunk_size=2)
+        self.assertTrue(np.shares_memory(result, values))
+        self.assertEqual(values[1, 2], 5000.0)
+    
+    def test_buffer_protocol(self):
+        """Test array.array and bytearray buffers are converted without copies."""
+        plan = compile_conversion('km', 'm')
+        buf = array.array('d', [1.0, 2.0])
+        plan.apply(buf, out=buf)
+        self.assertEqual(list(buf), [1000.0, 2000.0])
+        raw = bytearray(array.array('f', [1.5]).tobytes())
+        plan.apply(raw, out=raw, dtype=np.float32)
+        self.assertEqual(array.array('f', bytes(raw))[0], 1500.0)
+        with self.assertRaises(ValueError):
+            plan.apply(np.ones(3), out=np.empty(2))
+    
+    def test_to_unit_out(self):
+        """Test to_unit writes array Quantities into out."""
+        field = np.ones(4)
+        result = UnitSystem.get_preset('CGS').to_unit(ureg.Quantity(field, 'kg'), out=field, workers=2)
+        self.assertIs(result.magnitude, field)
+        self.assertEqual(str(result.units), 'gram')
+        self.assertEqual(field[0], 1000.0)
+
+    def test_precision_policy(self):
+        """Test float32 arrays stay float32 and precision casts inputs."""
+        cgs = UnitSystem.get_preset('CGS')
+        values = np.arange(5, dtype=np.float32)
+        for precision in (None, 'preserve', 'float32'):
+            result = cgs.to_unit(ureg.Quantity(values, 'N'), precision=precision)
+            self.assertEqual(result.magnitude.dtype, np.float32)
+            self.assertEqual(result.magnitude[2], 2e5)
+        self.assertEqual(cgs.to_unit(ureg.Quantity(np.arange(3), 'N'), precision='preserve').magnitude.dtype,
+                         np.float64)
+        result = compile_conversion('km', 'm').apply(np.ones(3), precision='float32')
+        self.assertEqual(result.dtype, np.float32)
+        with self.assertRaises(ValueError):
+            compile_conversion('km', 'm').apply(np.ones(3), precision='int32')
+
+    def test_relative_error_bound(self):
+        """Test the reported worst-case error bounds float32 conversions."""
+        values = (np.random.rand(100000) * 2000 - 1000).astype(np.float32)
+        for source, target in (('inch', 'mm'), ('degF', 'degC'), ('psi', 'kPa')):
+            plan = compile_conversion(source, target)
+            result = plan.apply(values, precision='float32').astype(np.float64)
+            exact = values.astype(np.float64) * plan.factor + plan.offset
+            scale = np.maximum(np.abs(values * plan.factor), abs(plan.offset))
+            self.assertLessEqual((np.abs(result - exact) / scale).max(), plan.relative_error('float32'))
+        self.assertLess(compile_conversion('inch', 'mm').relative_error('float64'), 1e-15)
+        self.assertEqual(compile_conversion('km', 'm').relative_error(), np.finfo(np.float32).eps / 2)
+
+
+class TestLazyQuantity(unittest.TestCase):
+    """Test deferred conversion pipelines."""
+    
+    def test_steps_folded(self):
+        """Test consecutive conversions fold into one scale and offset."""
+        lazy = LazyQuantity([32.0, 212.0], 'degF').to('degC').to('K')
+        self.assertEqual(lazy.units, ureg.Unit('kelvin'))
+        result = lazy.evaluate()
+        self.assertAlmostEqual(result.magnitude[0], 273.15)
+        self.assertAlmostEqual(result.magnitude[1], 373.15)
+        self.assertAlmostEqual(lazy.plan(50.0), ureg.Quantity(50.0, 'degF').to('K').magnitude)
+    
+    def test_arithmetic(self):
+        """Test scaling and adding scalar Quantities."""
+        lazy = (LazyQuantity([1.0, 2.0], 'm') * 2 / ureg.s + 1 * ureg('km/s')).to('m/s')
+        self.assertEqual(list(lazy.evaluate().magnitude), [1002.0, 1004.0])
+        self.assertAlmostEqual((-LazyQuantity(3.0, 'mm')).to('m').evaluate().magnitude, -0.003)
+        with self.assertRaises(pint.errors.OffsetUnitCalculusError):
+            LazyQuantity([1.0], 'degC') * 2
+        with self.assertRaises(pint.errors.DimensionalityError):
+            LazyQuantity([1.0], 'm') + 1
+    
+    def test_unit_systems(self):
+        """Test to_unit and convert_from stay lazy."""
+        lazy = LazyQuantity([1.0], 'N')
+        result = UnitSystem.get_preset('CGS').convert_from(lazy, UnitSystem.get_preset('SI'))
+        self.assertIsInstance(result, LazyQuantity)
+        self.assertAlmostEqual(result.evaluate().magnitude[0], 1e5)
+    
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_chunked_evaluation_and_stream(self):
+        """Test array evaluation and streaming match eager conversion."""
+        values = np.random.rand(1000)
+        lazy = (LazyQuantity(values, 'mm') * 2).to('inch').to('ft')
+        expected = (ureg.Quantity(values, 'mm') * 2).to('ft').magnitude
+        np.testing.assert_allclose(lazy.evaluate(chunk_size=64).magnitude, expected)
+        chunks = []
+        self.assertEqual(lazy.stream(lambda chunk: chunks.append(chunk.copy()), chunk_size=300), 1000)
+        self.assertEqual(len(chunks), 4)
+        np.testing.assert_allclose(np.concatenate(chunks), expected)
+
+
+class TestRegistryProfiles(unittest.TestCase):
+    """Test slim registries built from domain profiles."""
+    
+    def test_profile_contents(self):
+        """Test a profile holds its units and their dependencies only."""
+        reg = build_registry('mechanics')
+        self.assertAlmostEqual(reg.Quantity(1, 'psi').to('kPa').magnitude, 6.894757, places=5)
+        self.assertAlmostEqual(reg.Quantity(20, 'degC').to('degF').magnitude, 68.0)
+        self.assertIn('standard_gravity', reg)
+        self.assertNotIn('volt', reg)
+        self.assertLess(len(reg._units), len(ureg._units))
+        reg = build_registry('mechanics,electrical', units=['light_year'])
+        self.assertIn('volt', reg)
+        self.assertAlmostEqual(reg.Quantity(1, 'ly').to('km').magnitude, 9.4607304725808e12)
+    
+    def test_unknown_names(self):
+        """Test unknown profiles and units raise ValueError."""
+        with self.assertRaises(ValueError):
+            build_registry('astronomy')
+        with self.assertRaises(ValueError):
+            build_registry(None, units=['not_a_unit'])
+        self.assertLessEqual({'mechanics', 'electrical', 'cn-traditional'}, set(REGISTRY_PROFILES))
+    
+    def test_module_registry_profile(self):
+        """Test importing uniunit with UNIUNIT_REGISTRY_PROFILE."""
+        code = ("import uniunit; "
+                "print(len(uniunit.ureg._units), uniunit.parse_quantity('3斤2两').to('kg').magnitude, "
+                "uniunit.quick_convert(uniunit.Q_(1, 'N'), 'SI', 'CGS').magnitude)")
+        env = dict(os.environ, UNIUNIT_REGISTRY_PROFILE='cn-traditional')
+        env.pop('UNIUNIT_PLAN_CACHE', None)
+        output = subprocess.run([sys.executable, '-c', code], env=env, check=True, capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+        self.assertLess(int(output[0]), len(ureg._units))
+        self.assertAlmostEqual(float(output[1]), 1.6)
+        self.assertAlmostEqual(float(output[2]), 1e5)
+    
+    def test_quantity_alias_shares_registry(self):
+        """Test Q_ builds Quantities of the module registry."""
+        self.assertIs(Q_(1, 'm')._REGISTRY, ureg)
+
+
+class TestDeckConverter(unittest.TestCase):
+    """Test streaming conversion of simulation input decks."""
+    
+    SCHEMA = {
+        '*NODE': [None, 'm', 'm', 'm'],
+        '*MAT_ELASTIC': [None, 'kg/m**3', 'Pa', None],
+        '*MAT_PLASTIC': [[None, '[mass]/[length]**3', 'Pa'], ['Pa', None]],
+    }
+    
+    def test_delimited_deck(self):
+        """Test annotated fields convert and everything else is copied."""
+        converter = DeckConverter(self.SCHEMA, 'SI', 'mmgms')
+        lines = [
+            '$ units: m, kg, s\n', '*NODE\n', '   1, 0.5, 0.25, 0\n', '2 1e-3   2.5\t3\r\n',
+            '*mat_elastic, title\n', '1 7850 2.1e11 0.3\n',
+            '*MAT_PLASTIC\n', '1 7850 2.5e8\n', '2.5e8 7\n', '3e8 8\n',
+            '*CONTROL_TERMINATION\n', '0.01 0 0\n',
+        ]
+        self.assertEqual(list(converter.iter_lines(lines)), [
+            '$ units: m, kg, s\n', '*NODE\n', '   1, 500, 250, 0\n', '2 1   2500\t3000\r\n',
+            '*mat_elastic, title\n', '1 0.00785 210000 0.3\n',
+            '*MAT_PLASTIC\n', '1 0.00785 250\n', '250 7\n', '300 8\n',
+            '*CONTROL_TERMINATION\n', '0.01 0 0\n',
+        ])
+        self.assertIs(converter.plans['kg/m**3'], converter.plans['[mass]/[length]**3'])
+    
+    def test_fixed_width(self):
+        """Test fixed-width fields stay aligned and fit their width."""
+        schema = DeckSchema({'*NODE': [None, 'm', 'm', 'm']}, field_width=8)
+        converter = DeckConverter(schema, 'SI', 'nm_ug_ps')
+        line = '       1     0.5  0.3333       0\n'
+        self.assertEqual(converter.convert_line(line, schema.keywords['*NODE'][0]),
+                         '       1     5e8 3.333e8       0\n')
+    
+    def test_column_widths_per_keyword(self):
+        """Test per-keyword column widths, such as LS-DYNA *NODE (8/16/16/16/8/8)."""
+        schema = DeckSchema({'*NODE': [None, 'm', 'm', 'm'], '*MAT_ELASTIC': [None, 'kg/m**3', 'Pa']},
+                            field_width=10, field_widths={'*node': [8, 16, 16, 16, 8, 8]})
+        converter = DeckConverter(schema, 'SI', 'mmgms')
+        node = '       1             0.5            0.25           -1.25       0       0\n'
+        mat = '         1      7850   2.1e+11\n'
+        self.assertEqual(list(converter.iter_lines(['*NODE\n', node, '*MAT_ELASTIC\n', mat])), [
+            '*NODE\n', '       1             500             250           -1250       0       0\n',
+            '*MAT_ELASTIC\n', '         1   0.00785    210000\n',
+        ])
+        self.assertEqual(converter.convert_line(' 0.5        0.25', ('m', 'm'), columns=[4, 12]),
+                         ' 500         250')
+        with self.assertRaises(ValueError):
+            DeckSchema({}, field_width=[8, 0])
+    
+    def test_files_and_json_schema(self):
+        """Test converting deck files with a JSON schema file."""
+        with tempfile.TemporaryDirectory() as folder:
+            schema_path = os.path.join(folder, 'schema.json')
+            with open(schema_path, 'w') as f:
+                json.dump({'keywords': {'*Density': ['kg/m**3']}, 'comment_prefixes': ['**']}, f)
+            source = os.path.join(folder, 'in.inp')
+            target = os.path.join(folder, 'out.inp')
+            with open(source, 'w', newline='') as f:
+                f.write('** Abaqus\r\n*Material, name=Steel\r\n*Density\r\n7850.,\r\n')
+            self.assertEqual(convert_deck(source, target, schema_path, 'SI', 'mmkgms'), 4)
+            with open(target, newline='') as f:
+                self.assertEqual(f.read(), '** Abaqus\r\n*Material, name=Steel\r\n*Density\r\n7.85e-06,\r\n')
+    
+    def test_constant_memory(self):
+        """Test memory does not grow with the number of lines."""
+        converter = DeckConverter(self.SCHEMA, 'SI', 'mmgms')
+        
+        def deck(n):
+            yield '*NODE\n'
+            for i in range(n):
+                yield f'{i}, 0.5, 0.25, 1.0\n'
+        
+        sink = io.StringIO()
+        peaks = []
+        for n in (2000, 20000):
+            tracemalloc.start()
+            for line in converter.iter_lines(deck(n)):
+                sink.seek(0)
+                sink.write(line)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        self.assertLess(peaks[1], peaks[0] * 2 + 10000)
+
+
+class TestUnitFunction(unittest.TestCase):
+    """Test unit-checked functions."""
+    
+    def test_arguments_and_return(self):
+        """Test Quantities are converted and plain numbers passed through."""
+        @unit_function(args={'force': 'N', 'area': 'm**2'}, ret='Pa', system='mmkgms')
+        def stress(force, area):
+            return force / area
+        
+        self.assertAlmostEqual(stress(2 * ureg.kN, 4 * ureg.cm ** 2).to('Pa').magnitude, 5e6)
+        self.assertAlmostEqual(stress(area=400 * ureg.mm ** 2, force=2000 * ureg.N).to('Pa').magnitude, 5e6)
+        result = stress(2.0, 400.0)
+        self.assertEqual(result.units, stress.__unit_return__)
+        self.assertAlmostEqual(result.to('Pa').magnitude, 5e6)
+        self.assertEqual(stress.__name__, 'stress')
+        with self.assertRaises(pint.errors.DimensionalityError):
+            stress(1 * ureg.m, 1.0)
+    
+    def test_sequence_specs(self):
+        """Test positional specs, dimensions, offsets and tuple returns."""
+        @unit_function(['degC', '[length]', None], ret=('K', None))
+        def scaled(temperature, length, tag):
+            return temperature * length, tag
+        
+        value, tag = scaled(ureg.Quantity(20, 'degC'), 2 * ureg.km, 'x')
+        self.assertAlmostEqual(value.magnitude, 293.15 * 2000)
+        self.assertEqual(tag, 'x')
+        with self.assertRaises(TypeError):
+            unit_function({'mass': 'kg'})(lambda length: length)
+    
+    def test_keyword_only_arguments(self):
+        """Test keyword-only parameters after *args are converted by name only."""
+        @unit_function(args={'a': 'm', 'b': 'm'}, system='mmkgms')
+        def f(a, *rest, b):
+            return a, rest, b
+        
+        a, rest, b = f(1 * ureg.m, 2 * ureg.m, 3, b=4 * ureg.m)
+        self.assertEqual(a, 1000.0)
+        self.assertEqual(rest, (2 * ureg.m, 3))
+        self.assertEqual(b, 4000.0)
+        with self.assertRaises(TypeError):
+            unit_function({'rest': 'm'})(f.__wrapped__)
+    
+    def test_global_switch(self):
+        """Test disabled checks return functions unchanged."""
+        def area(length, width):
+            return length * width
+        
+        previous = set_unit_checks(False)
+        try:
+            self.assertIs(unit_function(('m', 'm'), ret='m**2')(area), area)
+        finally:
+            set_unit_checks(previous)
+        self.assertIsNot(unit_function(('m', 'm'), ret='m**2')(area), area)
+    
+    def test_global_switch_applies_to_decorated_functions(self):
+        """Test the switch is read on each call of functions decorated earlier."""
+        @unit_function(('m', 'm'), ret='m**2', system='mmkgms')
+        def area(length, width):
+            return length * width
+        
+        self.assertEqual(area(1 * ureg.m, 2.0), ureg.Quantity(2000.0, 'mm**2'))
+        previous = set_unit_checks(False)
+        try:
+            self.assertEqual(area(3.0, 2.0), 6.0)
+        finally:
+            set_unit_checks(previous)
+        self.assertEqual(area(3.0, 2.0), ureg.Quantity(6.0, 'mm**2'))
+
+
+class TestGroupToUnit(unittest.TestCase):
+    """Test grouped conversion of mixed-unit lists."""
+    
+    def test_matches_to_unit(self):
+        """Test grouped results equal per-item conversion, in order."""
+        cgs = UnitSystem.get_preset('CGS')
+        items = [1 * ureg.kg, 2 * ureg.mm, ureg.Quantity(20, 'degC'), 5, 3 * ureg.N, 4 * ureg.kg]
+        expected = cgs.to_unit(items)
+        result = cgs.group_to_unit(items)
+        self.assertEqual(len(result), len(expected))
+        for got, want in zip(result, expected):
+            if isinstance(want, pint.Quantity):
+                self.assertEqual(got.units, want.units)
+                self.assertAlmostEqual(got.magnitude, want.magnitude)
+            else:
+                self.assertEqual(got, want)
+    
+    def test_compact_columns(self):
+        """Test the struct-of-arrays result from magnitude and unit columns."""
+        result = UnitSystem.get_preset('SI').group_to_unit([1, 500, 2, 3], ['kg', 'g', 'mm', 'kg'], compact=True)
+        self.assertIsInstance(result, GroupedQuantities)
+        self.assertEqual(list(result.magnitudes), [1.0, 0.5, 0.002, 3.0])
+        self.assertEqual(list(result.codes), [0, 1, 2, 0])
+        self.assertEqual(len(result.units), 3)
+        self.assertEqual(result.units[0], result.units[1])
+        self.assertEqual(list(result.group('m')), [2])
+        self.assertEqual(list(result.group('kg')), [0, 1, 3])
+        self.assertEqual(result[3], 3 * ureg.kg)
+        self.assertEqual(result.to_list()[1], 0.5 * ureg.kg)
+
+
+class TestIterToUnit(unittest.TestCase):
+    """Test lazy conversion of iterables."""
+    
+    def setUp(self):
+        self.u = uniUnit({'kilogram': 'gram', 'meter': 'millimeter'})
+    
+    def test_generator_input(self):
+        """Test generators are converted lazily, matching to_unit."""
+        values = [1 * ureg.kg, 2 * ureg.N, 3 * ureg.N, 4 * ureg.m]
+        results = self.u.iter_to_unit(iter(values), chunk_size=2)
+        self.assertFalse(isinstance(results, list))
+        for result, expected in zip(results, self.u.to_unit(values)):
+            self.assertEqual(result.units, expected.units)
+            self.assertAlmostEqual(result.magnitude, expected.magnitude)
+    
+    def test_unbounded_iterable(self):
+        """Test an endless generator can be consumed item by item."""
+        def endless():
+            while True:
+                yield 1 * ureg.m
+        results = self.u.iter_to_unit(endless())
+        self.assertAlmostEqual(next(results).magnitude, 1000.0)
+        self.assertAlmostEqual(next(results).magnitude, 1000.0)
+    
+    def test_magnitudes_and_passthrough(self):
+        """Test bare magnitudes and non-Quantity items."""
+        self.assertEqual(list(self.u.iter_to_unit((i * ureg.kg for i in range(3)), magnitudes=True)),
+                         [0.0, 1000.0, 2000.0])
+        self.assertEqual(list(UnitSystem.get_preset('SI').iter_to_unit([5, 'x'])), [5, 'x'])
+        with self.assertRaises(ValueError):
+            list(self.u.iter_to_unit([], chunk_size=0))
+
+
+@unit_dataclass(system='mmkgms')
+class _Beam:
+    length: float = unit_field('m')
+    load: float = unit_field('kN', default=0.0)
+    temperature: float = unit_field('degC', default=20.0)
+    name: str = 'beam'
+
+
+class TestUnitDataclass(unittest.TestCase):
+    """Test dataclasses with unit-declared fields."""
+    
+    def test_normalized_on_construction(self):
+        """Test unit fields are converted when an instance is created."""
+        beam = _Beam(2.0, 3.0)
+        self.assertAlmostEqual(beam.length, 2000.0)
+        self.assertAlmostEqual(beam.load, 3.0)
+        self.assertAlmostEqual(beam.temperature, 293.15)
+        self.assertEqual(beam.name, 'beam')
+        self.assertAlmostEqual(_Beam(5 * ureg.cm).length, 50.0)
+    
+    def test_plans_compiled_per_class(self):
+        """Test one plan per unit field is compiled with the class."""
+        self.assertEqual(set(_Beam.__unit_plans__), {'length', 'load', 'temperature'})
+        self.assertIsInstance(_Beam.__unit_plans__['length'], ConversionPlan)
+    
+    def test_bulk_constructors(self):
+        """Test from_rows and from_columns match the constructor."""
+        expected = [_Beam(1.0, 2.0), _Beam(3.0, 4.0)]
+        self.assertEqual(_Beam.from_rows([(1.0, 2.0), (3.0, 4.0)]), expected)
+        self.assertEqual(_Beam.from_rows([{'length': 1.0, 'load': 2.0}, {'length': 3.0, 'load': 4.0}]), expected)
+        self.assertEqual(_Beam.from_columns({'length': [1.0, 3.0], 'load': (2.0, 4.0)}), expected)
+        with self.assertRaises(TypeError):
+            _Beam.from_columns({'width': [1.0]})
+    
+    def test_normalize_on_demand(self):
+        """Test normalize=False keeps raw values until normalized() is called."""
+        @unit_dataclass(system='SI', normalize=False, frozen=True)
+        class Load:
+            pressure: float = unit_field('bar')
+        
+        raw = Load(1.0)
+        self.assertEqual(raw.pressure, 1.0)
+        self.assertAlmostEqual(raw.normalized().pressure, 100000.0)
+        self.assertEqual(raw.pressure, 1.0)
+    
+    def test_replace_converts_only_changes(self):
+        """Test replace() converts changed fields like the constructor and keeps the others."""
+        beam = _Beam(2.0, 1.0).replace(load=5.0, length=3 * ureg.cm)
+        self.assertAlmostEqual(beam.length, 30.0)
+        self.assertAlmostEqual(beam.load, 5.0)
+        self.assertAlmostEqual(beam.temperature, 293.15)
+        self.assertEqual(beam.__replace__(name='b').temperature, beam.temperature)
+        with self.assertRaises(TypeError):
+            beam.replace(width=1.0)
+    
+    def test_decorated_subclass(self):
+        """Test a decorated subclass gains its own unit fields and converts each field once."""
+        @unit_dataclass(system='mmkgms')
+        class WideBeam(_Beam):
+            width: float = unit_field('cm', default=10.0)
+        
+        beam = WideBeam(1.0)
+        self.assertEqual([f.name for f in dataclasses.fields(WideBeam)][-1], 'width')
+        self.assertAlmostEqual(beam.length, 1000.0)
+        self.assertAlmostEqual(beam.width, 100.0)
+        self.assertAlmostEqual(_Beam(1.0).length, 1000.0)
+    
+    def test_columns_of_quantities(self):
+        """Test Quantity columns and elements are converted from their own units."""
+        beams = _Beam.from_columns({'length': [1.0, 50 * ureg.cm], 'load': ureg.Quantity([1.0, 2.0], 'N')})
+        self.assertEqual([b.length for b in beams], [1000.0, 500.0])
+        self.assertAlmostEqual(beams[1].load, 0.002)
+
+
 class TestDerivedUnits(unittest.TestCase):
     """Test derived unit conversions."""
     
@@ -553,6 +1497,68 @@ class TestChineseUnits(unittest.TestCase):
         self.assertIsNotNone(result)
 
 
+class TestChineseCompoundParsing(unittest.TestCase):
+    """Test the Chinese unit tokenizer."""
+    
+    def test_single_unit(self):
+        """Test 3米."""
+        q = parse_quantity('3米')
+        self.assertAlmostEqual(q.to('m').magnitude, 3)
+    
+    def test_compound_mass(self):
+        """Test 3斤2两 = 1.6 kg."""
+        q = parse_quantity('3斤2两')
+        self.assertAlmostEqual(q.magnitude, 3.2)
+        self.assertAlmostEqual(q.to('kg').magnitude, 1.6)
+    
+    def test_signed_compound(self):
+        """Test a leading sign applies to the whole compound measure."""
+        self.assertAlmostEqual(parse_quantity('-3斤2两').magnitude, -3.2)
+        self.assertAlmostEqual(parse_quantity('+3斤2两').magnitude, 3.2)
+        self.assertAlmostEqual(parse_quantity('-3米').magnitude, -3)
+        with self.assertRaises(ValueError):
+            parse_quantity('3斤-2两')
+    
+    def test_compound_length(self):
+        """Test 5丈3尺 = 5.3 丈."""
+        q = parse_quantity('5丈 3尺')
+        self.assertAlmostEqual(q.to('m').magnitude, 5.3 * 10 / 3)
+    
+    def test_traditional_units_defined(self):
+        """Test traditional units convert."""
+        self.assertAlmostEqual(parse_quantity('1亩').to('m**2').magnitude, 666.6667, places=3)
+        self.assertAlmostEqual(parse_quantity('1里').to('m').magnitude, 500)
+        self.assertAlmostEqual(parse_quantity('1平方米').to('cm**2').magnitude, 1e4)
+    
+    def test_matches_pint(self):
+        """Test tokenizer agrees with Pint for single units."""
+        for text in ['3 千米', '2.5 毫升', '7 千瓦时']:
+            self.assertAlmostEqual(parse_quantity(text).to_base_units().magnitude,
+                                   ureg(text).to_base_units().magnitude)
+    
+    def test_mixed_dimensions(self):
+        """Test compound parts must share a dimension."""
+        with self.assertRaises(pint.errors.DimensionalityError):
+            parse_quantity('3斤2米')
+    
+    def test_offset_quantity(self):
+        """Test a number with an offset unit parses as a Quantity of that unit."""
+        q = parse_quantity('20 degC')
+        self.assertEqual((q.magnitude, q.units), (20.0, ureg.degC))
+        self.assertEqual(parse_quantity('-40degF').magnitude, -40.0)
+    
+    def test_fallback_to_pint(self):
+        """Test non-matching strings go through Pint."""
+        q = parse_quantity('3 米 / 秒')
+        self.assertAlmostEqual(q.to('m/s').magnitude, 3)
+    
+    def test_custom_vocabulary(self):
+        """Test compound measures with a custom vocabulary."""
+        parser = CompoundParser({'ft': 'foot', 'in': 'inch'})
+        self.assertAlmostEqual(parser.parse('5 ft 6 in').magnitude, 5.5)
+        self.assertIsNone(parser.parse('5 yd'))
+
+
 class TestUncommonUnitSystems(unittest.TestCase):
     """Test uncommon unit systems."""
     
@@ -813,6 +1819,383 @@ class TestStability(unittest.TestCase):
         self.assertEqual(result.magnitude, -100000)
 
 
+@unittest.skipIf(FastAPI is None, "requires the web app dependencies (app/requirements.txt)")
+class TestLoadShedding(unittest.IsolatedAsyncioTestCase):
+    """Test endpoint concurrency limits, queueing and time budgets."""
+    
+    def setUp(self):
+        import time
+        from app.limits import BudgetExceeded, LoadSheddingMiddleware, current_deadline, settings
+        
+        self.settings = settings
+        self.saved = (settings.enabled, settings.limiters)
+        settings.enabled = True
+        app = FastAPI()
+        app.add_middleware(LoadSheddingMiddleware)
+        
+        @app.get("/slow")
+        def slow(seconds: float = 0.3, check: bool = True):
+            # Runs in a worker thread, stopping at the first check past the budget
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                time.sleep(0.01)
+                if check:
+                    current_deadline().check()
+            return {"ok": True}
+        
+        @app.get("/slow/expired")
+        def expired():
+            raise BudgetExceeded("Request exceeded its time budget")
+        
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        self.settings.enabled, self.settings.limiters = self.saved
+    
+    def limit(self, concurrency, queue, budget):
+        self.settings.configure({"/slow": (concurrency, queue, budget)})
+        return self.settings.match("/slow")
+    
+    async def wait_idle(self, limiter):
+        for _ in range(200):
+            if limiter.active == 0:
+                return
+            await asyncio.sleep(0.01)
+        self.fail("limiter slot was not released")
+    
+    async def test_queue_full_is_rejected(self):
+        """Test a full queue answers 429 with Retry-After while queued requests still run."""
+        limiter = self.limit(1, 1, 5.0)
+        responses = await asyncio.gather(*(self.client.get("/slow") for _ in range(3)))
+        statuses = sorted(r.status_code for r in responses)
+        self.assertEqual(statuses, [200, 200, 429])
+        rejected = next(r for r in responses if r.status_code == 429)
+        self.assertGreaterEqual(int(rejected.headers["retry-after"]), 1)
+        self.assertEqual(limiter.rejected, 1)
+        await self.wait_idle(limiter)
+    
+    async def test_budget_expired(self):
+        """Test requests over budget, running or queued, answer 503 with Retry-After."""
+        limiter = self.limit(1, 1, 0.2)
+        # The running request ignores its deadline, so it holds the slot past the queued one's budget
+        running, queued = await asyncio.gather(self.client.get("/slow?seconds=0.6&check=false"),
+                                               self.client.get("/slow?seconds=0"))
+        self.assertEqual(running.status_code, 503)
+        self.assertEqual(queued.status_code, 503)
+        self.assertIn("retry-after", running.headers)
+        self.assertEqual(limiter.expired, 2)
+        await self.wait_idle(limiter)
+    
+    async def test_slot_released_after_cancelled_thread(self):
+        """Test the slot of a cancelled request is freed once its worker thread stops."""
+        limiter = self.limit(1, 0, 0.2)
+        response = await self.client.get("/slow?seconds=2")
+        self.assertEqual(response.status_code, 503)
+        await self.wait_idle(limiter)
+        self.assertEqual(limiter.waiting, 0)
+        response = await self.client.get("/slow?seconds=0")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(limiter.active, 0)
+    
+    async def test_budget_noticed_by_handler(self):
+        """Test a handler stopping at its deadline check before the budget timer fires gets 503."""
+        limiter = self.limit(1, 0, 5.0)
+        response = await self.client.get("/slow/expired")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(limiter.expired, 1)
+        await self.wait_idle(limiter)
+    
+    async def test_unlimited_paths_pass_through(self):
+        """Test paths without a limiter are not counted."""
+        self.settings.configure({"/other": (1, 0, 0.01)})
+        response = await self.client.get("/slow?seconds=0.05")
+        self.assertEqual(response.status_code, 200)
+
+
+@unittest.skipIf(FastAPI is None or np is None, "requires the web app dependencies (app/requirements.txt)")
+class TestArrayEndpoints(unittest.TestCase):
+    """Test the JSON and binary formats of /api/convert/bulk and /ws/convert."""
+    
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app import routes
+        
+        cls.routes = routes
+        cls.client = TestClient(app)
+    
+    def post_binary(self, body):
+        return self.client.post("/api/convert/bulk", content=body,
+                                headers={"Content-Type": self.routes.BINARY_CONTENT_TYPE})
+    
+    def test_pack_round_trip(self):
+        """Test unpack_array returns the packed header and values, 8-byte aligned."""
+        values = np.array([1.0, 2.5, -3.0])
+        body = self.routes.pack_array({"from_unit": "km", "to_unit": "m"}, values)
+        header, unpacked = self.routes.unpack_array(body)
+        self.assertEqual(header, {"from_unit": "km", "to_unit": "m"})
+        np.testing.assert_array_equal(unpacked, values)
+        self.assertEqual((len(body) - values.nbytes) % 8, 0)
+    
+    def test_binary_float32_preserved(self):
+        """Test binary float32 requests are answered in float32."""
+        values = np.array([1.0, 2.0, 36.0], dtype=np.float32)
+        body = self.routes.pack_array({"from_unit": "km/h", "to_unit": "m/s", "dtype": "float32"}, values)
+        response = self.post_binary(body)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith(self.routes.BINARY_CONTENT_TYPE))
+        header, result = self.routes.unpack_array(response.content)
+        self.assertEqual(result.dtype, np.float32)
+        self.assertEqual(header["count"], 3)
+        self.assertGreater(header["max_relative_error"], 0)
+        np.testing.assert_allclose(result, [1 / 3.6, 2 / 3.6, 10.0], rtol=1e-6)
+    
+    def test_invalid_binary_payloads(self):
+        """Test unknown dtypes and truncated or misaligned payloads answer 400."""
+        values = np.array([1.0, 2.0])
+        body = self.routes.pack_array({"from_unit": "m", "to_unit": "mm"}, values)
+        bad_dtype = self.routes.pack_array({"from_unit": "m", "to_unit": "mm", "dtype": "float16"}, values)
+        for payload in (bad_dtype, body[:6], body[:12], body[:-3], b"XXXX" + body[4:]):
+            response = self.post_binary(payload)
+            self.assertEqual(response.status_code, 400, payload[:16])
+        self.assertIn("float16", self.post_binary(bad_dtype).json()["detail"])
+    
+    def test_json_format(self):
+        """Test JSON requests, including a unit system declaration and bad input."""
+        response = self.client.post("/api/convert/bulk", json={"from_unit": "km", "to_unit": "m", "values": [1, 2.5]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["values"], [1000.0, 2500.0])
+        response = self.client.post("/api/convert/bulk", json={
+            "from_system": "SI", "to_system": "mmkgms", "unit": "Pa", "values": [1e6]})
+        self.assertAlmostEqual(response.json()["values"][0], 1e-3)
+        response = self.client.post("/api/convert/bulk", json={"from_unit": "km", "to_unit": "s", "values": [1]})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/api/convert/bulk", json={"from_unit": "km", "to_unit": "m", "values": [1],
+                                                               "dtype": "int8"})
+        self.assertEqual(response.status_code, 400)
+
+    
+    def test_websocket_stream(self):
+        """Test /ws/convert declarations, JSON and binary frames, and error replies."""
+        with self.client.websocket_connect("/ws/convert") as ws:
+            ws.send_json({"values": [1.0]})
+            self.assertIn("error", ws.receive_json())
+            ws.send_json({"from_unit": "km/h", "to_unit": "m/s"})
+            ready = ws.receive_json()
+            self.assertEqual(ready["status"], "ready")
+            self.assertAlmostEqual(ready["factor"], 1 / 3.6)
+            ws.send_json([36.0, 72.0])
+            self.assertEqual(ws.receive_json()["values"], [10.0, 20.0])
+            ws.send_json({"values": [3.6]})
+            self.assertAlmostEqual(ws.receive_json()["values"][0], 1.0)
+            
+            ws.send_json({"from_system": "SI", "to_system": "mmkgms", "unit": "Pa", "dtype": "float32"})
+            self.assertEqual(ws.receive_json()["status"], "ready")
+            ws.send_bytes(np.array([1e6, 2e6], dtype=np.float32).tobytes())
+            result = np.frombuffer(ws.receive_bytes(), dtype=np.float32)
+            np.testing.assert_allclose(result, [1e-3, 2e-3], rtol=1e-6)
+            
+            ws.send_bytes(b"\x00" * 3)
+            self.assertIn("error", ws.receive_json())
+            ws.send_json({"from_unit": "km", "to_unit": "s"})
+            self.assertIn("error", ws.receive_json())
+
+
+@unittest.skipIf(FastAPI is None, "requires the web app dependencies (app/requirements.txt)")
+class TestConversionTableEndpoint(unittest.TestCase):
+    """Test caching and compression of /api/conversion-table."""
+    
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.routes import conversion_table_url
+        
+        cls.client = TestClient(app)
+        cls.url = conversion_table_url()
+    
+    def test_versioned_url_is_immutable(self):
+        """Test the versioned URL is cached as immutable and the bare URL revalidated."""
+        response = self.client.get(self.url)
+        self.assertIn("immutable", response.headers["cache-control"])
+        self.assertEqual(response.json()["version"], self.url.rsplit("=", 1)[1])
+        self.assertNotIn("immutable", self.client.get("/api/conversion-table").headers["cache-control"])
+    
+    def test_compressed_and_revalidated(self):
+        """Test the table is served gzip-compressed with a per-encoding ETag."""
+        response = self.client.get(self.url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        response = self.client.get(self.url, headers={"Accept-Encoding": "gzip",
+                                                      "If-None-Match": response.headers["etag"]})
+        self.assertEqual(response.status_code, 304)
+
+
+@unittest.skipIf(FastAPI is None, "requires the web app dependencies (app/requirements.txt)")
+class TestStaticAssets(unittest.TestCase):
+    """Test precompressed, fingerprinted static assets."""
+    
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app import assets
+        from app.main import app
+        
+        cls.assets = assets
+        cls.client = TestClient(app)
+    
+    def test_negotiate_encoding(self):
+        """Test br is preferred, q=0 refuses a coding, and * never brings a refused one back."""
+        negotiate = self.assets.negotiate_encoding
+        available = {"identity": b"", "gzip": b"", "br": b""}
+        self.assertEqual(negotiate("gzip, deflate, br", available), "br")
+        self.assertEqual(negotiate("gzip;q=0.5, br;q=0", available), "gzip")
+        self.assertEqual(negotiate("br;q=0, *", available), "gzip")
+        self.assertEqual(negotiate("br;q=0, gzip;q=0, *", available), "identity")
+        self.assertEqual(negotiate("", available), "identity")
+        self.assertEqual(negotiate("br", {"identity": b"", "gzip": b""}), "identity")
+    
+    def test_fingerprint(self):
+        """Test digests are inserted before the extension."""
+        self.assertEqual(self.assets.fingerprint("unit-converter.js", "abc123"), "unit-converter.abc123.js")
+    
+    def test_etag_and_not_modified(self):
+        """Test each encoding has its own ETag and a matching If-None-Match answers 304."""
+        response = self.client.get("/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        etag = response.headers["etag"]
+        self.assertTrue(etag.endswith('-gzip"'))
+        self.assertEqual(response.headers["cache-control"], self.assets.REVALIDATE_CACHE)
+        response = self.client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": f'"x", {etag}'})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get("/", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("content-encoding", response.headers)
+    
+    def test_fingerprinted_urls(self):
+        """Test the page links fingerprinted scripts, served as immutable, and unknown assets 404."""
+        url = self.client.get("/").text.split('src="')[1].split('"')[0]
+        self.assertRegex(url, r"^/static/unit-converter\.[0-9a-f]{12}\.js$")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["cache-control"], self.assets.IMMUTABLE_CACHE)
+        plain = self.client.get("/static/unit-converter.js")
+        self.assertEqual(plain.headers["cache-control"], self.assets.STATIC_CACHE)
+        self.assertEqual(plain.content, response.content)
+        self.assertEqual(self.client.get("/static/missing.js").status_code, 404)
+        self.assertEqual(self.client.get("/static/unit-converter.000000000000.js").status_code, 404)
+
+
+@unittest.skipIf(FastAPI is None, "requires the web app dependencies (app/requirements.txt)")
+class TestServerTiming(unittest.TestCase):
+    """Test Server-Timing headers and their admin switch."""
+    
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.timing import settings
+        
+        cls.client = TestClient(app)
+        cls.settings = settings
+    
+    def setUp(self):
+        self.saved = self.settings.enabled
+    
+    def tearDown(self):
+        self.settings.enabled = self.saved
+    
+    def test_stage_header(self):
+        """Test enabled timing reports each stage and the total, disabled timing adds nothing."""
+        self.settings.enabled = True
+        response = self.client.post("/api/convert", json={"value": 1, "from_unit": "km", "to_unit": "m"})
+        self.assertEqual(response.json()["result"], 1000)
+        stages = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+        self.assertEqual(stages, ["request", "convert", "total"])
+        self.settings.enabled = False
+        response = self.client.post("/api/convert", json={"value": 1, "from_unit": "km", "to_unit": "m"})
+        self.assertNotIn("server-timing", response.headers)
+    
+    def test_admin_switch(self):
+        """Test the runtime switch needs UNIUNIT_ADMIN_TOKEN to be set and sent back."""
+        self.settings.enabled = False
+        environ = {k: v for k, v in os.environ.items() if k != "UNIUNIT_ADMIN_TOKEN"}
+        with unittest.mock.patch.dict(os.environ, environ, clear=True):
+            response = self.client.put("/api/server-timing", json={"enabled": True},
+                                       headers={"X-Admin-Token": ""})
+            self.assertEqual(response.status_code, 403)
+        with unittest.mock.patch.dict(os.environ, {"UNIUNIT_ADMIN_TOKEN": "secret"}):
+            response = self.client.put("/api/server-timing", json={"enabled": True},
+                                       headers={"X-Admin-Token": "wrong"})
+            self.assertEqual(response.status_code, 403)
+            self.assertFalse(self.settings.enabled)
+            response = self.client.put("/api/server-timing", json={"enabled": True},
+                                       headers={"X-Admin-Token": "secret"})
+            self.assertEqual(response.json(), {"enabled": True})
+        self.assertTrue(self.client.get("/api/server-timing").json()["enabled"])
+
+
+@unittest.skipIf(FastAPI is None, "requires the web app dependencies (app/requirements.txt)")
+class TestUnitSystemEndpoint(unittest.TestCase):
+    """Test /api/unit-system conversions."""
+    
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app.main import app
+        
+        cls.client = TestClient(app)
+    
+    def convert(self, value, units):
+        return self.client.post("/api/unit-system", json={"value": value, "units": units})
+    
+    def test_offset_units(self):
+        """Test absolute temperatures convert through the compiled plan."""
+        self.assertEqual(self.convert("20 degC", {"kelvin": "degF"}).json()["result"], "68 degree_Fahrenheit")
+        self.assertEqual(self.convert("20 degC", {"meter": "mm"}).json()["result"], "293.15 kelvin")
+    
+    def test_plain_units(self):
+        """Test quantities and bare numbers (taken as meters) convert to the system."""
+        self.assertEqual(self.convert("3 km", {"meter": "mm"}).json()["result"], "3000000 millimeter")
+        self.assertEqual(self.convert(5, {"meter": "cm"}).json()["result"], "500 centimeter")
+        self.assertEqual(self.convert("3 km", {"meter": "parsec_x"}).status_code, 400)
+
+
+
+@unittest.skipIf(FastAPI is None, "requires the web app dependencies (app/requirements.txt)")
+class TestHealth(unittest.TestCase):
+    """Test readiness reporting while the background warm-up runs."""
+    
+    def test_not_ready_until_warm(self):
+        """Test /health answers 503 while warming up and 200 afterwards, serving requests meanwhile."""
+        import threading
+        import time
+        from fastapi.testclient import TestClient
+        from app import main
+        
+        release = threading.Event()
+        saved = (main.profile.ready, main.profile.ready_after)
+        main.profile.ready = False
+        try:
+            with unittest.mock.patch.object(main, "warm_up", lambda **kwargs: release.wait(5)), \
+                    unittest.mock.patch.dict(os.environ, {"UNIUNIT_WARMUP": "1"}):
+                with TestClient(main.app) as client:
+                    response = client.get("/health")
+                    self.assertEqual(response.status_code, 503)
+                    self.assertEqual(response.json()["status"], "starting")
+                    self.assertEqual(client.get("/api/units/presets/CGS").status_code, 200)
+                    release.set()
+                    deadline = time.monotonic() + 5
+                    while not main.profile.ready and time.monotonic() < deadline:
+                        time.sleep(0.01)
+                    self.assertEqual(client.get("/health").json()["status"], "ok")
+        finally:
+            release.set()
+            main.profile.ready, main.profile.ready_after = saved
+
+
 def run_tests():
     unittest.main(verbosity=2)
 
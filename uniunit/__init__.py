@@ -15,9 +15,6 @@ __version__ = '0.2'
 import pint
 from pint import UnitRegistry, Quantity
 
-ureg = UnitRegistry()
-Q_ = ureg.Quantity
-
 from .uniunit import (
     ureg,
     unit,
@@ -27,6 +24,8 @@ from .uniunit import (
     get_base_unit_with_value,
     simplify_unit,
     check_unit_compatibility,
+    check_unit_compatibility_matrix,
+    get_dimension_vector,
     convert_value,
     create_custom_unit,
     quick_convert,
@@ -34,8 +33,34 @@ from .uniunit import (
     UnitSystem,
     to_unit,
     CHINESE_UNITS,
+    UnitIndex,
+    get_unit_index,
+    CompoundParser,
+    parse_quantity,
+    RegistryOverlay,
+    ConversionPlan,
+    compile_conversion,
+    unit_dataclass,
+    unit_field,
+    PlanStore,
+    set_plan_store,
+    BestUnitIndex,
+    best_unit,
+    UnitCatalogue,
+    get_unit_catalogue,
+    LazyQuantity,
+    REGISTRY_PROFILES,
+    build_registry,
+    DeckSchema,
+    DeckConverter,
+    convert_deck,
+    unit_function,
+    set_unit_checks,
+    GroupedQuantities,
 )
 
+Q_ = ureg.Quantity
+
 __all__ = [
     'ureg',
     'unit',
@@ -46,6 +71,8 @@ __all__ = [
     'get_base_unit_with_value',
     'simplify_unit',
     'check_unit_compatibility',
+    'check_unit_compatibility_matrix',
+    'get_dimension_vector',
     'convert_value',
     'create_custom_unit',
     'quick_convert',
@@ -53,4 +80,28 @@ __all__ = [
     'UnitSystem',
     'to_unit',
     'CHINESE_UNITS',
+    'UnitIndex',
+    'get_unit_index',
+    'CompoundParser',
+    'parse_quantity',
+    'RegistryOverlay',
+    'ConversionPlan',
+    'compile_conversion',
+    'unit_dataclass',
+    'unit_field',
+    'PlanStore',
+    'set_plan_store',
+    'BestUnitIndex',
+    'best_unit',
+    'UnitCatalogue',
+    'get_unit_catalogue',
+    'LazyQuantity',
+    'REGISTRY_PROFILES',
+    'build_registry',
+    'DeckSchema',
+    'DeckConverter',
+    'convert_deck',
+    'unit_function',
+    'set_unit_checks',
+    'GroupedQuantities',
 ]
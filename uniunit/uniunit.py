@@ -21,11 +21,231 @@ Functions:
 
 from __future__ import annotations
 
+import copy
+import dataclasses
+import hashlib
+import inspect
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import tokenize
 import pint
-from functools import lru_cache
-from typing import Dict, Any, Union, List, Tuple, Optional
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+from functools import lru_cache, wraps
+from itertools import islice
+from types import MappingProxyType
+from typing import Dict, Any, Union, List, Tuple, Optional, Mapping, Iterable, Iterator
 
-ureg = pint.UnitRegistry()
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Units every registry needs: the SI base units, the units of the presets
+# and those the custom definitions below are written in
+_CORE_UNITS = (
+    'meter', 'gram', 'second', 'ampere', 'kelvin', 'mole', 'candela',
+    'minute', 'inch', 'foot', 'pound',
+)
+
+# Domain profiles for slim registries: registry units (or aliases) added to
+# the core units. Prefixed names are resolved to their unit and prefix.
+REGISTRY_PROFILES: Dict[str, Tuple[str, ...]] = {
+    'core': (),
+    'mechanics': (
+        'hour', 'day', 'year', 'tonne', 'newton', 'pascal', 'bar', 'joule', 'watt',
+        'hertz', 'radian', 'degree', 'revolutions_per_minute', 'liter', 'degC', 'degF',
+        'yard', 'mile', 'ounce', 'short_ton', 'force_pound', 'kip', 'psi', 'ksi',
+        'BTU', 'horsepower', 'fluid_ounce', 'gallon',
+    ),
+    'electrical': (
+        'hour', 'joule', 'watt', 'watt_hour', 'hertz', 'coulomb', 'volt', 'ohm',
+        'siemens', 'farad', 'henry', 'weber', 'tesla', 'ampere_hour', 'degC',
+    ),
+    'cn-traditional': (
+        'hour', 'day', 'week', 'month', 'year', 'metric_ton', 'hectare', 'liter',
+        'newton', 'pascal', 'bar', 'atmosphere', 'joule', 'calorie', 'watt_hour',
+        'watt', 'degC', 'degF', 'volt', 'ohm',
+    ),
+}
+
+# Prefixes every slim registry defines; prefixes used by the definitions
+# it pulls in are added as needed
+_PROFILE_PREFIXES = (
+    'femto', 'pico', 'nano', 'micro', 'milli', 'centi', 'deci',
+    'hecto', 'kilo', 'mega', 'giga', 'tera',
+)
+
+_DEFINITION_NUMBER = re.compile(r'(?<![\w.])(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_DEFINITION_NAME = re.compile(r'[^\W\d]\w*')
+_DEFINITION_DIMENSION = re.compile(r'\[\w*\]')
+
+
+@lru_cache(maxsize=1)
+def _default_definitions() -> Tuple[Tuple[str, str, str, tuple, tuple], ...]:
+    """
+    Internal cached function: entries of Pint's default definition files.
+    
+    Each entry is (kind, name, line, dependencies, aliases), in file order,
+    with kind one of 'prefix', 'dimension', 'unit' or 'alias'. Groups are
+    flattened; defaults, systems and contexts are left out.
+    """
+    folder = os.path.dirname(pint.__file__)
+    entries = []
+    
+    def load(filename):
+        skipping = False
+        with open(os.path.join(folder, filename), encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                if skipping:
+                    skipping = line != '@end'
+                elif line.startswith('@import'):
+                    load(line.split(None, 1)[1])
+                elif line.startswith(('@defaults', '@system', '@context')):
+                    skipping = True
+                elif line.startswith('@alias'):
+                    name, *aliases = [part.strip() for part in line[len('@alias'):].split('=')]
+                    entries.append(('alias', name, line, (name,), tuple(aliases)))
+                elif not line.startswith(('@group', '@end')):
+                    parts = [part.strip() for part in line.split('=')]
+                    name, expr = parts[0], parts[1].split(';', 1)[0]
+                    aliases = tuple(part for part in parts[2:] if part != '_')
+                    if name.endswith('-'):
+                        entries.append(('prefix', name[:-1], line, (), tuple(a[:-1] for a in aliases)))
+                    elif name.startswith('['):
+                        entries.append(('dimension', name, line,
+                                        tuple(_DEFINITION_DIMENSION.findall(expr)), ()))
+                    else:
+                        expr = _DEFINITION_NUMBER.sub(' ', _DEFINITION_DIMENSION.sub(' ', expr))
+                        entries.append(('unit', name, line, tuple(_DEFINITION_NAME.findall(expr)), aliases))
+    
+    load('default_en.txt')
+    return tuple(entries)
+
+
+def build_registry(
+    profile: Union[str, Iterable[str], None] = 'core',
+    units: Iterable[str] = (),
+    prefixes: Iterable[str] = _PROFILE_PREFIXES,
+) -> pint.UnitRegistry:
+    """
+    Build a slim unit registry holding only the definitions a profile needs.
+    
+    The registry gets the core units, the units of `profile` and `units`,
+    every definition they are written in, the dimensions of those units
+    and the given prefixes (plus any prefix the definitions use). Building
+    it is several times faster than loading Pint's full registry.
+    
+    Args:
+        profile: Name of a REGISTRY_PROFILES entry, several names (an
+                 iterable or a comma-separated string) or None for core only
+        units: Extra unit names, aliases or prefixed names to include
+        prefixes: Prefix names to define (default: femto to tera)
+        
+    Returns:
+        New Pint UnitRegistry
+        
+    Raises:
+        ValueError: If a profile is unknown or a unit is not in Pint's definitions
+        
+    Example:
+        >>> reg = build_registry('mechanics')
+        >>> reg.Quantity(1, 'psi').to('kPa')
+        6.894757293168363 <Unit('kilopascal')>
+    """
+    if isinstance(profile, str):
+        profile = profile.split(',')
+    requested = list(_CORE_UNITS)
+    for name in profile or ():
+        name = name.strip()
+        if name not in REGISTRY_PROFILES:
+            available = ", ".join(REGISTRY_PROFILES)
+            raise ValueError(f"Unknown registry profile '{name}'. Available: {available}")
+        requested.extend(REGISTRY_PROFILES[name])
+    requested.extend(units)
+    
+    entries = _default_definitions()
+    lookup = {}
+    prefix_names = {}
+    for kind, name, _, _, aliases in entries:
+        if kind == 'unit':
+            for alias in (name,) + aliases:
+                lookup.setdefault(alias, name)
+        elif kind == 'prefix':
+            for alias in (name,) + aliases:
+                prefix_names.setdefault(alias, name)
+    by_length = sorted((p for p in prefix_names if p), key=len, reverse=True)
+    
+    def resolve(name):
+        """(prefix, unit) names of `name`, as Pint resolves it"""
+        for candidate in (name, name[:-1] if name.endswith('s') else None):
+            if candidate in lookup:
+                return None, lookup[candidate]
+        for prefix in by_length:
+            if name.startswith(prefix) and len(name) > len(prefix):
+                resolved = resolve(name[len(prefix):])
+                if resolved is not None and resolved[0] is None:
+                    return prefix_names[prefix], resolved[1]
+        return None
+    
+    dependencies = {name: deps for kind, name, _, deps, _ in entries if kind == 'unit'}
+    needed_units = set()
+    needed_prefixes = set(prefixes)
+    pending = [(name, True) for name in requested]
+    while pending:
+        name, explicit = pending.pop()
+        resolved = resolve(name)
+        if resolved is None:
+            if explicit:
+                raise ValueError(f"Unit '{name}' is not in Pint's default definitions")
+            continue
+        prefix, unit_name = resolved
+        if prefix is not None:
+            needed_prefixes.add(prefix)
+        if unit_name not in needed_units:
+            needed_units.add(unit_name)
+            pending.extend((dep, False) for dep in dependencies[unit_name])
+    
+    # Base dimensions come from the units; derived ones need all of theirs
+    dimensions = set()
+    for kind, name, line, _, _ in entries:
+        if kind == 'unit' and name in needed_units:
+            dimensions.update(_DEFINITION_DIMENSION.findall(line.split('=')[1].split(';', 1)[0]))
+    derived = set()
+    changed = True
+    while changed:
+        changed = False
+        for kind, name, _, deps, _ in entries:
+            if kind == 'dimension' and name not in derived and all(d in dimensions for d in deps):
+                derived.add(name)
+                dimensions.add(name)
+                changed = True
+    
+    registry = pint.UnitRegistry(None)
+    for kind, name, line, deps, _ in entries:
+        if ((kind == 'prefix' and name in needed_prefixes)
+                or (kind == 'unit' and name in needed_units)
+                or (kind == 'dimension' and name in derived)
+                or (kind == 'alias' and deps[0] in needed_units)):
+            registry.define(line)
+    return registry
+
+
+# Name of the registry profile in use, or None for Pint's full registry
+REGISTRY_PROFILE = os.environ.get('UNIUNIT_REGISTRY_PROFILE') or None
+
+ureg = build_registry(REGISTRY_PROFILE) if REGISTRY_PROFILE else pint.UnitRegistry()
 Quantity = pint.Quantity
 
 # Add custom units to the registry
@@ -34,6 +254,23 @@ ureg.define('light_minute = 60 * light_second = lmin')
 ureg.define('light_hour = 60 * light_minute = lh')
 ureg.define('light_day = 24 * light_hour = lday')
 
+# Chinese market system (市制) units
+ureg.define('shi_li = 500 * meter')
+ureg.define('shi_zhang = 10 / 3 * meter')
+ureg.define('shi_chi = shi_zhang / 10')
+ureg.define('shi_cun = shi_chi / 10')
+ureg.define('shi_fen = shi_cun / 10')
+ureg.define('shi_jin = 500 * gram')
+ureg.define('shi_liang = shi_jin / 10')
+ureg.define('shi_mu = 10000 / 15 * meter ** 2')
+
+# Area and volume names used by CHINESE_UNITS
+ureg.define('square_meter = meter ** 2')
+ureg.define('square_kilometer = kilometer ** 2')
+ureg.define('square_centimeter = centimeter ** 2')
+ureg.define('square_millimeter = millimeter ** 2')
+ureg.define('cubic_meter = meter ** 3')
+
 # Add Chinese unit aliases
 CHINESE_UNITS = {
     # Length
@@ -46,11 +283,11 @@ CHINESE_UNITS = {
     '纳米': 'nanometer',
     '皮米': 'picometer',
     '飞米': 'femtometer',
-    '里': 'li',
-    '丈': 'zhang',
-    '尺': 'chi',
-    '寸': 'cun',
-    '分长度': 'fen',
+    '里': 'shi_li',
+    '丈': 'shi_zhang',
+    '尺': 'shi_chi',
+    '寸': 'shi_cun',
+    '分长度': 'shi_fen',
     '公分': 'centimeter',
     
     # Mass
@@ -59,8 +296,8 @@ CHINESE_UNITS = {
     '毫克': 'milligram',
     '微克': 'microgram',
     '吨': 'metric_ton',
-    '斤': 'jin',
-    '两': 'liang',
+    '斤': 'shi_jin',
+    '两': 'shi_liang',
     
     # Time
     '秒': 'second',
@@ -77,7 +314,7 @@ CHINESE_UNITS = {
     '平方千米': 'square_kilometer',
     '平方厘米': 'square_centimeter',
     '平方毫米': 'square_millimeter',
-    '亩': 'mu',
+    '亩': 'shi_mu',
     '公顷': 'hectare',
     
     # Volume
@@ -129,12 +366,156 @@ CHINESE_UNITS = {
 }
 
 for chinese, english in CHINESE_UNITS.items():
+    if REGISTRY_PROFILE and not all(name in ureg for name in _DEFINITION_NAME.findall(english)):
+        continue  # left out of the slim registry
     try:
-        ureg.define(f'{chinese} = {english}')
+        target = ureg._units.get(english)
+        if target is not None and not target.is_multiplicative:
+            # An alias of an offset unit must carry the offset itself,
+            # otherwise Pint treats it as a plain scaled unit
+            converter = target.converter
+            ureg.define(f'{chinese} = {converter.scale} * {target.reference}; '
+                        f'offset: {converter.offset}')
+        else:
+            ureg.define(f'{chinese} = {english}')
     except pint.errors.DefinitionError:
         pass
 
 
+class CompoundParser:
+    """
+    Precompiled tokenizer for quantities written as runs of number + unit.
+    
+    Handles single quantities ('3米') and compound measures whose parts
+    share a dimension ('3斤2两', '5丈3尺'), which are summed and returned
+    in the unit of the first part. A leading sign applies to the whole
+    measure ('-3斤2两' is -3.2 斤). Unit factors are resolved once per unit
+    name and cached, so parsing does not go through Pint's expression parser.
+    
+    Attributes:
+        units: Dictionary mapping unit names accepted in text to registry units
+        
+    Example:
+        >>> CompoundParser(CHINESE_UNITS).parse('3斤2两')
+        3.2 <Unit('斤')>
+        >>> CompoundParser({'ft': 'foot', 'in': 'inch'}).parse('5 ft 6 in')
+        5.5 <Unit('foot')>
+    """
+    
+    _NUMBER = r'(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+    
+    def __init__(self, units: Dict[str, str]):
+        """
+        Initialize the parser with a unit vocabulary.
+        
+        Args:
+            units: Dictionary mapping names accepted in text to registry units.
+                   Names defined in the registry themselves are used directly.
+        """
+        self.units = dict(units)
+        names = sorted(self.units, key=len, reverse=True)
+        alternatives = '|'.join(re.escape(name) for name in names)
+        self._token = re.compile(rf'\s*([-+]?)({self._NUMBER})\s*({alternatives})\s*')
+        self._resolved = {}
+    
+    def _resolve(self, name: str) -> tuple:
+        """Internal cached function: (unit, si_factor, dims_key, multiplicative) of a name."""
+        if name in self._resolved:
+            return self._resolved[name]
+        expr = name if name in ureg._units else self.units[name]
+        factor, root = _si_scale(expr)
+        units = _parse_units(expr)
+        resolved = (units, factor, _dimensions_key(root), ureg._units[expr].is_multiplicative
+                    if expr in ureg._units else True)
+        self._resolved[name] = resolved
+        return resolved
+    
+    def parse(self, text: str) -> Optional[pint.Quantity]:
+        """
+        Parse `text` into a Quantity.
+        
+        Args:
+            text: Text such as '3斤2两' or '5丈 3尺'
+            
+        Returns:
+            Quantity in the unit of the first part, or None if `text`
+            is not made entirely of number + unit tokens
+            
+        Raises:
+            pint.errors.DimensionalityError: If compound parts have different dimensions
+            ValueError: If a compound measure contains an offset unit, or a
+                        sign on a part other than the first
+        """
+        parts = []
+        pos = 0
+        negative = False
+        while pos < len(text):
+            match = self._token.match(text, pos)
+            if match is None:
+                return None
+            if match.group(1):
+                if parts:
+                    raise ValueError(f"Only the first part of '{text}' can carry a sign")
+                negative = match.group(1) == '-'
+            parts.append((float(match.group(2)), match.group(3)))
+            pos = match.end()
+        if not parts:
+            return None
+        
+        value, name = parts[0]
+        units, factor, dims, multiplicative = self._resolve(name)
+        if len(parts) == 1:
+            return ureg.Quantity(-value if negative else value, units)
+        if not multiplicative:
+            raise ValueError(f"Offset unit '{name}' cannot be part of a compound measure")
+        
+        total = value * factor
+        for part_value, part_name in parts[1:]:
+            part_units, part_factor, part_dims, part_multiplicative = self._resolve(part_name)
+            if part_dims != dims:
+                raise pint.errors.DimensionalityError(units, part_units)
+            if not part_multiplicative:
+                raise ValueError(f"Offset unit '{part_name}' cannot be part of a compound measure")
+            total += part_value * part_factor
+        if negative:
+            total = -total
+        return ureg.Quantity(total / factor, units)
+
+
+chinese_parser = CompoundParser(CHINESE_UNITS)
+
+
+def parse_quantity(text: str) -> pint.Quantity:
+    """
+    Parse a quantity string.
+    
+    Strings made of number + Chinese unit runs ('3斤2两') take the
+    precompiled tokenizer path; anything else is parsed by Pint. A number
+    followed by an offset unit ('20 degC'), which Pint refuses to multiply,
+    is read as a Quantity of that unit.
+    
+    Args:
+        text: Quantity string, e.g. '100 kg', '5丈3尺', '20 degC'
+        
+    Returns:
+        Parsed Quantity
+    """
+    if not text.isascii():
+        quantity = chinese_parser.parse(text)
+        if quantity is not None:
+            return quantity
+    try:
+        return ureg(text)
+    except pint.errors.OffsetUnitCalculusError:
+        match = _LEADING_NUMBER.match(text)
+        if match is None:
+            raise
+        return ureg.Quantity(float(match.group(1)), match.group(2))
+
+
+_LEADING_NUMBER = re.compile(rf'\s*([-+]?{CompoundParser._NUMBER})\s*(\S.*?)\s*$')
+
+
 # Create a function that allows simple unit access
 class _UnitShortcut:
     """Allow accessing units like: km, kg, m, s directly"""
@@ -147,7 +528,7 @@ class _UnitShortcut:
     
     def __call__(self, value: str):
         """Allow calling unit('100 kg') like ureg('100 kg')"""
-        return ureg(value)
+        return parse_quantity(value)
 
 
 unit = _UnitShortcut()
@@ -230,6 +611,110 @@ def check_unit_compatibility(
     return unit1.is_compatible_with(unit2)
 
 
+@lru_cache(maxsize=4096)
+def _parse_units(expr: str) -> pint.Unit:
+    """
+    Internal cached function: parse a unit string into a Unit.
+    Any numeric factor in the expression (e.g. '15 * minute') is dropped.
+    Offset units inside compound units ('degC/s') parse as their deltas.
+    """
+    try:
+        parsed = ureg(expr)
+    except pint.errors.OffsetUnitCalculusError:
+        return ureg.parse_units(expr)
+    if isinstance(parsed, pint.Quantity):
+        return parsed.units
+    return ureg.dimensionless
+
+
+def _as_units(uin: Union[pint.Quantity, pint.Unit, str]) -> pint.Unit:
+    """Internal helper: return the Unit of a Quantity, Unit or unit string."""
+    if isinstance(uin, pint.Quantity):
+        return uin.units
+    if isinstance(uin, str):
+        return _parse_units(uin)
+    return uin
+
+
+@lru_cache(maxsize=4096)
+def _dimensions_key(units: pint.Unit) -> tuple:
+    """
+    Internal cached function: compute the dimension tuple of a Unit.
+    Format matches uniUnit._get_target_unit: (('[length]', 1), ('[time]', -2))
+    """
+    return tuple(sorted(dict(units.dimensionality).items()))
+
+
+@lru_cache(maxsize=4096)
+def _si_scale(expr: str) -> Tuple[float, pint.Unit]:
+    """
+    Internal cached function: return (factor, root_unit) such that one
+    `expr` equals `factor` root_unit, e.g. 'gram' -> (0.001, kilogram).
+    Numeric factors in the expression are kept ('15 * minute' -> 900 s).
+    """
+    parsed = ureg(expr)
+    if not isinstance(parsed, pint.Quantity):
+        return float(parsed), ureg.dimensionless
+    factor, root = ureg.get_base_units(parsed.units)
+    return parsed.magnitude * factor, root
+
+
+def get_dimension_vector(
+    quantity: Union[pint.Quantity, pint.Unit, str]
+) -> Tuple[float, ...]:
+    """
+    Return the exponents of `quantity` over the seven base dimensions.
+    
+    Args:
+        quantity: A Pint Quantity, Unit or unit string
+        
+    Returns:
+        Tuple of exponents ordered as BASE_DIMENSIONS
+        e.g., (1, -1, -2, 0, 0, 0, 0) for Pascal
+        
+    Raises:
+        ValueError: If the unit has a dimension outside the seven base dimensions
+    """
+    dims = dict(_dimensions_key(_as_units(quantity)))
+    extra = set(dims) - set(BASE_DIMENSIONS)
+    if extra:
+        raise ValueError(f"Unit has non-base dimensions: {', '.join(sorted(extra))}")
+    return tuple(dims.get(dim, 0) for dim in BASE_DIMENSIONS)
+
+
+def check_unit_compatibility_matrix(
+    candidates: List[Union[pint.Quantity, pint.Unit, str]],
+    references: List[Union[pint.Quantity, pint.Unit, str]]
+) -> List[List[bool]]:
+    """
+    Check many units against many reference units at once.
+    
+    Dimensions are computed once per distinct unit and cached, so
+    repeated unit strings cost a dictionary lookup instead of a Pint call.
+    
+    Args:
+        candidates: N Quantities, Units or unit strings to check
+        references: M Quantities, Units or unit strings to check against
+        
+    Returns:
+        N x M nested list, True where candidate i is compatible with reference j
+        
+    Example:
+        >>> check_unit_compatibility_matrix(['km', 'kg', 'N'], ['m', 'kg*m/s**2'])
+        [[True, False], [False, False], [False, True]]
+    """
+    ref_keys = [_dimensions_key(_as_units(ref)) for ref in references]
+    rows = {}
+    matrix = []
+    for candidate in candidates:
+        key = _dimensions_key(_as_units(candidate))
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = [key == ref_key for ref_key in ref_keys]
+        matrix.append(list(row))
+    return matrix
+
+
 def convert_value(
     value: float, 
     from_unit: Union[pint.Unit, str], 
@@ -251,343 +736,2206 @@ def convert_value(
     return converted.magnitude
 
 
-DIMENSION_TO_BASE_UNIT = {
-    '[mass]': 'kilogram',
-    '[length]': 'meter',
-    '[time]': 'second',
-    '[current]': 'ampere',
-    '[temperature]': 'kelvin',
-    '[amount]': 'mole',
-    '[luminosity]': 'candela',
-}
-
-BASE_UNIT_TO_DIMENSION = {v: k for k, v in DIMENSION_TO_BASE_UNIT.items()}
-
-# Short name to full dimension mapping for conv_dict
-SHORT_TO_DIMENSION = {
-    # Short names
-    'kg': '[mass]',
-    'g': '[mass]',
-    'mg': '[mass]',
-    'ug': '[mass]',
-    'm': '[length]',
-    'cm': '[length]',
-    'mm': '[length]',
-    'um': '[length]',
-    'nm': '[length]',
-    'pm': '[length]',
-    'fm': '[length]',
-    'km': '[length]',
-    'dm': '[length]',
-    's': '[time]',
-    'ms': '[time]',
-    'us': '[time]',
-    'ns': '[time]',
-    'ps': '[time]',
-    'A': '[current]',
-    'mA': '[current]',
-    'uA': '[current]',
-    'nA': '[current]',
-    'K': '[temperature]',
-    'mol': '[amount]',
-    'mmol': '[amount]',
-    'kmol': '[amount]',
-    'cd': '[luminosity]',
-    # Full names (lowercase)
-    'kilogram': '[mass]',
-    'gram': '[mass]',
-    'meter': '[length]',
-    'centimeter': '[length]',
-    'millimeter': '[length]',
-    'second': '[time]',
-    'ampere': '[current]',
-    'kelvin': '[temperature]',
-    'mole': '[amount]',
-    'candela': '[luminosity]',
-}
-
-# Reverse mapping: dimension to short base unit name
-DIMENSION_TO_SHORT = {
-    '[mass]': 'kg',
-    '[length]': 'm',
-    '[time]': 's',
-    '[current]': 'A',
-    '[temperature]': 'K',
-    '[amount]': 'mol',
-    '[luminosity]': 'cd',
-}
-
-
-class UnitSystem:
+class ConversionPlan:
     """
-    Represents a complete system of units.
+    A compiled conversion between two units: target = source * factor + offset.
     
-    A UnitSystem defines a complete mapping from base SI units 
-    to desired output units.
+    Applying a plan is a single multiply (and add, for offset units such as
+    degC), with no unit parsing or Pint conversion, so one plan can be
+    reused for any number of values.
     
     Attributes:
-        name: Name of the unit system
-        units: Dictionary mapping base units to their names in this system
+        source: Source Unit
+        target: Target Unit
+        factor: Multiplier from source magnitudes to target magnitudes
+        offset: Value added after scaling, non-zero only for absolute
+                conversions involving offset units
         
     Example:
-        >>> si = UnitSystem("SI", {'kilogram': 'kilogram', 'meter': 'meter', 'second': 'second'})
+        >>> plan = compile_conversion('km/h', 'm/s')
+        >>> plan(36.0)
+        10.0
+        >>> compile_conversion('degC', 'degF')(100.0)
+        212.0
     """
     
-    PRESETS: Dict[str, Dict[str, str]] = {}
+    __slots__ = ('source', 'target', 'factor', 'offset')
     
-    def __init__(self, name: str, units: Dict[str, str], description: str = ""):
-        """
-        Initialize a unit system.
-        
-        Args:
-            name: Name of the unit system
-            units: Dictionary mapping base SI units to output units
-            description: Optional description
-        """
-        self.name = name
-        self.units = units
-        self.description = description
-        self._ureg = ureg
-        self._converter = uniUnit(units)
+    def __init__(self, source: pint.Unit, target: pint.Unit, factor: float, offset: float = 0.0):
+        self.source = source
+        self.target = target
+        self.factor = factor
+        self.offset = offset
     
     def __repr__(self) -> str:
-        return f"UnitSystem('{self.name}', {self.units})"
-    
-    def __str__(self) -> str:
-        return f"UnitSystem: {self.name}"
+        if self.offset:
+            return (f"ConversionPlan('{self.source}' -> '{self.target}', "
+                    f"factor={self.factor!r}, offset={self.offset!r})")
+        return f"ConversionPlan('{self.source}' -> '{self.target}', factor={self.factor!r})"
     
-    @classmethod
-    def register_preset(cls, name: str, units: Dict[str, str], description: str = "") -> None:
+    def __call__(self, magnitude: Any) -> Any:
         """
-        Register a unit system as a preset.
-        
-        Args:
-            name: Name of the preset
-            units: Unit mapping dictionary
-            description: Optional description
+        Convert a magnitude, or a list/tuple of magnitudes, from source to target units.
+        NumPy arrays are converted in one vectorized operation.
         """
-        cls.PRESETS[name] = units
+        factor = self.factor
+        offset = self.offset
+        if isinstance(magnitude, (list, tuple)):
+            if offset:
+                return [value * factor + offset for value in magnitude]
+            return [value * factor for value in magnitude]
+        if offset:
+            return magnitude * factor + offset
+        return magnitude * factor
     
-    @classmethod
-    def get_preset(cls, name: str) -> "UnitSystem":
+    def apply(
+        self,
+        values: Any,
+        out: Any = None,
+        workers: Optional[int] = None,
+        chunk_size: int = 1 << 18,
+        dtype: Any = None,
+        precision: Any = None
+    ) -> Any:
         """
-        Get a preset unit system by name.
+        Convert a large array in cache-sized chunks, optionally on a thread pool.
+        
+        NumPy releases the GIL for elementwise arithmetic, so chunks convert
+        in parallel. Buffer-protocol objects (array.array, memoryview,
+        bytearray) are viewed without copying, and `out` may be the input
+        itself for in-place conversion. Requires NumPy.
+        
+        With a `precision` policy, values, factor and offset are all cast to
+        that precision, so float32 data stays float32 end to end; see
+        relative_error() for the accuracy this costs.
         
         Args:
-            name: Name of the preset
+            values: ndarray or buffer-protocol object
+            out: Destination ndarray or writable buffer of the same length;
+                 a new array is allocated if omitted
+            workers: Number of threads; default os.cpu_count(), 1 for serial
+            chunk_size: Elements per chunk
+            dtype: Element type for raw byte buffers (default float64)
+            precision: None to keep float inputs as they are (integers become
+                       float64), 'preserve' to also apply the factor in the
+                       input's float precision, or a float dtype such as
+                       'float32' to convert at
             
         Returns:
-            UnitSystem object
+            ndarray of converted values (a view of `out` when given)
             
-        Raises:
-            KeyError: If preset not found
-        """
-        if name not in cls.PRESETS:
-            available = ", ".join(cls.PRESETS.keys()) if cls.PRESETS else "none"
-            raise KeyError(f"Preset '{name}' not found. Available: {available}")
-        return cls(name, cls.PRESETS[name])
-    
-    @classmethod
-    def list_presets(cls) -> List[str]:
-        """List all available preset names."""
-        return list(cls.PRESETS.keys())
-    
-    def to_unit(self, uin: Union[pint.Quantity, float, int]) -> pint.Quantity:
+        Example:
+            >>> buf = array.array('d', [1.0, 2.0])
+            >>> compile_conversion('km', 'm').apply(buf, out=buf)
+            array([1000., 2000.])
+            >>> compile_conversion('km', 'm').apply(np.ones(2), precision='float32')
+            array([1000., 1000.], dtype=float32)
         """
-        Convert input to this unit system.
+        if np is None:
+            raise ImportError("ConversionPlan.apply requires numpy")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        source = _as_array(values, dtype)
+        factor, offset = self.factor, self.offset
+        if precision is not None:
+            work = _precision_dtype(precision, source.dtype)
+            source = source.astype(work, copy=False)
+            factor, offset = work.type(factor), work.type(offset)
+        if out is None:
+            result = np.empty(source.shape, dtype=np.result_type(source.dtype, np.float64)
+                              if source.dtype.kind in 'iub' else source.dtype)
+        else:
+            result = _as_array(out, dtype)
+            if result.shape != source.shape:
+                if result.size != source.size:
+                    raise ValueError(f"out has {result.size} elements, expected {source.size}")
+                result = result.reshape(source.shape)
         
-        Args:
-            uin: Input value with units (or just a number)
-            
-        Returns:
-            Value in this unit system
-        """
-        return self._converter.to_unit(uin)
-    
-    def get_new_unit(self, uin: pint.Unit) -> pint.Unit:
-        """Get the unit representation in this system."""
-        return self._converter.get_new_unit(uin)
+        if not (source.flags.c_contiguous and result.flags.c_contiguous):
+            _apply_chunk(source, result, factor, offset)
+            return result
+        flat_source = source.reshape(-1)
+        flat_result = result.reshape(-1)
+        bounds = [(start, min(start + chunk_size, flat_source.size))
+                  for start in range(0, flat_source.size, chunk_size)]
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1 or len(bounds) <= 1:
+            for start, stop in bounds:
+                _apply_chunk(flat_source[start:stop], flat_result[start:stop], factor, offset)
+        else:
+            with ThreadPoolExecutor(min(workers, len(bounds))) as pool:
+                list(pool.map(lambda b: _apply_chunk(flat_source[b[0]:b[1]], flat_result[b[0]:b[1]],
+                                                     factor, offset), bounds))
+        return result
     
-    def convert_from(self, uin: pint.Quantity, source_system: "UnitSystem") -> pint.Quantity:
+    def relative_error(self, precision: Any = 'float32') -> float:
         """
-        Convert from another unit system to this one.
+        Worst-case relative error of applying this plan at a float precision.
+        
+        Covers rounding the factor (and offset) to `precision` and rounding
+        each operation, for inputs exactly representable at that precision.
+        For offset plans the error is relative to the larger of
+        |value * factor| and |offset|, as results near zero have no
+        relative bound. Requires NumPy.
         
         Args:
-            uin: Value in source system
-            source_system: Source unit system
+            precision: Float dtype, e.g. 'float32' or np.float64
             
         Returns:
-            Value converted to this system
+            Upper bound of the relative error (inf if the factor overflows)
+            
+        Example:
+            >>> compile_conversion('inch', 'mm').relative_error('float32')
+            7.46231387863663e-08
         """
-        si_value = source_system.to_unit(uin)
-        return self.to_unit(si_value)
+        if np is None:
+            raise ImportError("ConversionPlan.relative_error requires numpy")
+        dtype = np.dtype(precision)
+        if dtype.kind != 'f':
+            raise ValueError(f"precision must be a float dtype, got {dtype}")
+        unit_roundoff = float(np.finfo(dtype).eps) / 2
+        
+        def rounding(value):
+            with np.errstate(over='ignore'):
+                rounded = float(dtype.type(value))
+            return abs(rounded - value) / abs(value) if value else 0.0
+        
+        factor_error = rounding(self.factor)
+        error = factor_error + unit_roundoff + factor_error * unit_roundoff
+        if self.offset:
+            offset_error = rounding(self.offset)
+            error += offset_error + 2 * unit_roundoff * (1 + max(error, offset_error))
+        return error
+    
+    def quantity(self, magnitude: Any) -> pint.Quantity:
+        """Convert a magnitude and return it as a Quantity in target units."""
+        return ureg.Quantity(self(magnitude), self.target)
 
 
-class uniUnit:
-    """
-    Main class for conversion between systems of units.
-    
-    This class handles the conversion of values from one unit system
-    to another. It works by first converting to base SI units, then
-    to the target unit system.
+def _apply_chunk(source: Any, result: Any, factor: Any, offset: Any) -> None:
+    """Internal function: convert one chunk into its destination."""
+    np.multiply(source, factor, out=result)
+    if offset:
+        np.add(result, offset, out=result)
+
+
+def _precision_dtype(precision: Any, dtype: Any) -> Any:
+    """Internal helper: dtype to convert values of `dtype` at under a precision policy."""
+    if isinstance(precision, str) and precision == 'preserve':
+        return dtype if dtype.kind == 'f' else np.dtype(np.float64)
+    work = np.dtype(precision)
+    if work.kind != 'f':
+        raise ValueError(f"precision must be 'preserve' or a float dtype, got {work}")
+    return work
+
+
+def _fast_quantity(magnitude: Any, units: pint.Unit) -> pint.Quantity:
+    """Internal helper: Quantity of a number or ndarray, skipping the checks of Pint's constructor."""
+    if type(magnitude) in (float, int) or (np is not None and type(magnitude) is np.ndarray):
+        quantity = object.__new__(ureg.Quantity)
+        quantity._magnitude = magnitude
+        quantity._units = units._units
+        return quantity
+    return ureg.Quantity(magnitude, units)
+
+
+def _as_array(values: Any, dtype: Any = None) -> Any:
+    """
+    Internal helper: view an ndarray or buffer-protocol object as an ndarray
+    without copying. Untyped byte buffers are read as `dtype` (default float64).
+    """
+    if isinstance(values, np.ndarray):
+        return values
+    view = memoryview(values)
+    if view.format in ('B', 'b', 'c') or dtype is not None:
+        return np.frombuffer(values, dtype=dtype or np.float64)
+    return np.asarray(view)
+
+
+def _is_offset_unit(units: pint.Unit) -> bool:
+    """Internal helper: True for a lone offset unit such as degC, which Pint converts as absolute."""
+    return not ureg.Quantity(1, units)._is_multiplicative
+
+
+def _compile_plan(
+    source: pint.Unit,
+    target: Union[pint.Unit, pint.Quantity],
+    delta: bool = False
+) -> ConversionPlan:
+    """
+    Internal function: build a ConversionPlan between two units.
+    
+    A lone offset unit (degC, degF, 摄氏度) is converted as an absolute
+    temperature unless `delta` is True. Offset units inside compound units
+    (degC/s) are always temperature differences, as in Pint.
+    
+    Raises:
+        pint.errors.DimensionalityError: If the units are not compatible
+    """
+    if isinstance(target, pint.Quantity):
+        target = target.units
+    if _dimensions_key(source) != _dimensions_key(target):
+        raise pint.errors.DimensionalityError(source, target)
+    source_absolute = _is_offset_unit(source)
+    target_absolute = _is_offset_unit(target)
+    if not (source_absolute or target_absolute):
+        return ConversionPlan(source, target, ureg.convert(1.0, source, target))
+    
+    # Offset units are defined by short decimals and fractions (degF: 5/9 K,
+    # offset 233.15 + 200/9): combining them as rationals keeps degC -> degF
+    # at exactly factor 1.8, offset 32
+    source_scale = _rational(ureg.get_base_units(source)[0])
+    target_scale = _rational(ureg.get_base_units(target)[0])
+    factor = float(source_scale / target_scale)
+    if delta:
+        return ConversionPlan(source, target, factor)
+    source_zero = _rational(ureg.Quantity(0.0, source).to_base_units().magnitude) if source_absolute else 0
+    target_zero = _rational(ureg.Quantity(0.0, target).to_base_units().magnitude) if target_absolute else 0
+    return ConversionPlan(source, target, factor, float((source_zero - target_zero) / target_scale))
+
+
+def _rational(value: float) -> Fraction:
+    """Internal helper: the simplest fraction that rounds to `value` (exact value if none is simple)."""
+    simple = Fraction(value).limit_denominator(1000000)
+    return simple if float(simple) == value else Fraction(value)
+
+
+@lru_cache(maxsize=4096)
+def _compile_conversion_cached(from_unit: str, to_unit: str, delta: bool) -> ConversionPlan:
+    return _compile_plan(_parse_units(from_unit), _parse_units(to_unit), delta)
+
+
+def compile_conversion(
+    from_unit: Union[pint.Unit, str],
+    to_unit: Union[pint.Unit, str],
+    delta: bool = False
+) -> ConversionPlan:
+    """
+    Compile a conversion between two units into a reusable plan.
+    
+    Plans for unit strings are cached.
+    
+    Args:
+        from_unit: Source unit
+        to_unit: Target unit
+        delta: Treat offset units (degC, degF) as temperature differences
+               instead of absolute temperatures
+        
+    Returns:
+        ConversionPlan
+        
+    Raises:
+        pint.errors.DimensionalityError: If the units are not compatible
+        
+    Example:
+        >>> plan = compile_conversion('kg', 'g')
+        >>> plan([1, 2.5])
+        [1000.0, 2500.0]
+        >>> compile_conversion('degC', 'K')(20.0)
+        293.15
+        >>> compile_conversion('degC', 'K', delta=True)(20.0)
+        20.0
+    """
+    if isinstance(from_unit, str) and isinstance(to_unit, str):
+        return _compile_conversion_cached(from_unit, to_unit, delta)
+    return _compile_plan(_as_units(from_unit), _as_units(to_unit), delta)
+
+
+class LazyQuantity:
+    """
+    A deferred conversion of (large) array magnitudes.
+    
+    Conversions (to, to_system) and scalings (* and / by numbers or
+    scalar Quantities, + and - of scalar Quantities) are only recorded:
+    they are folded into one affine transform, value * scale + offset,
+    so a multi-hop pipeline evaluates in a single chunked pass over the
+    data, with no intermediate arrays and no Pint calls per step.
+    UnitSystem.to_unit and convert_from return a LazyQuantity when given one.
     
     Attributes:
-        _udict: Dictionary mapping base units to target units
+        source: Source magnitudes (ndarray, buffer, list or number)
+        source_units: Units of `source`
+        units: Units of the result
+        scale: Folded multiplier
+        offset: Folded offset, added after scaling
         
     Example:
-        >>> conv_dict = {'kilogram': 'gram', 'meter': 'millimeter', 'second': 'second'}
-        >>> myunit = uniUnit(conv_dict)
-        >>> myunit.to_unit(100 * ureg.kg)
-        100000.0 <Unit('gram')>
+        >>> lazy = LazyQuantity(np.array([32.0, 212.0]), 'degF')
+        >>> lazy.to('degC').to('K').evaluate()
+        <Quantity([273.15 373.15], 'kelvin')>
+        >>> (LazyQuantity(field, 'mm') * 2).to('m').stream(sink)
     """
     
-    def __init__(self, udict: Dict[str, str]):
+    __slots__ = ('source', 'source_units', 'units', 'scale', 'offset')
+    
+    def __init__(
+        self,
+        magnitude: Any,
+        units: Union[pint.Unit, str],
+        scale: float = 1.0,
+        offset: float = 0.0,
+        _current: Optional[pint.Unit] = None
+    ):
+        self.source = magnitude
+        self.source_units = _as_units(units)
+        self.units = self.source_units if _current is None else _current
+        self.scale = scale
+        self.offset = offset
+    
+    @classmethod
+    def from_quantity(cls, quantity: pint.Quantity) -> "LazyQuantity":
+        """Defer the conversion of an existing Quantity."""
+        return cls(quantity.magnitude, quantity.units)
+    
+    def __repr__(self) -> str:
+        return (f"LazyQuantity('{self.source_units}' -> '{self.units}', "
+                f"scale={self.scale!r}, offset={self.offset!r})")
+    
+    def _then(self, factor: float, offset: float, units: pint.Unit) -> "LazyQuantity":
+        """Internal function: compose value * factor + offset after the recorded steps."""
+        return LazyQuantity(self.source, self.source_units, self.scale * factor,
+                            self.offset * factor + offset, units)
+    
+    def to(self, target: Union[pint.Unit, str], delta: bool = False) -> "LazyQuantity":
+        """Record a conversion to `target` units (see compile_conversion)."""
+        plan = compile_conversion(self.units, target, delta)
+        return self._then(plan.factor, plan.offset, plan.target)
+    
+    def to_system(self, system: Union[str, "UnitSystem", "uniUnit"]) -> "LazyQuantity":
+        """Record a conversion into a unit system (preset name, UnitSystem or uniUnit)."""
+        if isinstance(system, str):
+            system = UnitSystem.get_preset(system)
+        plan = system.compile(self.units)
+        return self._then(plan.factor, plan.offset, plan.target)
+    
+    def _scaled(self, other: Any, divide: bool) -> "LazyQuantity":
+        if _is_offset_unit(self.units):
+            raise pint.errors.OffsetUnitCalculusError(self.units)
+        if isinstance(other, pint.Quantity):
+            if _is_offset_unit(other.units):
+                raise pint.errors.OffsetUnitCalculusError(other.units)
+            magnitude, units = other.magnitude, other.units
+        elif isinstance(other, pint.Unit):
+            magnitude, units = 1.0, other
+        else:
+            magnitude, units = other, None
+        if divide:
+            factor = 1.0 / magnitude
+            units = self.units if units is None else self.units / units
+        else:
+            factor = magnitude
+            units = self.units if units is None else self.units * units
+        return self._then(factor, 0.0, units)
+    
+    def __mul__(self, other: Any) -> "LazyQuantity":
+        return self._scaled(other, divide=False)
+    
+    __rmul__ = __mul__
+    
+    def __truediv__(self, other: Any) -> "LazyQuantity":
+        return self._scaled(other, divide=True)
+    
+    def __neg__(self) -> "LazyQuantity":
+        return self._then(-1.0, 0.0, self.units)
+    
+    def __add__(self, other: Union[pint.Quantity, float]) -> "LazyQuantity":
+        if isinstance(other, pint.Quantity):
+            value = compile_conversion(other.units, self.units, delta=True)(other.magnitude)
+        elif _dimensions_key(self.units):
+            raise pint.errors.DimensionalityError(self.units, ureg.dimensionless)
+        else:
+            value = other
+        return self._then(1.0, value, self.units)
+    
+    __radd__ = __add__
+    
+    def __sub__(self, other: Union[pint.Quantity, float]) -> "LazyQuantity":
+        return self + (-other)
+    
+    @property
+    def plan(self) -> ConversionPlan:
+        """The folded conversion, as a ConversionPlan from source_units to units."""
+        return ConversionPlan(self.source_units, self.units, self.scale, self.offset)
+    
+    def evaluate(
+        self,
+        out: Any = None,
+        workers: Optional[int] = 1,
+        chunk_size: int = 1 << 18,
+        precision: Any = None
+    ) -> pint.Quantity:
         """
-        Initialize uniUnit with a conversion dictionary.
+        Evaluate in one pass.
+        
+        Array sources are converted in chunks by ConversionPlan.apply
+        (`out`, `workers`, `chunk_size` and `precision` as there); lists
+        and numbers are converted directly.
+        
+        Returns:
+            Quantity in `units`
+        """
+        plan = self.plan
+        if np is not None and (out is not None or precision is not None
+                               or not isinstance(self.source, (list, tuple, int, float))):
+            magnitude = plan.apply(self.source, out=out, workers=workers, chunk_size=chunk_size,
+                                   precision=precision)
+        else:
+            magnitude = plan(self.source)
+        return ureg.Quantity(magnitude, self.units)
+    
+    def iter_chunks(self, chunk_size: int = 1 << 16) -> Iterator[Any]:
+        """
+        Yield the converted values chunk by chunk (requires NumPy).
+        
+        The same buffer is reused for every chunk: consume or copy each
+        chunk before requesting the next one.
+        """
+        if np is None:
+            raise ImportError("LazyQuantity.iter_chunks requires numpy")
+        try:
+            source = _as_array(self.source)
+        except TypeError:
+            source = np.asarray(self.source, dtype=np.float64)
+        flat = source.reshape(-1)
+        plan = self.plan
+        buffer = np.empty(min(chunk_size, flat.size), dtype=np.result_type(flat.dtype, np.float32))
+        for start in range(0, flat.size, chunk_size):
+            chunk = flat[start:start + chunk_size]
+            result = buffer[:chunk.size]
+            _apply_chunk(chunk, result, plan.factor, plan.offset)
+            yield result
+    
+    def stream(self, sink: Any, chunk_size: int = 1 << 16) -> int:
+        """
+        Evaluate chunk by chunk into a sink without materializing the result.
         
         Args:
-            udict: Dictionary mapping base SI units to target units
-                   Supports both short names (kg, g, m, s) and full names (kilogram, gram, meter, second)
-                   e.g., {'kilogram': 'gram', 'meter': 'millimeter', 'second': 'second'}
-                   or {'kg': 'g', 'm': 'mm', 's': 's'}
-                   
-        Note:
-            Only base units used in conversions need to be provided.
-            Missing units will use SI base units.
+            sink: Callable taking each chunk array, or a binary file-like
+                  object whose write() receives the raw bytes of each chunk
+            chunk_size: Values per chunk
+            
+        Returns:
+            Number of values written
         """
-        self._udict = {}
-        for key, value in udict.items():
-            dim = SHORT_TO_DIMENSION.get(key, key)
-            if dim.startswith('['):
-                self._udict[dim] = value
-            else:
-                self._udict[dim] = value
-        self._ureg = ureg
-        self._target_unit_cache = {}
+        write = sink if callable(sink) else (lambda chunk: sink.write(chunk.tobytes()))
+        count = 0
+        for chunk in self.iter_chunks(chunk_size):
+            write(chunk)
+            count += chunk.size
+        return count
+
+
+class GroupedQuantities:
+    """
+    Struct-of-arrays result of a grouped conversion.
+    
+    Holds one magnitude per item and one interned unit per group instead
+    of a Quantity object per item. Indexing or iterating builds Quantities
+    on demand.
+    
+    Attributes:
+        magnitudes: Converted magnitudes in item order (float64 ndarray,
+                    or a list without NumPy)
+        codes: Group index of each item (intp ndarray, or a list)
+        units: Target Unit of each group (None for plain numbers)
+        
+    Example:
+        >>> result = UnitSystem.get_preset('SI').group_to_unit(
+        ...     [1, 500, 2], ['kg', 'g', 'mm'], compact=True)
+        >>> result.magnitudes
+        array([1.   , 0.5  , 0.002])
+        >>> result.units[result.codes[1]]
+        <Unit('kilogram')>
+    """
+    
+    __slots__ = ('magnitudes', 'codes', 'units')
+    
+    def __init__(self, magnitudes: Any, codes: Any, units: Tuple[Optional[pint.Unit], ...]):
+        self.magnitudes = magnitudes
+        self.codes = codes
+        self.units = units
+    
+    def __len__(self) -> int:
+        return len(self.magnitudes)
     
     def __repr__(self) -> str:
-        return f"uniUnit({self._udict})"
+        return f"GroupedQuantities({len(self)} items, units={[str(u) for u in self.units]})"
     
-    def _get_target_unit(self, dims_tuple: tuple) -> pint.Unit:
+    def __getitem__(self, index: int) -> Union[pint.Quantity, float]:
+        units = self.units[self.codes[index]]
+        value = self.magnitudes[index]
+        return value if units is None else ureg.Quantity(value, units)
+    
+    def __iter__(self) -> Iterator[Union[pint.Quantity, float]]:
+        return iter(self.to_list())
+    
+    def group(self, units: Union[pint.Unit, str]) -> Any:
+        """Indices of the items converted to `units` (from any source unit)."""
+        units = _as_units(units)
+        codes = [code for code, target in enumerate(self.units) if target == units]
+        if np is not None:
+            return np.flatnonzero(np.isin(self.codes, codes))
+        return [i for i, code in enumerate(self.codes) if code in codes]
+    
+    def to_list(self) -> list:
+        """One Quantity per item (plain numbers stay numbers), in order."""
+        magnitudes = self.magnitudes.tolist() if hasattr(self.magnitudes, 'tolist') else self.magnitudes
+        codes = self.codes.tolist() if hasattr(self.codes, 'tolist') else self.codes
+        units = self.units
+        return [value if units[code] is None else _fast_quantity(value, units[code])
+                for value, code in zip(magnitudes, codes)]
+
+
+_registry_version_cache: Tuple[int, str] = (-1, '')
+
+
+def registry_version() -> str:
+    """
+    Hash of the Pint version and every unit definition in the registry.
+    
+    It changes when units are defined, so persisted plans computed against
+    a different registry are never reused. The hash is recomputed only
+    when the registry has grown.
+    
+    Returns:
+        16-character hex digest
+    """
+    global _registry_version_cache
+    size = len(ureg._units)
+    if _registry_version_cache[0] != size:
+        definitions = {definition.name: definition.raw for definition in ureg._units.values()
+                       if hasattr(definition, 'raw')}
+        content = '\n'.join([pint.__version__] + sorted(definitions.values()))
+        _registry_version_cache = (size, hashlib.sha256(content.encode('utf-8')).hexdigest()[:16])
+    return _registry_version_cache[1]
+
+
+class PlanStore:
+    """
+    Persistent cache of compiled plans shared by all processes on a host.
+    
+    Plans are stored in an SQLite database (WAL mode, so readers never
+    block) keyed by registry version, normalized unit system and source
+    unit. A worker that starts cold reads plans computed by the others
+    instead of recomputing them; plans it computes become visible to them.
+    Database errors are treated as cache misses; only opening the store
+    raises sqlite3.Error, so a wrong path is reported once.
+    
+    Args:
+        path: Database file, created if missing
+        
+    Example:
+        >>> set_plan_store(PlanStore('/tmp/uniunit-plans.sqlite'))
+        >>> UnitSystem.get_preset('CGS').compile('N')    # stored for other processes
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pid = None
+        self._connection = None
+        self._connect()
+    
+    def __repr__(self) -> str:
+        return f"PlanStore('{self.path}')"
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Internal function: (re)open the database, once per process."""
+        if self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS plans ('
+                'registry TEXT, system TEXT, source TEXT, delta INTEGER, '
+                'target TEXT, factor REAL, offset REAL, '
+                'PRIMARY KEY (registry, system, source, delta))'
+            )
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+    
+    def get(self, system: str, source: pint.Unit, delta: bool = False) -> Optional[ConversionPlan]:
         """
-        Internal cached function: compute target unit from dimension tuple.
-        dims_tuple format: (('[length]', 1), ('[time]', -2))
+        Look up a stored plan.
+        
+        Args:
+            system: Normalized unit system key
+            source: Source Unit
+            delta: Whether the plan treats offset units as differences
+            
+        Returns:
+            ConversionPlan, or None if not stored
         """
-        if dims_tuple in self._target_unit_cache:
-            return self._target_unit_cache[dims_tuple]
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    'SELECT target, factor, offset FROM plans '
+                    'WHERE registry = ? AND system = ? AND source = ? AND delta = ?',
+                    (registry_version(), system, str(source), int(delta))
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        target, factor, offset = row
+        return ConversionPlan(source, ureg.Unit(target), factor, offset)
+    
+    def put(self, system: str, plan: ConversionPlan, delta: bool = False) -> None:
+        """
+        Store a plan, keeping any plan already stored for the same key.
         
-        res_unit = self._ureg.dimensionless
-        for dim, exp in dims_tuple:
-            target_str = self._udict.get(dim, DIMENSION_TO_SHORT.get(dim, dim.strip('[]')))
-            res_unit *= self._ureg(target_str) ** exp
+        Args:
+            system: Normalized unit system key
+            plan: Plan to store
+            delta: Whether the plan treats offset units as differences
+        """
+        try:
+            with self._lock:
+                self._connect().execute(
+                    'INSERT OR IGNORE INTO plans VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (registry_version(), system, str(plan.source), int(delta),
+                     str(plan.target), plan.factor, plan.offset)
+                )
+        except sqlite3.Error:
+            pass
+    
+    def __len__(self) -> int:
+        try:
+            with self._lock:
+                return self._connect().execute('SELECT COUNT(*) FROM plans').fetchone()[0]
+        except sqlite3.Error:
+            return 0
+    
+    def clear(self) -> None:
+        """Remove all stored plans."""
+        try:
+            with self._lock:
+                self._connect().execute('DELETE FROM plans')
+        except sqlite3.Error:
+            pass
+
+
+_plan_store: Optional[PlanStore] = None
+
+
+def set_plan_store(store: Union[PlanStore, str, None]) -> Optional[PlanStore]:
+    """
+    Set the persistent plan store used by every uniUnit and UnitSystem.
+    
+    The store can also be enabled with the UNIUNIT_PLAN_CACHE environment
+    variable, set to the database path.
+    
+    Args:
+        store: PlanStore, database path, or None to disable
+        
+    Returns:
+        The active PlanStore, or None
+    """
+    global _plan_store
+    _plan_store = PlanStore(store) if isinstance(store, str) else store
+    return _plan_store
+
+
+DIMENSION_TO_BASE_UNIT = {
+    '[mass]': 'kilogram',
+    '[length]': 'meter',
+    '[time]': 'second',
+    '[current]': 'ampere',
+    '[temperature]': 'kelvin',
+    '[substance]': 'mole',
+    '[luminosity]': 'candela',
+}
+
+BASE_UNIT_TO_DIMENSION = {v: k for k, v in DIMENSION_TO_BASE_UNIT.items()}
+
+# Order of exponents in dimension vectors
+BASE_DIMENSIONS = tuple(DIMENSION_TO_BASE_UNIT)
+
+# Short name to full dimension mapping for conv_dict
+SHORT_TO_DIMENSION = {
+    # Short names
+    'kg': '[mass]',
+    'g': '[mass]',
+    'mg': '[mass]',
+    'ug': '[mass]',
+    'm': '[length]',
+    'cm': '[length]',
+    'mm': '[length]',
+    'um': '[length]',
+    'nm': '[length]',
+    'pm': '[length]',
+    'fm': '[length]',
+    'km': '[length]',
+    'dm': '[length]',
+    's': '[time]',
+    'ms': '[time]',
+    'us': '[time]',
+    'ns': '[time]',
+    'ps': '[time]',
+    'A': '[current]',
+    'mA': '[current]',
+    'uA': '[current]',
+    'nA': '[current]',
+    'K': '[temperature]',
+    'mol': '[substance]',
+    'mmol': '[substance]',
+    'kmol': '[substance]',
+    'cd': '[luminosity]',
+    # Full names (lowercase)
+    'kilogram': '[mass]',
+    'gram': '[mass]',
+    'meter': '[length]',
+    'centimeter': '[length]',
+    'millimeter': '[length]',
+    'second': '[time]',
+    'ampere': '[current]',
+    'kelvin': '[temperature]',
+    'mole': '[substance]',
+    'candela': '[luminosity]',
+}
+
+# Reverse mapping: dimension to short base unit name
+DIMENSION_TO_SHORT = {
+    '[mass]': 'kg',
+    '[length]': 'm',
+    '[time]': 's',
+    '[current]': 'A',
+    '[temperature]': 'K',
+    '[substance]': 'mol',
+    '[luminosity]': 'cd',
+}
+
+
+class UnitSystem:
+    """
+    Represents a complete system of units.
+    
+    A UnitSystem defines a complete mapping from base SI units 
+    to desired output units.
+    
+    Attributes:
+        name: Name of the unit system
+        units: Dictionary mapping base units to their names in this system
+        
+    Example:
+        >>> si = UnitSystem("SI", {'kilogram': 'kilogram', 'meter': 'meter', 'second': 'second'})
+    """
+    
+    PRESETS: Dict[str, Dict[str, str]] = {}
+    _instances: Dict[Tuple[type, str], "UnitSystem"] = {}
+    
+    def __init__(self, name: str, units: Dict[str, str], description: str = ""):
+        """
+        Initialize a unit system.
+        
+        Args:
+            name: Name of the unit system
+            units: Dictionary mapping base SI units to output units
+            description: Optional description
+        """
+        self.name = name
+        self.units = units
+        self.description = description
+        self._ureg = ureg
+        self._converter = uniUnit(units)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        if getattr(self, '_shared', False):
+            raise AttributeError(f"Preset '{self.name}' is shared and read-only; "
+                                 f"create a UnitSystem(name, units) to change it")
+        super().__setattr__(name, value)
+    
+    def __repr__(self) -> str:
+        return f"UnitSystem('{self.name}', {dict(self.units)})"
+    
+    def __str__(self) -> str:
+        return f"UnitSystem: {self.name}"
+    
+    @classmethod
+    def register_preset(cls, name: str, units: Dict[str, str], description: str = "") -> None:
+        """
+        Register a unit system as a preset.
+        
+        Args:
+            name: Name of the preset
+            units: Unit mapping dictionary
+            description: Optional description
+        """
+        cls.PRESETS[name] = units
+        for key in [key for key in cls._instances if key[1] == name]:
+            del cls._instances[key]
+    
+    @classmethod
+    def get_preset(cls, name: str) -> "UnitSystem":
+        """
+        Get a preset unit system by name.
+        
+        Args:
+            name: Name of the preset
+            
+        Returns:
+            UnitSystem object, shared by all callers so that its compiled
+            plans are reused; it is read-only (its units are a read-only
+            mapping and setting attributes raises AttributeError)
+            
+        Raises:
+            KeyError: If preset not found
+        """
+        system = cls._instances.get((cls, name))
+        if system is not None:
+            return system
+        if name not in cls.PRESETS:
+            available = ", ".join(cls.PRESETS.keys()) if cls.PRESETS else "none"
+            raise KeyError(f"Preset '{name}' not found. Available: {available}")
+        system = cls(name, MappingProxyType(dict(cls.PRESETS[name])))
+        system._shared = True
+        cls._instances[(cls, name)] = system
+        return system
+    
+    @classmethod
+    def list_presets(cls) -> List[str]:
+        """List all available preset names."""
+        return list(cls.PRESETS.keys())
+    
+    def to_unit(
+        self,
+        uin: Union[pint.Quantity, float, int],
+        out: Any = None,
+        workers: int = 1,
+        precision: Any = None
+    ) -> pint.Quantity:
+        """
+        Convert input to this unit system.
+        
+        Args:
+            uin: Input value with units (or just a number)
+            out: For array Quantities, destination array (see uniUnit.to_unit)
+            workers: For array Quantities, threads used for the conversion
+            precision: For array Quantities, dtype policy (see uniUnit.to_unit)
+            
+        Returns:
+            Value in this unit system
+        """
+        return self._converter.to_unit(uin, out, workers, precision)
+    
+    def iter_to_unit(self, uin: Iterable[Any], chunk_size: int = 1024, magnitudes: bool = False) -> Iterator[Any]:
+        """Lazily convert any iterable of values to this unit system."""
+        return self._converter.iter_to_unit(uin, chunk_size, magnitudes)
+    
+    def group_to_unit(
+        self,
+        uin: Iterable[Any],
+        units: Optional[Iterable[Union[str, pint.Unit]]] = None,
+        compact: bool = False
+    ) -> Union[List, "GroupedQuantities"]:
+        """Convert a long list mixing a few units, grouped by source unit (see uniUnit.group_to_unit)."""
+        return self._converter.group_to_unit(uin, units, compact)
+    
+    def get_new_unit(self, uin: pint.Unit) -> pint.Unit:
+        """Get the unit representation in this system."""
+        return self._converter.get_new_unit(uin)
+    
+    def get_scale_vector(self) -> Dict[str, float]:
+        """Get the conversion factors of this system for all seven base dimensions."""
+        return self._converter.get_scale_vector()
+    
+    def compile(self, uin: Union[pint.Quantity, pint.Unit, str], delta: bool = False) -> ConversionPlan:
+        """Compile the conversion of `uin` units into this system."""
+        return self._converter.compile(uin, delta)
+    
+    def convert_from(self, uin: pint.Quantity, source_system: "UnitSystem") -> pint.Quantity:
+        """
+        Convert from another unit system to this one.
+        
+        Args:
+            uin: Value in source system
+            source_system: Source unit system
+            
+        Returns:
+            Value converted to this system
+        """
+        si_value = source_system.to_unit(uin)
+        return self.to_unit(si_value)
+
+
+class uniUnit:
+    """
+    Main class for conversion between systems of units.
+    
+    This class handles the conversion of values from one unit system
+    to another. It works by first converting to base SI units, then
+    to the target unit system.
+    
+    Attributes:
+        _udict: Dictionary mapping base units to target units
+        
+    Example:
+        >>> conv_dict = {'kilogram': 'gram', 'meter': 'millimeter', 'second': 'second'}
+        >>> myunit = uniUnit(conv_dict)
+        >>> myunit.to_unit(100 * ureg.kg)
+        100000.0 <Unit('gram')>
+    """
+    
+    def __init__(self, udict: Dict[str, str]):
+        """
+        Initialize uniUnit with a conversion dictionary.
+        
+        Args:
+            udict: Dictionary mapping base SI units to target units
+                   Supports both short names (kg, g, m, s) and full names (kilogram, gram, meter, second)
+                   e.g., {'kilogram': 'gram', 'meter': 'millimeter', 'second': 'second'}
+                   or {'kg': 'g', 'm': 'mm', 's': 's'}
+                   
+        Note:
+            Only base units used in conversions need to be provided.
+            Missing units will use SI base units.
+        """
+        self._udict = {}
+        for key, value in udict.items():
+            dim = SHORT_TO_DIMENSION.get(key, key)
+            if dim.startswith('['):
+                self._udict[dim] = value
+            else:
+                self._udict[dim] = value
+        self._ureg = ureg
+        self._target_unit_cache = {}
+        self._plan_cache = {}
+        self._scale_vector = self._build_scale_vector()
+        self._system_key = json.dumps(sorted(self._udict.items()), ensure_ascii=False)
+    
+    def __repr__(self) -> str:
+        return f"uniUnit({self._udict})"
+    
+    def _build_scale_vector(self) -> Dict[str, float]:
+        """
+        Internal function: compute how many target units make up one SI
+        base unit, for each of the seven base dimensions.
+        
+        Raises:
+            ValueError: If a target unit is undefined or has the wrong dimension
+        """
+        scale = {}
+        for dim in BASE_DIMENSIONS:
+            target_str = self._udict.get(dim, DIMENSION_TO_SHORT[dim])
+            try:
+                factor, root = _si_scale(target_str)
+            except pint.errors.UndefinedUnitError as e:
+                raise ValueError(f"Target unit '{target_str}' for {dim} is not defined: {e}")
+            if _dimensions_key(root) != ((dim, 1),):
+                raise ValueError(
+                    f"Target unit '{target_str}' for {dim} has dimension "
+                    f"{root.dimensionality}, expected {dim}"
+                )
+            scale[dim] = 1 / factor
+        return scale
+    
+    def _get_target_unit(self, dims_tuple: tuple) -> pint.Unit:
+        """
+        Internal cached function: compute target unit from dimension tuple.
+        dims_tuple format: (('[length]', 1), ('[time]', -2))
+        """
+        if dims_tuple in self._target_unit_cache:
+            return self._target_unit_cache[dims_tuple]
+        
+        res_unit = self._ureg.dimensionless
+        for dim, exp in dims_tuple:
+            target_str = self._udict.get(dim, DIMENSION_TO_SHORT.get(dim, dim.strip('[]')))
+            target = self._ureg(target_str)
+            if dims_tuple == ((dim, 1),):
+                # A lone offset target (degC) stays absolute
+                res_unit = target
+                break
+            if not target._is_multiplicative:
+                # Inside compound units an offset target is a difference (delta_degC/s)
+                target = self._ureg.Quantity(target.magnitude, f'delta_{target.units}')
+            res_unit *= target ** exp
+        
+        self._target_unit_cache[dims_tuple] = res_unit
+        return res_unit
+    
+    def get_new_unit(self, uin: Union[pint.Quantity, pint.Unit]) -> pint.Unit:
+        """
+        Get the corresponding units of `uin` in new system of units.
+        
+        Args:
+            uin: Input Quantity or Unit
+            
+        Returns:
+            New Unit in target system
+        """
+        if isinstance(uin, pint.Quantity):
+            dims = dict(uin.units.dimensionality)
+        else:
+            dims = dict(uin.dimensionality)
+        
+        dims_tuple = tuple(sorted(dims.items()))
+        return self._get_target_unit(dims_tuple)
+    
+    def compile(self, uin: Union[pint.Quantity, pint.Unit, str], delta: bool = False) -> ConversionPlan:
+        """
+        Compile the conversion of `uin` units into this system.
+        
+        Plans are cached per source unit, so converting many values of the
+        same unit costs one multiplication each. With a PlanStore set, plans
+        are also shared with other processes (see set_plan_store).
+        
+        Args:
+            uin: Source Quantity, Unit or unit string
+            delta: Treat offset units (degC, degF) as temperature differences
+            
+        Returns:
+            ConversionPlan from the units of `uin` to the target unit
+            
+        Example:
+            >>> plan = uniUnit({'kg': 'g', 'm': 'mm'}).compile('Pa')
+            >>> plan(1.0)
+            1.0
+        """
+        source = _as_units(uin)
+        key = (source, delta)
+        plan = self._plan_cache.get(key)
+        if plan is None:
+            store = _plan_store
+            if store is not None:
+                plan = store.get(self._system_key, source, delta)
+            if plan is None:
+                plan = _compile_plan(source, self.get_new_unit(source), delta)
+                if store is not None:
+                    store.put(self._system_key, plan, delta)
+            self._plan_cache[key] = plan
+        return plan
+    
+    def to_unit(
+        self,
+        uin: Union[pint.Quantity, List, Tuple, float, int],
+        out: Any = None,
+        workers: int = 1,
+        precision: Any = None
+    ) -> Union[pint.Quantity, List]:
+        """
+        Return the value of `uin` in new system of units.
+        
+        Array Quantities are converted with the compiled plan of their
+        units, keeping float32 magnitudes in float32.
+        
+        Args:
+            uin: Input value with units, or list/tuple of values
+            out: For array Quantities, destination ndarray or writable buffer
+                 (may be the input magnitude itself, for in-place conversion)
+            workers: For array Quantities, threads converting chunks in
+                     parallel; None uses all cores
+            precision: For array Quantities, dtype policy: 'preserve' to
+                       apply factors in the input's float precision, or a
+                       float dtype such as 'float32' to convert at (see
+                       ConversionPlan.apply and relative_error)
+            
+        Returns:
+            Converted value(s) in target unit system
+            
+        Example:
+            >>> u.to_unit(100 * ureg.kg)
+            100000.0 <Unit('gram')>
+            >>> u.to_unit([1*ureg.kg, 2*ureg.kg])
+            [1000.0 <Unit('gram')>, 2000.0 <Unit('gram')>]
+            >>> field = np.ones(10**8)
+            >>> u.to_unit(ureg.Quantity(field, 'kg'), out=field, workers=None)
+            >>> u.to_unit(ureg.Quantity(field, 'kg'), precision='float32').magnitude.dtype
+            dtype('float32')
+        """
+        if isinstance(uin, (list, tuple)):
+            return [self.to_unit(item) for item in uin]
+        
+        if isinstance(uin, (int, float)):
+            return uin
+        
+        if isinstance(uin, LazyQuantity):
+            return uin.to_system(self)
+        
+        if isinstance(uin, pint.Quantity):
+            if (out is not None or workers != 1 or precision is not None
+                    or (np is not None and isinstance(uin.magnitude, np.ndarray))):
+                plan = self.compile(uin.units)
+                magnitude = plan.apply(uin.magnitude, out=out, workers=workers, precision=precision)
+                return self._ureg.Quantity(magnitude, plan.target)
+            
+            target_unit = self.get_new_unit(uin)
+            
+            if uin.magnitude == 1 and not isinstance(target_unit, pint.Quantity):
+                result = uin.to(target_unit)
+                if isinstance(result, pint.Quantity):
+                    return result
+                return 1 * result
+            
+            return uin.to(target_unit)
+        
+        return uin
+    
+    def iter_to_unit(
+        self,
+        uin: Iterable[Any],
+        chunk_size: int = 1024,
+        magnitudes: bool = False
+    ) -> Iterator[Any]:
+        """
+        Lazily convert any iterable of values to the new system of units.
+        
+        Items are pulled `chunk_size` at a time and converted with compiled
+        plans, looked up once per run of items sharing the same units, so
+        generators of any length are converted in constant memory.
+        Items that are not Quantities are passed through to to_unit().
+        
+        Args:
+            uin: Iterable (list, generator, iterator, ...) of values
+            chunk_size: Number of items converted per internal batch
+            magnitudes: Yield bare magnitudes instead of Quantities
+            
+        Yields:
+            Converted value(s) in target unit system
+            
+        Example:
+            >>> values = (i * ureg.kg for i in range(3))
+            >>> list(uniUnit({'kg': 'g'}).iter_to_unit(values, magnitudes=True))
+            [0.0, 1000.0, 2000.0]
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        iterator = iter(uin)
+        make_quantity = self._ureg.Quantity
+        last_units = plan = None
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return
+            converted = []
+            for item in chunk:
+                if not isinstance(item, pint.Quantity):
+                    converted.append(self.to_unit(item))
+                    continue
+                if item._units != last_units:
+                    last_units = item._units
+                    plan = self.compile(item.units)
+                value = plan(item.magnitude)
+                converted.append(value if magnitudes else make_quantity(value, plan.target))
+            yield from converted
+    
+    def group_to_unit(
+        self,
+        uin: Iterable[Any],
+        units: Optional[Iterable[Union[str, pint.Unit]]] = None,
+        compact: bool = False
+    ) -> Union[List, GroupedQuantities]:
+        """
+        Convert a long list mixing a few units, grouped by source unit.
+        
+        Items are bucketed by units in one pass and each bucket's plan is
+        compiled once; all magnitudes are then converted in one vectorized
+        multiply (and add, for offset units) with each item's factor, so
+        results stay in item order. No Quantity is created per item with
+        `units` and `compact`.
+        
+        Args:
+            uin: Scalar Quantities (plain numbers pass through), or
+                 magnitudes when `units` is given
+            units: Unit (name or Unit) of each magnitude in `uin`
+            compact: Return a GroupedQuantities (magnitudes, group codes and
+                     one interned unit per group) instead of a list
+            
+        Returns:
+            List of converted values, or GroupedQuantities
+            
+        Example:
+            >>> u = UnitSystem.get_preset('SI')
+            >>> u.group_to_unit([1 * ureg.g, 2 * ureg.mm, 3 * ureg.g])
+            [0.001 <Unit('kilogram')>, 0.002 <Unit('meter')>, 0.003 <Unit('kilogram')>]
+            >>> u.group_to_unit([1, 500, 2], ['kg', 'g', 'mm'], compact=True).magnitudes
+            array([1.   , 0.5  , 0.002])
+        """
+        groups = {}
+        sources = []
+        codes = []
+        magnitudes = []
+        add_code = codes.append
+        add_magnitude = magnitudes.append
+        if units is None:
+            for item in uin:
+                if isinstance(item, pint.Quantity):
+                    key = item._units
+                    add_magnitude(item._magnitude)
+                else:
+                    key = None
+                    add_magnitude(item)
+                code = groups.get(key)
+                if code is None:
+                    code = groups[key] = len(sources)
+                    sources.append(None if key is None else item.units)
+                add_code(code)
+        else:
+            for value, key in zip(uin, units):
+                add_magnitude(value)
+                code = groups.get(key)
+                if code is None:
+                    code = groups[key] = len(sources)
+                    sources.append(key)
+                add_code(code)
+        
+        plans = [None if source is None else self.compile(source) for source in sources]
+        factors = [1.0 if plan is None else plan.factor for plan in plans]
+        offsets = [0.0 if plan is None else plan.offset for plan in plans]
+        targets = tuple(None if plan is None else plan.target for plan in plans)
+        if np is not None:
+            codes = np.asarray(codes, dtype=np.intp)
+            magnitudes = np.asarray(magnitudes, dtype=np.float64)
+            if any(factor != 1 for factor in factors):
+                magnitudes = magnitudes * np.asarray(factors)[codes]
+            if any(offsets):
+                magnitudes += np.asarray(offsets)[codes]
+        elif any(factor != 1 for factor in factors) or any(offsets):
+            magnitudes = [value * factors[code] + offsets[code] for value, code in zip(magnitudes, codes)]
+        result = GroupedQuantities(magnitudes, codes, targets)
+        return result if compact else result.to_list()
+    
+    def get_conversion_factor(self, base_unit_name: str) -> float:
+        """
+        Get the conversion factor for a base unit.
+        
+        Args:
+            base_unit_name: Name of the base unit or dimension
+                            (e.g., 'kilogram', 'kg', '[mass]')
+            
+        Returns:
+            Number of target units in one SI base unit, e.g. 1000.0 for kg -> g
+            
+        Raises:
+            KeyError: If `base_unit_name` is not one of the seven base units
+        """
+        dim = SHORT_TO_DIMENSION.get(base_unit_name, base_unit_name)
+        if dim not in self._scale_vector:
+            raise KeyError(f"'{base_unit_name}' is not a base unit or base dimension")
+        return self._scale_vector[dim]
+    
+    def get_scale_vector(self) -> Dict[str, float]:
+        """
+        Get the conversion factors for all seven base dimensions.
+        
+        The vector is computed once when the converter is built.
+        
+        Returns:
+            Dictionary mapping each base dimension to the number of target
+            units in one SI base unit, ordered as BASE_DIMENSIONS
+            
+        Example:
+            >>> uniUnit({'kg': 'g', 'm': 'mm'}).get_scale_vector()['[length]']
+            1000.0
+        """
+        return dict(self._scale_vector)
+    
+    def get_derived_factor(self, uin: Union[pint.Quantity, pint.Unit, str]) -> float:
+        """
+        Get the factor taking a magnitude in `uin` units to this system.
+        
+        The factor is the SI scale of `uin` times the product of the base
+        scale factors raised to the dimension exponents of `uin`.
+        
+        Args:
+            uin: Source Quantity, Unit or unit string (multiplicative units only)
+            
+        Returns:
+            Multiplier from `uin` magnitudes to target system magnitudes
+            
+        Example:
+            >>> uniUnit({'kg': 'g', 'm': 'cm'}).get_derived_factor('N')
+            100000.0
+        """
+        if isinstance(uin, str):
+            si_factor = _si_scale(uin)[0]
+        else:
+            si_factor = _si_scale(str(_as_units(uin)))[0]
+        factor = si_factor
+        for dim, exp in zip(BASE_DIMENSIONS, get_dimension_vector(uin)):
+            if exp:
+                factor *= self._scale_vector[dim] ** exp
+        return factor
+
+
+class RegistryOverlay:
+    """
+    Copy-on-write scope of custom unit definitions over a shared registry.
+    
+    Definitions made on an overlay are only visible through that overlay
+    (and its children); the shared registry is never modified, so Pint's
+    caches stay valid for everyone else. Custom names are resolved by the
+    overlay and everything else falls through to the base registry.
+    Quantities are returned in base registry units, so they mix freely
+    with quantities from the shared registry.
+    
+    Creating an overlay allocates two dictionaries, compared with the
+    full definition file load of a new UnitRegistry. Definitions are
+    resolved when they are made, as a factor times base registry units.
+    
+    Example:
+        >>> tenant = RegistryOverlay()
+        >>> tenant.define('Long = 1000 * kilometer = Lg')
+        >>> tenant.convert(3, 'Long', 'km')
+        3000.0
+        >>> request = tenant.child()
+        >>> request.define('Short = Long / 1e6')
+        >>> request.parse('2 Short').to('m')
+        2.0 <Unit('meter')>
+    """
+    
+    _IDENTIFIER = re.compile(r'[^\W\d]\w*')
+    
+    def __init__(self, base: Optional[pint.UnitRegistry] = None,
+                 parent: Optional["RegistryOverlay"] = None):
+        """
+        Initialize an empty overlay.
+        
+        Args:
+            base: Shared registry to fall through to (defaults to the module registry)
+            parent: Optional overlay to inherit definitions from
+        """
+        self._parent = parent
+        self._base = parent._base if parent is not None else (base or ureg)
+        self._definitions = {}
+        self._version = 0
+        self._cache = {}
+    
+    def __contains__(self, name: str) -> bool:
+        return self._lookup(name) is not None or name in self._base
+    
+    def child(self) -> "RegistryOverlay":
+        """Create an overlay that inherits this overlay's definitions."""
+        return RegistryOverlay(parent=self)
+    
+    def _lookup(self, name: str) -> Optional[Tuple[float, pint.Unit]]:
+        overlay = self
+        while overlay is not None:
+            if name in overlay._definitions:
+                return overlay._definitions[name]
+            overlay = overlay._parent
+        return None
+    
+    def _stamp(self) -> tuple:
+        """Internal function: versions of this overlay and its parents."""
+        stamp = []
+        overlay = self
+        while overlay is not None:
+            stamp.append(overlay._version)
+            overlay = overlay._parent
+        return tuple(stamp)
+    
+    def define(self, definition: str) -> None:
+        """
+        Define a custom unit in this overlay.
+        
+        Args:
+            definition: Pint style definition 'name = expression [= symbol [= alias]]',
+                        e.g. 'Long = 1000 * kilometer = Lg'
+                        
+        Raises:
+            ValueError: If the definition is malformed or uses an offset
+        """
+        if ';' in definition:
+            raise ValueError("Offset definitions are not supported in registry overlays")
+        parts = [part.strip() for part in definition.split('=')]
+        if len(parts) < 2 or not all(parts):
+            raise ValueError(f"Invalid unit definition: '{definition}'")
+        name, expr, aliases = parts[0], parts[1], parts[2:]
+        resolved = self.resolve(expr)
+        for alias in [name] + aliases:
+            if not self._IDENTIFIER.fullmatch(alias):
+                raise ValueError(f"Invalid unit name: '{alias}'")
+            self._definitions[alias] = resolved
+        self._version += 1
+        self._cache = {}
+    
+    def resolve(self, expr: str) -> Tuple[float, pint.Unit]:
+        """
+        Resolve a unit expression to (factor, base registry Unit).
+        
+        Args:
+            expr: Unit expression that may use custom names, e.g. 'Long / hour'
+            
+        Returns:
+            Tuple (factor, unit) such that one `expr` equals factor * unit
+        """
+        stamp = self._stamp()
+        cached = self._cache.get(expr)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        
+        base = self._base
+        
+        def evaluate_token(token):
+            if token[0] == tokenize.NAME:
+                found = self._lookup(token[1])
+                if found is not None:
+                    return base.Quantity(found[0], found[1])
+            return base._eval_token(token)
+        
+        # Evaluate Pint's own parse tree, so custom names are substituted as
+        # quantities and never formatted back into text
+        text = expr
+        for preprocess in base.preprocessors:
+            text = preprocess(text)
+        tokens = pint.pint_eval.tokenizer(pint.util.string_preprocessor(text))
+        parsed = pint.pint_eval.build_eval_tree(tokens).evaluate(evaluate_token) if text.strip() else 1
+        if isinstance(parsed, pint.Quantity):
+            resolved = (parsed.magnitude, parsed.units)
+        else:
+            resolved = (parsed, self._base.dimensionless)
+        self._cache[expr] = (stamp, resolved)
+        return resolved
+    
+    def Quantity(self, value: Any, expr: str) -> pint.Quantity:
+        """Create a Quantity of `value` in unit `expr`, expressed in base registry units."""
+        factor, units = self.resolve(expr)
+        return self._base.Quantity(value * factor, units)
+    
+    def parse(self, text: str) -> pint.Quantity:
+        """Parse a quantity string such as '3 Long / hour'."""
+        factor, units = self.resolve(text)
+        return self._base.Quantity(factor, units)
+    
+    def to(self, quantity: pint.Quantity, expr: str) -> Any:
+        """Return the magnitude of `quantity` in unit `expr`."""
+        factor, units = self.resolve(expr)
+        return quantity.to(units).magnitude / factor
+    
+    def convert(self, value: Any, from_unit: str, to_unit: str) -> Any:
+        """
+        Convert a value between two unit expressions.
+        
+        Args:
+            value: Numeric value to convert
+            from_unit: Source unit expression
+            to_unit: Target unit expression
+            
+        Returns:
+            Converted value
+        """
+        return self.to(self.Quantity(value, from_unit), to_unit)
+
+
+def create_custom_unit(
+    name: str, 
+    value: Union[pint.Quantity, float], 
+    unit: Optional[pint.Unit] = None,
+    registry: Optional[RegistryOverlay] = None
+) -> pint.Quantity:
+    """
+    Create a custom unit definition.
+    
+    Args:
+        name: Name of the new unit
+        value: Value in terms of existing units, or conversion factor
+        unit: Optional unit to define the custom unit against
+        registry: Optional RegistryOverlay to define the unit in instead
+                  of the shared registry
+        
+    Returns:
+        One of the new unit as a Quantity (multiply it to make quantities);
+        with `registry`, expressed in base registry units
+        
+    Example:
+        >>> Long = create_custom_unit('Long', 1000 * ureg.km)
+        >>> 3 * Long
+        3 <Unit('Long')>
+        >>> tenant = RegistryOverlay()
+        >>> create_custom_unit('Long', 1000 * ureg.km, registry=tenant)
+        1000 <Unit('kilometer')>
+    """
+    if unit is not None:
+        return ureg.Quantity(1, (value * unit).units)
+    if registry is not None:
+        registry.define(f'{name} = {value}')
+        return registry.Quantity(1, name)
+    else:
+        try:
+            ureg.define(f'{name} = {value}')
+            return ureg.parse_expression(name)
+        except:
+            return ureg.Quantity(1, (value * ureg.parse_expression(name)).units)
+
+
+def unit_field(unit: str, **kwargs) -> Any:
+    """
+    Declare a dataclass field holding a magnitude in `unit`.
+    
+    Args:
+        unit: Unit of the values passed to the constructor
+        **kwargs: Passed on to dataclasses.field (default, repr, ...)
+        
+    Returns:
+        dataclasses.Field with the unit stored in its metadata
+        
+    Example:
+        >>> @unit_dataclass(system='mmkgms')
+        ... class Beam:
+        ...     length: float = unit_field('m')
+    """
+    metadata = dict(kwargs.pop('metadata', None) or {})
+    metadata['unit'] = unit
+    return dataclasses.field(metadata=metadata, **kwargs)
+
+
+def _resolve_system(system: Union[str, Dict[str, str], UnitSystem, "uniUnit"]) -> Any:
+    """Internal helper: accept a preset name, a unit dictionary, a UnitSystem or a uniUnit."""
+    if isinstance(system, str):
+        return UnitSystem.get_preset(system)
+    if isinstance(system, dict):
+        return uniUnit(system)
+    return system
+
+
+def _column_magnitudes(column: Any, units: pint.Unit) -> Any:
+    """Internal helper: magnitudes in `units` of a column given as a Quantity or holding Quantities."""
+    if isinstance(column, pint.Quantity):
+        return column.m_as(units)
+    if isinstance(column, (list, tuple)) and any(isinstance(value, pint.Quantity) for value in column):
+        return [value.m_as(units) if isinstance(value, pint.Quantity) else value for value in column]
+    return column
+
+
+def unit_dataclass(
+    cls: Optional[type] = None,
+    *,
+    system: Union[str, Dict[str, str], UnitSystem, "uniUnit"] = 'SI',
+    normalize: bool = True,
+    **dataclass_kwargs
+) -> Any:
+    """
+    Class decorator: a dataclass whose unit fields are normalized to a unit system.
+    
+    Fields declared with unit_field() take magnitudes in their declared unit
+    (or Quantities). One ConversionPlan per field is compiled when the class
+    is created, so normalizing an instance costs one multiplication per field.
+    The class gains:
+    
+    - ``__unit_plans__``: dict of field name -> ConversionPlan
+    - ``normalized()``: a copy with unit fields converted (self if already normalized)
+    - ``replace(**changes)`` (also ``__replace__``, used by copy.replace):
+      a copy with changed fields converted like constructor arguments and
+      the others kept as they are
+    - ``from_columns(columns)``: build instances from a dict of columns, each
+      converted once (vectorized for NumPy arrays)
+    - ``from_rows(rows)``: build instances from tuples or dicts via from_columns
+    
+    Args:
+        cls: Class to decorate (when used without arguments)
+        system: Target system: preset name, unit dictionary, UnitSystem or uniUnit
+        normalize: Convert unit fields on construction; if False, call normalized()
+        **dataclass_kwargs: Passed on to dataclasses.dataclass (frozen, slots, ...)
+        
+    Returns:
+        Decorated dataclass
+        
+    Example:
+        >>> @unit_dataclass(system='mmkgms')
+        ... class Beam:
+        ...     length: float = unit_field('m')
+        ...     load: float = unit_field('kN')
+        >>> Beam(2.0, 1.0)
+        Beam(length=2000.0, load=1.0)
+        >>> Beam(2.0, 1.0).replace(load=5.0)
+        Beam(length=2000.0, load=5.0)
+    
+    ``dataclasses.replace()`` calls ``__init__`` with every field, so it
+    converts the unchanged fields again: use ``replace()`` instead.
+    """
+    def wrap(cls: type) -> type:
+        # A subclass of a decorated class is a dataclass only through its base:
+        # make it one itself, so its own fields count and its __init__ is unwrapped
+        if '__dataclass_fields__' not in cls.__dict__:
+            cls = dataclasses.dataclass(cls, **dataclass_kwargs)
+        converter = _resolve_system(system)
+        fields = dataclasses.fields(cls)
+        plans = {f.name: converter.compile(f.metadata['unit']) for f in fields if 'unit' in f.metadata}
+        plan_items = tuple(plans.items())
+        init_names = [f.name for f in fields if f.init]
+        raw_init = cls.__init__
+        
+        def normalize_fields(obj, items=plan_items):
+            for name, plan in items:
+                value = getattr(obj, name)
+                if value is None:
+                    continue
+                if isinstance(value, pint.Quantity):
+                    value = value.m_as(plan.source)
+                object.__setattr__(obj, name, plan(value))
+        
+        if normalize:
+            @wraps(raw_init)
+            def __init__(self, *args, **kwargs):
+                raw_init(self, *args, **kwargs)
+                normalize_fields(self)
+            cls.__init__ = __init__
+        
+        def replace(self, **changes):
+            """Return a copy with `changes` applied, converting only the changed unit fields."""
+            for f in fields:
+                if not f.init and f.name in changes:
+                    raise ValueError(f"field {f.name} is declared with init=False, it cannot be replaced")
+            unknown = set(changes) - set(init_names)
+            if unknown:
+                raise TypeError(f"{cls.__name__} has no init fields {sorted(unknown)}")
+            obj = cls.__new__(cls)
+            raw_init(obj, **{name: changes[name] if name in changes else getattr(self, name)
+                             for name in init_names})
+            if normalize:
+                normalize_fields(obj, tuple(item for item in plan_items if item[0] in changes))
+            return obj
+        
+        def normalized(self):
+            """Return a copy with all unit fields in the target system."""
+            if normalize:
+                return self
+            obj = copy.copy(self)
+            normalize_fields(obj)
+            return obj
+        
+        def from_columns(cls, columns: Mapping[str, Any]) -> list:
+            """Build instances from a mapping of field name -> column of values."""
+            names = [name for name in init_names if name in columns]
+            unknown = set(columns) - set(names)
+            if unknown:
+                raise TypeError(f"{cls.__name__} has no init fields {sorted(unknown)}")
+            values = []
+            for name in names:
+                column = columns[name]
+                if normalize and name in plans:
+                    column = plans[name](_column_magnitudes(column, plans[name].source))
+                values.append(column.tolist() if hasattr(column, 'tolist') else column)
+            # Unit fields left to their defaults are converted per instance
+            defaults = tuple(item for item in plan_items if item[0] not in columns) if normalize else ()
+            new = cls.__new__
+            objects = []
+            positional = names == init_names[:len(names)]
+            for row in zip(*values):
+                obj = new(cls)
+                if positional:
+                    raw_init(obj, *row)
+                else:
+                    raw_init(obj, **dict(zip(names, row)))
+                if defaults:
+                    normalize_fields(obj, defaults)
+                objects.append(obj)
+            return objects
+        
+        def from_rows(cls, rows: Iterable[Any]) -> list:
+            """Build instances from tuples in field order, or dicts keyed by field name."""
+            rows = rows if isinstance(rows, list) else list(rows)
+            if not rows:
+                return []
+            if isinstance(rows[0], Mapping):
+                return from_columns(cls, {name: [row[name] for row in rows] for name in rows[0]})
+            return from_columns(cls, dict(zip(init_names, zip(*rows))))
+        
+        cls.__unit_plans__ = plans
+        cls.normalized = normalized
+        cls.replace = replace
+        cls.__replace__ = replace
+        cls.from_columns = classmethod(from_columns)
+        cls.from_rows = classmethod(from_rows)
+        return cls
+    
+    if cls is None:
+        return wrap
+    return wrap(cls)
+
+
+class DeckSchema:
+    """
+    Declarative description of the unit-carrying fields of a keyword-based deck.
+    
+    A deck is a text file of keyword lines (e.g. ``*NODE``, ``*Elastic``)
+    each followed by data lines, whose fields are separated by commas or
+    whitespace (or have a fixed width). The schema gives, per keyword, the
+    dimension of each field: an SI unit expression ('m', 'kg/m**3', 'Pa'),
+    a dimension ('[length]', '[mass]/[length]**3') or None for fields left
+    unchanged (ids, flags, names). Fields can be listed once for every data
+    line, or per card (a list of lists, the last card repeating).
+    
+    Fixed-width decks give a column width for every field, a list of
+    widths when columns differ (the last width repeating), and per-keyword
+    layouts where cards differ from the default: LS-DYNA standard cards are
+    10 wide, but ``*NODE`` is 8/16/16/16/8/8.
+    
+    Attributes:
+        keywords: Dictionary mapping keyword names to per-card field units
+        keyword_prefix: Prefix of keyword lines
+        comment_prefixes: Prefixes of comment lines, copied unchanged
+        field_width: Default column width(s) of fixed-width fields, or None
+                     for delimited fields
+        field_widths: Dictionary mapping keyword names to per-card column widths
+        
+    Example:
+        >>> schema = DeckSchema({
+        ...     '*NODE': [None, 'm', 'm', 'm'],
+        ...     '*MAT_ELASTIC': [None, 'kg/m**3', 'Pa', None],
+        ... }, field_width=10, field_widths={'*NODE': [8, 16, 16, 16, 8, 8]})
+        >>> DeckConverter(schema, 'SI', 'mmgms').convert('model.k', 'model_mm.k')
+    """
+    
+    def __init__(
+        self,
+        keywords: Mapping[str, Any],
+        keyword_prefix: str = '*',
+        comment_prefixes: Iterable[str] = ('$', '**', '#'),
+        field_width: Union[int, Iterable[int], None] = None,
+        case_sensitive: bool = False,
+        field_widths: Optional[Mapping[str, Any]] = None
+    ):
+        """
+        Initialize the schema.
+        
+        Args:
+            keywords: Dictionary mapping keyword names (with their prefix) to a
+                      list of field units, or a list of such lists per card
+            keyword_prefix: Prefix of keyword lines (default '*')
+            comment_prefixes: Prefixes of comment lines
+            field_width: Width of fixed-width fields (e.g. 10 for LS-DYNA
+                         standard cards), or a list of column widths, the
+                         last repeating; None splits on commas and whitespace
+            case_sensitive: Match keyword names case-sensitively
+            field_widths: Dictionary mapping keyword names to their column
+                          widths (as for field_width), or a list of such
+                          lists per card, overriding field_width
+        """
+        self.keyword_prefix = keyword_prefix
+        self.comment_prefixes = tuple(comment_prefixes)
+        self.field_width = field_width
+        self.case_sensitive = case_sensitive
+        self.keywords = {}
+        for name, cards in keywords.items():
+            cards = list(cards)
+            if not cards or all(card is None or isinstance(card, str) for card in cards):
+                cards = [cards]
+            self.keywords[self._key(name)] = tuple(tuple(card) for card in cards)
+        self._default_columns = self._column_layouts(field_width)
+        self.field_widths = {self._key(name): self._column_layouts(widths)
+                             for name, widths in (field_widths or {}).items()}
+    
+    @staticmethod
+    def _column_layouts(widths: Any) -> Optional[Tuple[Tuple[int, ...], ...]]:
+        """Internal function: per-card column widths of a width, list of widths or list of lists."""
+        if widths is None:
+            return None
+        if isinstance(widths, int):
+            return ((widths,),)
+        widths = list(widths)
+        if widths and all(isinstance(width, int) for width in widths):
+            widths = [widths]
+        layouts = tuple(tuple(card) for card in widths)
+        if not layouts or not all(layouts) or any(width < 1 for card in layouts for width in card):
+            raise ValueError(f"Invalid field widths: {widths!r}")
+        return layouts
+    
+    def columns(self, keyword: str) -> Optional[Tuple[Tuple[int, ...], ...]]:
+        """Per-card column widths of a keyword, or None for delimited fields."""
+        return self.field_widths.get(self._key(keyword), self._default_columns)
+    
+    @classmethod
+    def load(cls, path: str) -> "DeckSchema":
+        """
+        Load a schema from a JSON file.
+        
+        The file holds {"keywords": {...}} and optionally keyword_prefix,
+        comment_prefixes, field_width, field_widths and case_sensitive.
+        """
+        with open(path, encoding='utf-8') as f:
+            return cls(**json.load(f))
+    
+    def _key(self, name: str) -> str:
+        return name if self.case_sensitive else name.upper()
+    
+    def keyword(self, line: str) -> str:
+        """Keyword name of a keyword line, without parameters (',name=...')."""
+        return self._key(re.split(r'[\s,]', line.strip(), 1)[0])
+    
+    def units(self) -> set:
+        """Every field unit or dimension used by the schema."""
+        return {unit for cards in self.keywords.values() for card in cards for unit in card if unit}
+
+
+def _si_units_of(spec: str) -> pint.Unit:
+    """Internal helper: SI units of a unit expression or a dimension such as '[force]/[length]'."""
+    if '[' not in spec:
+        return _parse_units(spec)
+    units = ureg.dimensionless
+    for dimension, exponent in ureg.get_dimensionality(spec).items():
+        units *= ureg.Unit(DIMENSION_TO_BASE_UNIT[dimension]) ** exponent
+    return units
+
+
+class DeckConverter:
+    """
+    Streaming converter of simulation input decks between unit systems.
+    
+    Lines are read and written one at a time, so memory stays constant for
+    decks of any size. Keyword lines, comments and data lines of keywords
+    absent from the schema are copied unchanged; annotated numeric fields
+    are converted with one cached ConversionPlan per field unit and
+    rewritten in place, keeping separators and fixed-width columns.
+    
+    Attributes:
+        schema: DeckSchema describing the deck
+        plans: Dictionary mapping each field unit of the schema to its plan
         
-        self._target_unit_cache[dims_tuple] = res_unit
-        return res_unit
+    Example:
+        >>> schema = DeckSchema({'*NODE': [None, 'm', 'm', 'm']})
+        >>> converter = DeckConverter(schema, 'SI', 'mmgms')
+        >>> list(converter.iter_lines(['*NODE\\n', '1, 0.5, 0.25, 0\\n']))
+        ['*NODE\\n', '1, 500, 250, 0\\n']
+    """
     
-    def get_new_unit(self, uin: Union[pint.Quantity, pint.Unit]) -> pint.Unit:
+    _SEPARATOR = re.compile(r'(\s*,\s*|\s+)')
+    
+    def __init__(
+        self,
+        schema: Union[DeckSchema, Mapping[str, Any]],
+        from_system: Union[str, Dict[str, str], UnitSystem, "uniUnit"],
+        to_system: Union[str, Dict[str, str], UnitSystem, "uniUnit"],
+        number_format: str = '.10g'
+    ):
         """
-        Get the corresponding units of `uin` in new system of units.
+        Initialize the converter and compile the plan of every field unit.
         
         Args:
-            uin: Input Quantity or Unit
-            
-        Returns:
-            New Unit in target system
+            schema: DeckSchema, or a keywords mapping for DeckSchema defaults
+            from_system: Unit system of the deck: preset name, unit
+                         dictionary, UnitSystem or uniUnit
+            to_system: Unit system to write the deck in
+            number_format: Format spec of converted numbers; in fixed-width
+                           decks exponents are shortened ('3.3e8') and
+                           precision reduced until a number fits
         """
-        if isinstance(uin, pint.Quantity):
-            dims = dict(uin.units.dimensionality)
-        else:
-            dims = dict(uin.dimensionality)
-        
-        dims_tuple = tuple(sorted(dims.items()))
-        return self._get_target_unit(dims_tuple)
+        self.schema = schema if isinstance(schema, DeckSchema) else DeckSchema(schema)
+        source = _resolve_system(from_system)
+        target = _resolve_system(to_system)
+        self.number_format = number_format
+        self.plans = {spec: target.compile(source.get_new_unit(_si_units_of(spec)))
+                      for spec in self.schema.units()}
+        self._cards = {keyword: self._compile_keyword(cards, self.schema.columns(keyword))
+                       for keyword, cards in self.schema.keywords.items()}
+    
+    def _compile_card(self, card: Tuple[Optional[str], ...]) -> tuple:
+        """Internal function: (position, factor, offset) of each annotated field of a card."""
+        return tuple((i, self.plans[spec].factor, self.plans[spec].offset)
+                     for i, spec in enumerate(card) if spec)
     
-    def to_unit(self, uin: Union[pint.Quantity, List, Tuple, float, int]) -> Union[pint.Quantity, List]:
+    def _compile_keyword(self, cards: tuple, columns: Optional[tuple]) -> tuple:
+        """Internal function: (fields, column widths) of each card, the last card repeating."""
+        count = max(len(cards), len(columns) if columns else 0)
+        return tuple((self._compile_card(cards[min(i, len(cards) - 1)]),
+                      columns[min(i, len(columns) - 1)] if columns else None)
+                     for i in range(count))
+    
+    def _format(self, value: float, width: Optional[int] = None) -> str:
+        text = format(value, self.number_format)
+        if width is None or len(text) <= width:
+            return text if width is None else text.rjust(width)
+        for digits in range(min(width, 16), 0, -1):
+            text = re.sub(r'e\+?(-?)0*(?=\d)', r'e\1', format(value, f'.{digits}g'))
+            if len(text) <= width:
+                return text.rjust(width)
+        raise ValueError(f"{value!r} does not fit in a field of width {width}")
+    
+    def convert_line(
+        self,
+        line: str,
+        card: Tuple[Optional[str], ...],
+        columns: Union[int, Iterable[int], None] = None
+    ) -> str:
         """
-        Return the value of `uin` in new system of units.
+        Convert the annotated fields of one data line, given the field units of its card.
         
         Args:
-            uin: Input value with units, or list/tuple of values
-            
-        Returns:
-            Converted value(s) in target unit system
-            
-        Example:
-            >>> u.to_unit(100 * ureg.kg)
-            100000.0 <Unit('gram')>
-            >>> u.to_unit([1*ureg.kg, 2*ureg.kg])
-            [1000.0 <Unit('gram')>, 2000.0 <Unit('gram')>]
+            line: Data line
+            card: Field units of the card
+            columns: Column width(s) of the line; defaults to the schema's field_width
         """
-        if isinstance(uin, (list, tuple)):
-            return [self.to_unit(item) for item in uin]
-        
-        if isinstance(uin, (int, float)):
-            return uin
-        
-        if isinstance(uin, pint.Quantity):
-            target_unit = self.get_new_unit(uin)
-            
-            if uin.magnitude == 1 and not isinstance(target_unit, pint.Quantity):
-                result = uin.to(target_unit)
-                if isinstance(result, pint.Quantity):
-                    return result
-                return 1 * result
-            
-            return uin.to(target_unit)
+        layouts = self.schema._column_layouts(columns) if columns is not None else self.schema._default_columns
+        return self._convert_line(line, self._compile_card(card), layouts[0] if layouts else None)
+    
+    def _convert_line(self, line: str, fields: tuple, columns: Optional[Tuple[int, ...]] = None) -> str:
+        """Internal function: convert one data line given its compiled card and column widths."""
+        body = line.rstrip('\r\n')
+        ending = line[len(body):]
+        if columns:
+            parts = []
+            pos = 0
+            last = len(columns) - 1
+            while pos < len(body):
+                width = columns[min(len(parts), last)]
+                parts.append(body[pos:pos + width])
+                pos += width
+            for i, factor, offset in fields:
+                if i >= len(parts):
+                    break
+                try:
+                    value = float(parts[i])
+                except ValueError:
+                    continue  # blank or non-numeric (e.g. a parameter name)
+                parts[i] = self._format(value * factor + offset, len(parts[i]))
+            return ''.join(parts) + ending
+        stripped = body.lstrip()
+        parts = self._SEPARATOR.split(stripped)
+        number_format = self.number_format
+        for i, factor, offset in fields:
+            if 2 * i >= len(parts):
+                break
+            try:
+                value = float(parts[2 * i])
+            except ValueError:
+                continue
+            parts[2 * i] = format(value * factor + offset, number_format)
+        return body[:len(body) - len(stripped)] + ''.join(parts) + ending
+    
+    def iter_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Lazily convert an iterable of deck lines (such as an open file).
         
-        return uin
+        Yields:
+            Converted lines, in order
+        """
+        schema = self.schema
+        comments = schema.comment_prefixes
+        prefix = schema.keyword_prefix
+        convert_line = self._convert_line
+        cards = None
+        index = 0
+        for line in lines:
+            start = line.lstrip()
+            if not start or start.startswith(comments):
+                yield line
+            elif start.startswith(prefix):
+                cards = self._cards.get(schema.keyword(start))
+                index = 0
+                yield line
+            elif cards is None:
+                yield line
+            else:
+                yield convert_line(line, *(cards[index] if index < len(cards) else cards[-1]))
+                index += 1
     
-    def get_conversion_factor(self, base_unit_name: str) -> float:
+    def convert(self, source: Any, target: Any) -> int:
         """
-        Get the conversion factor for a base unit.
+        Convert a deck file into another, streaming line by line.
         
         Args:
-            base_unit_name: Name of the base unit (e.g., 'kilogram', 'meter')
+            source: Path or readable text file of the deck
+            target: Path or writable text file for the converted deck
             
         Returns:
-            Conversion factor to SI base unit
+            Number of lines written
         """
-        if base_unit_name not in self._udict:
-            return 1.0
+        count = 0
+        with _open_text(source, 'r') as reader, _open_text(target, 'w') as writer:
+            for line in self.iter_lines(reader):
+                writer.write(line)
+                count += 1
+        return count
+
+
+def _open_text(file: Any, mode: str) -> Any:
+    """Internal helper: open a path (newlines kept as written), or wrap an open file so it is not closed."""
+    if isinstance(file, (str, os.PathLike)):
+        return open(file, mode, encoding='utf-8', newline='')
+    return _NotClosing(file)
+
+
+class _NotClosing:
+    """Internal context manager yielding an open file without closing it."""
+    
+    def __init__(self, file: Any):
+        self.file = file
+    
+    def __enter__(self) -> Any:
+        return self.file
+    
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+def convert_deck(
+    source: Any,
+    target: Any,
+    schema: Union[DeckSchema, Mapping[str, Any], str],
+    from_system: Union[str, Dict[str, str], UnitSystem, "uniUnit"],
+    to_system: Union[str, Dict[str, str], UnitSystem, "uniUnit"],
+    **kwargs
+) -> int:
+    """
+    Convert a simulation input deck between unit systems, streaming.
+    
+    Args:
+        source: Path or readable text file of the deck
+        target: Path or writable text file for the converted deck
+        schema: DeckSchema, keywords mapping, or path of a JSON schema file
+        from_system: Unit system of the deck
+        to_system: Unit system to write the deck in
+        **kwargs: Passed on to DeckConverter (number_format)
         
-        target = self._udict[base_unit_name]
+    Returns:
+        Number of lines written
         
-        try:
-            base = 1 * self._ureg(base_unit_name)
-            converted = base.to(target)
-            return converted.magnitude
-        except:
-            return 1.0
+    Example:
+        >>> convert_deck('model.k', 'model_mm.k', 'lsdyna_schema.json', 'SI', 'mmgms')
+    """
+    if isinstance(schema, str):
+        schema = DeckSchema.load(schema)
+    return DeckConverter(schema, from_system, to_system, **kwargs).convert(source, target)
 
 
-def create_custom_unit(
-    name: str, 
-    value: Union[pint.Quantity, float], 
-    unit: Optional[pint.Unit] = None
-) -> pint.Unit:
+# Whether unit_function checks units; False (or UNIUNIT_UNIT_CHECKS=0)
+# returns newly decorated functions unchanged and makes wrappers pass calls through
+_unit_checks = os.environ.get('UNIUNIT_UNIT_CHECKS', '1') != '0'
+
+
+def set_unit_checks(enabled: bool) -> bool:
     """
-    Create a custom unit definition.
+    Enable or disable the unit checks of unit_function.
+    
+    Disabled, unit_function returns functions unchanged, with no overhead
+    at all, and functions decorated earlier (e.g. at import time) pass
+    their arguments and results through untouched; callers must then pass
+    plain magnitudes in the declared system. The switch can also be set
+    with UNIUNIT_UNIT_CHECKS=0, before the decorated modules are imported.
     
     Args:
-        name: Name of the new unit
-        value: Value in terms of existing units, or conversion factor
-        unit: Optional unit to define the custom unit against
+        enabled: True to wrap functions, False to strip the checks
+        
+    Returns:
+        The previous setting
+    """
+    global _unit_checks
+    previous, _unit_checks = _unit_checks, bool(enabled)
+    return previous
+
+
+def _argument_converter(name: str, target: pint.Unit) -> Any:
+    """Internal helper: function converting one argument to `target` magnitudes."""
+    factors = {}
+    
+    def convert(value):
+        if not isinstance(value, pint.Quantity):
+            return value  # plain numbers are taken as already in the system
+        key = value._units
+        entry = factors.get(key)
+        if entry is None:
+            try:
+                plan = compile_conversion(value.units, target)
+            except pint.errors.DimensionalityError as e:
+                raise pint.errors.DimensionalityError(
+                    value.units, target, extra_msg=f" for argument '{name}'") from e
+            entry = factors[key] = (plan.factor, plan.offset)
+        factor, offset = entry
+        if factor == 1 and not offset:
+            return value._magnitude
+        if offset:
+            return value._magnitude * factor + offset
+        return value._magnitude * factor
+    
+    return convert
+
+
+def unit_function(
+    args: Union[Mapping[str, Optional[str]], Iterable[Optional[str]], None] = None,
+    ret: Union[str, Iterable[Optional[str]], None] = None,
+    system: Union[str, Dict[str, str], UnitSystem, "uniUnit"] = 'SI'
+) -> Any:
+    """
+    Decorator: a function taking and returning magnitudes in a unit system.
+    
+    Each declared argument may be given as a Quantity of any compatible
+    unit, converted to the system's unit of its dimension, or as a plain
+    number taken as already in that unit. Target units are resolved when
+    the function is defined and conversion factors cached per input unit,
+    so a call costs at most one multiply per argument and nothing for
+    inputs already in the system; incompatible units raise
+    DimensionalityError. Unlike Pint's ureg.wraps, nothing is parsed on
+    calls. With set_unit_checks(False) (or UNIUNIT_UNIT_CHECKS=0) the
+    decorator returns functions unchanged and existing wrappers call
+    through without converting.
+    
+    Args:
+        args: Argument units: a mapping of parameter name to unit or
+              dimension ('m', 'Pa', '[force]'), or a sequence in parameter
+              order; None for arguments passed through. *args and
+              **kwargs parameters cannot be declared (TypeError)
+        ret: Unit of the return value (a Quantity in the system's unit is
+             returned), a sequence of units for tuple results, or None to
+             return the result unchanged
+        system: Target system: preset name, unit dictionary, UnitSystem or uniUnit
         
     Returns:
-        New Unit
+        Decorator
         
     Example:
-        >>> Long = create_custom_unit('Long', 1000 * ureg.km)
-        >>> score = create_custom_unit('score', 20)
+        >>> @unit_function(args={'force': 'N', 'area': 'm**2'}, ret='Pa', system='mmkgms')
+        ... def stress(force, area):
+        ...     return force / area
+        >>> stress(2 * ureg.kN, 4 * ureg.cm ** 2)
+        0.005 <Unit('kilogram / millimeter / millisecond ** 2')>
+        >>> stress(2.0, 400.0)   # already in mmkgms (kN, mm**2)
+        0.005 <Unit('kilogram / millimeter / millisecond ** 2')>
     """
-    if unit is not None:
-        return (value * unit).units
-    else:
-        try:
-            ureg.define(f'{name} = {value}')
-            return ureg.parse_expression(name)
-        except:
-            return (value * ureg.parse_expression(name)).units
+    def decorate(func: Any) -> Any:
+        if not _unit_checks:
+            return func
+        converter = _resolve_system(system)
+        
+        def target_of(spec):
+            return None if spec is None else converter.compile(_si_units_of(spec)).target
+        
+        signature = inspect.signature(func).parameters
+        parameters = list(signature)
+        specs = dict(args) if isinstance(args, Mapping) else dict(zip(parameters, args or ()))
+        unknown = set(specs) - set(parameters)
+        if unknown:
+            raise TypeError(f"{func.__name__}() has no parameters {sorted(unknown)}")
+        targets = {name: target_of(spec) for name, spec in specs.items() if spec is not None}
+        variadic = [name for name in targets if signature[name].kind in
+                    (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)]
+        if variadic:
+            raise TypeError(f"{func.__name__}(): units cannot be declared for {variadic}")
+        # Keyword-only parameters (after *args) are never bound by position
+        by_position = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+        positional = tuple((parameters.index(name) if signature[name].kind in by_position else None,
+                            name, _argument_converter(name, target))
+                           for name, target in targets.items())
+        if isinstance(ret, str) or ret is None:
+            ret_units = target_of(ret)
+        else:
+            ret_units = tuple(target_of(spec) for spec in ret)
+        
+        @wraps(func)
+        def wrapper(*call_args, **kwargs):
+            if not _unit_checks:
+                return func(*call_args, **kwargs)
+            call_args = list(call_args)
+            count = len(call_args)
+            for index, name, convert in positional:
+                if index is not None and index < count:
+                    call_args[index] = convert(call_args[index])
+                elif name in kwargs:
+                    kwargs[name] = convert(kwargs[name])
+            result = func(*call_args, **kwargs)
+            if ret_units is None:
+                return result
+            if isinstance(ret_units, tuple):
+                return tuple(value if units is None else _fast_quantity(value, units)
+                             for value, units in zip(result, ret_units))
+            return _fast_quantity(result, ret_units)
+        
+        wrapper.__unit_targets__ = targets
+        wrapper.__unit_return__ = ret_units
+        return wrapper
+    
+    return decorate
 
 
 def quick_convert(
@@ -616,7 +2964,7 @@ def quick_convert(
         to_system = UnitSystem.get_preset(to_system)
     
     if isinstance(value, str):
-        value = ureg(value)
+        value = parse_quantity(value)
     
     si_value = from_system.to_unit(value)
     return to_system.to_unit(si_value)
@@ -641,6 +2989,694 @@ def get_unit_info(quantity: pint.Quantity) -> Dict[str, Any]:
     }
 
 
+_unit_factors_cache: Tuple[str, Any] = ('', None)
+
+
+def _registry_unit_factors() -> Tuple[Dict[str, Tuple[tuple, float, Optional[float]]], Dict[str, str]]:
+    """
+    Internal function: the linear SI conversion of every registry unit.
+    
+    The scan is shared by the conversion table, the catalogue and the
+    search index, and redone only when registry_version() changes; callers
+    must not modify the returned dictionaries.
+    
+    Returns:
+        ({unit name: (dimension vector, SI factor, SI offset or None)} sorted
+        by name, {name, symbol or alias: unit name}) for units whose
+        dimensions are made of the seven base dimensions
+    """
+    global _unit_factors_cache
+    version = registry_version()
+    if _unit_factors_cache[0] == version:
+        return _unit_factors_cache[1]
+    canonical = {}
+    definitions = {definition.name: definition for definition in ureg._units.values()
+                   if hasattr(definition, 'raw')}  # skip prefixed units Pint cached at runtime
+    for _, definition in sorted(definitions.items()):
+        converter = definition.converter
+        if not definition.is_multiplicative and not hasattr(converter, 'offset'):
+            continue  # logarithmic units have no linear factor
+        try:
+            factor, root = ureg.get_base_units(definition.name)
+            vector = get_dimension_vector(root)
+        except (pint.errors.PintError, ValueError):
+            continue
+        offset = None
+        if not definition.is_multiplicative:
+            offset = ureg.Quantity(0, definition.name).to_base_units().magnitude
+        canonical[definition.name] = (vector, factor, offset)
+    aliases = {alias: definition.name for alias, definition in ureg._units.items()
+               if definition.name in canonical}
+    _unit_factors_cache = (version, (canonical, aliases))
+    return canonical, aliases
+
+
+def build_conversion_table() -> Dict[str, Any]:
+    """
+    Build a compact, versioned conversion table from the live registry.
+    
+    Every unit name, symbol and alias whose dimensions are made of the seven
+    base dimensions is listed with its SI factor, so a client can convert
+    between compatible units without calling back into Pint.
+    
+    Returns:
+        Dictionary with keys:
+            'version': hash of the table content
+            'dimensions': BASE_DIMENSIONS
+            'dims': list of dimension vectors
+            'units': {name: [dims_index, factor]} or [dims_index, factor, offset]
+                     for offset units, where SI = value * factor + offset
+            'prefixes': {prefix: factor}
+            'presets': {name: {'units': mapping, 'scale': scale vector}}
+    """
+    dims_index = {}
+    dims = []
+    canonical = {}
+    factors, aliases = _registry_unit_factors()
+    for name, (vector, factor, offset) in factors.items():
+        if vector not in dims_index:
+            dims_index[vector] = len(dims)
+            dims.append(list(vector))
+        entry = [dims_index[vector], factor]
+        if offset is not None:
+            entry.append(offset)
+        canonical[name] = entry
+    
+    units = {}
+    for alias, name in aliases.items():
+        units[alias] = canonical[name]
+    
+    prefixes = {name: definition.converter.scale
+                for name, definition in ureg._prefixes.items() if name}
+    
+    presets = {}
+    for name, mapping in UnitSystem.PRESETS.items():
+        scale = uniUnit(mapping).get_scale_vector()
+        presets[name] = {'units': mapping, 'scale': [scale[dim] for dim in BASE_DIMENSIONS]}
+    
+    table = {
+        'dimensions': list(BASE_DIMENSIONS),
+        'dims': dims,
+        'units': dict(sorted(units.items())),
+        'prefixes': dict(sorted(prefixes.items())),
+        'presets': presets,
+    }
+    content = json.dumps(table, sort_keys=True, ensure_ascii=False)
+    table['version'] = hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+    return table
+
+
+def _dimension_vector_of(dimension: Union[str, tuple, list]) -> tuple:
+    """Internal helper: dimension vector of '[length]/[time]'-style text or of a vector."""
+    if isinstance(dimension, (tuple, list)):
+        return tuple(dimension)
+    dims = ureg.get_dimensionality(dimension)
+    extra = set(dims) - set(BASE_DIMENSIONS)
+    if extra:
+        raise ValueError(f"Unknown dimensions: {', '.join(sorted(extra))}")
+    return tuple(dims.get(dim, 0) for dim in BASE_DIMENSIONS)
+
+
+def _format_dimension(vector: tuple) -> str:
+    """Internal helper: dimensionality text of a dimension vector, e.g. '[length] / [time]'."""
+    dims = {dim: exp for dim, exp in zip(BASE_DIMENSIONS, vector) if exp}
+    if not dims:
+        return 'dimensionless'
+    return str(pint.util.UnitsContainer(dims))
+
+
+class UnitCatalogue:
+    """
+    Every unit name, symbol and alias of the registry, common prefixed units
+    (km, kN, MPa, ...) and CHINESE_UNITS keys, grouped by dimension.
+    
+    Built in one pass over the registry with SI factors (and offsets, for
+    degC-like units) precomputed, so listing the units of a dimension is a
+    dictionary lookup. `version` is the registry_version() it was built
+    from; get_unit_catalogue() rebuilds it when units are defined.
+    
+    Example:
+        >>> catalogue = UnitCatalogue()
+        >>> {e['name']: e['factor'] for e in catalogue.units('[mass]')}['斤']
+        0.5
+        >>> len(catalogue.units(like='km/h')) > 10
+        True
+    """
+    
+    def __init__(self):
+        self.version = registry_version()
+        factors, aliases = _registry_unit_factors()
+        groups = {}
+        for alias, name in aliases.items():
+            vector, factor, offset = factors[name]
+            groups.setdefault(vector, []).append(self._entry(alias, CHINESE_UNITS.get(name, name), factor, offset))
+        # Prefixed units are not registry definitions: add the common ones
+        # (readable candidates, base unit shorthands, preset targets) and
+        # their symbols, then the Chinese names
+        extra = {}
+        for expr, prefixes in READABLE_UNITS['metric']:
+            if ' ' not in expr:
+                for prefix in prefixes:
+                    name = prefix + expr
+                    try:
+                        extra[ureg.get_symbol(name)] = name
+                    except pint.errors.UndefinedUnitError:
+                        continue  # not in a slim registry
+                    extra[name] = name
+        names = set(SHORT_TO_DIMENSION)
+        for mapping in UnitSystem.PRESETS.values():
+            names.update(mapping.values())
+        for name in names:
+            extra.setdefault(name, ureg.get_name(name))
+        extra.update(CHINESE_UNITS)
+        for name, unit in sorted(extra.items()):
+            if name in aliases or name.startswith('['):
+                continue
+            try:
+                factor, root = ureg.get_base_units(unit)
+                vector = get_dimension_vector(root)
+            except (pint.errors.PintError, ValueError):
+                continue
+            groups.setdefault(vector, []).append(self._entry(name, unit, factor, None))
+        self._groups = {}
+        for vector, entries in groups.items():
+            entries.sort(key=lambda entry: (entry['factor'], entry['name']))
+            self._groups[vector] = entries
+    
+    @staticmethod
+    def _entry(name: str, unit: str, factor: float, offset: Optional[float]) -> Dict[str, Any]:
+        entry = {'name': name, 'unit': unit, 'factor': factor}
+        if offset is not None:
+            entry['offset'] = offset
+        return entry
+    
+    def dimensions(self) -> List[Dict[str, Any]]:
+        """
+        List the dimensions in the catalogue.
+        
+        Returns:
+            List of {'dimension': text, 'vector': exponents, 'count': number of units},
+            most units first
+        """
+        result = [{'dimension': _format_dimension(vector),
+                   'vector': [int(exp) if float(exp).is_integer() else exp for exp in vector],
+                   'count': len(entries)}
+                  for vector, entries in self._groups.items()]
+        result.sort(key=lambda item: (-item['count'], item['dimension']))
+        return result
+    
+    def units(
+        self,
+        dimension: Optional[Union[str, tuple]] = None,
+        like: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        List the units of a dimension, smallest first.
+        
+        Args:
+            dimension: Dimensionality such as '[length]' or '[mass]/[length]**3',
+                       or a dimension vector
+            like: A unit; list the units compatible with it instead
+            
+        Returns:
+            List of {'name', 'unit', 'factor'(, 'offset')}: SI = value * factor (+ offset)
+            
+        Raises:
+            ValueError: If neither `dimension` nor `like` is given, or the
+                        dimension is not made of the seven base dimensions
+        """
+        if like is not None:
+            vector = get_dimension_vector(like)
+        elif dimension is not None:
+            vector = _dimension_vector_of(dimension)
+        else:
+            raise ValueError("Give a dimension or a unit")
+        return [dict(entry) for entry in self._groups.get(vector, ())]
+
+
+_unit_catalogue: Optional[UnitCatalogue] = None
+
+
+def get_unit_catalogue() -> UnitCatalogue:
+    """
+    Return the shared UnitCatalogue, rebuilt when the registry has changed.
+    
+    Example:
+        >>> 'hour' in [e['name'] for e in get_unit_catalogue().units('[time]')]
+        True
+    """
+    global _unit_catalogue
+    if _unit_catalogue is None or _unit_catalogue.version != registry_version():
+        _unit_catalogue = UnitCatalogue()
+    return _unit_catalogue
+
+
+def _trigrams(text: str) -> set:
+    """Internal helper: the set of 3-character substrings of `text`."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class UnitIndex:
+    """
+    In-memory search index over the unit names of the registry.
+    
+    Indexes every unit name, symbol and alias, every prefixed combination
+    (prefix names with unit names, prefix symbols with unit symbols) and
+    every CHINESE_UNITS key. Names are kept in sorted arrays, partitioned
+    by dimension, so a prefix query is a binary search. Common units rank
+    first: those used by the presets, then the prefixed readable units
+    (READABLE_UNITS, in table order) and their symbols. Registry names
+    follow, then all other prefixed combinations. Queries that find too
+    few prefix matches fall back to trigram matching on unprefixed names.
+    Units come from the same registry scan as the conversion table and the
+    catalogue; `version` is the registry_version() it was built from.
+    
+    Example:
+        >>> index = UnitIndex()
+        >>> [r['name'] for r in index.search('kilom', limit=2)]
+        ['kilometer', 'kilomole']
+        >>> index.search('ki', dimension='[length]', limit=1)[0]['unit']
+        'kilometer'
+    """
+    
+    def __init__(self):
+        """Build the index of the module registry."""
+        registry = ureg
+        self.version = registry_version()
+        self._dims_ids = {}
+        self._dims_strs = []
+        
+        factors, aliases = _registry_unit_factors()
+        dims_by_name = {name: self._vector_id(vector) for name, (vector, _, _) in factors.items()}
+        
+        common = []
+        names = set(SHORT_TO_DIMENSION)
+        for mapping in UnitSystem.PRESETS.values():
+            names.update(mapping.values())
+        for name in sorted(names):
+            try:
+                common.append((name, registry.get_name(name), self._dims_id(name)))
+            except pint.errors.PintError:
+                continue
+        # Prefixed readable units rank after the preset units, in table order
+        self._rank = {}
+        for rank, (expr, prefixes) in enumerate(READABLE_UNITS['metric'], 1):
+            if ' ' in expr:
+                continue
+            for prefix in prefixes:
+                unit = prefix + expr
+                try:
+                    spellings = (unit, registry.get_symbol(unit))
+                    dims_id = self._dims_id(unit)
+                except pint.errors.PintError:
+                    continue  # not in a slim registry
+                for alias in spellings:
+                    if alias not in names and alias not in self._rank:
+                        self._rank[alias] = rank
+                        common.append((alias, unit, dims_id))
+        
+        base = []
+        for alias, name in aliases.items():
+            base.append((alias, CHINESE_UNITS.get(name, name), dims_by_name[name]))
+        for chinese, english in CHINESE_UNITS.items():
+            if chinese not in aliases:
+                base.append((chinese, english, self._dims_id(english)))
+        
+        # Only multiplicative units take prefixes; names with prefix names,
+        # symbols with prefix symbols
+        multiplicative = [(alias, name, alias != registry._units[name].symbol)
+                          for alias, name in aliases.items() if factors[name][2] is None]
+        prefixed = []
+        for prefix, prefix_def in registry._prefixes.items():
+            if not prefix:
+                continue
+            by_name = prefix == prefix_def.name
+            binary = prefix_def.name.endswith('bi')
+            for alias, name, is_name in multiplicative:
+                if by_name != is_name:
+                    continue
+                if binary and name not in ('bit', 'byte'):
+                    continue
+                prefixed.append((prefix + alias, prefix_def.name + name, dims_by_name[name]))
+        
+        self._partitions = {}
+        for tier in (common, base, prefixed):
+            groups = {None: tier}
+            for entry in tier:
+                groups.setdefault(entry[2], []).append(entry)
+            for dims_id, entries in groups.items():
+                entries = sorted(entries, key=lambda e: (e[0].lower(), e[0]))
+                keys = [e[0].lower() for e in entries]
+                self._partitions.setdefault(dims_id, []).append((keys, entries))
+        
+        self._fuzzy_entries = base
+        self._trigram_index = {}
+        for i, entry in enumerate(base):
+            for gram in _trigrams(entry[0].lower()):
+                self._trigram_index.setdefault(gram, []).append(i)
+        self.size = len(common) + len(base) + len(prefixed)
+    
+    def _vector_id(self, vector: tuple) -> int:
+        """Internal function: intern a dimension vector."""
+        if vector not in self._dims_ids:
+            self._dims_ids[vector] = len(self._dims_strs)
+            self._dims_strs.append(_format_dimension(vector))
+        return self._dims_ids[vector]
+    
+    def _dims_id(self, expr: str) -> int:
+        """Internal function: intern the dimensions of `expr`, -1 if unresolvable."""
+        try:
+            return self._vector_id(get_dimension_vector(expr))
+        except (pint.errors.PintError, ValueError, TypeError):
+            return -1
+    
+    def _result(self, entry: tuple) -> Dict[str, str]:
+        dims_id = entry[2]
+        return {
+            'name': entry[0],
+            'unit': entry[1],
+            'dimensionality': self._dims_strs[dims_id] if dims_id >= 0 else '',
+        }
+    
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        dimension: Optional[str] = None,
+        fuzzy: bool = True
+    ) -> List[Dict[str, str]]:
+        """
+        Find units whose name starts with `query`.
+        
+        Matching is case-insensitive; within a tier, names matching the case
+        of `query` rank first.
+        
+        Args:
+            query: Text typed so far
+            limit: Maximum number of results
+            dimension: Optional filter, a unit ('m/s') or dimension ('[length]/[time]')
+            fuzzy: Fill up with trigram matches when prefix matches run short
+            
+        Returns:
+            List of {'name', 'unit', 'dimensionality'} dictionaries,
+            unprefixed names before prefixed combinations
+        """
+        exact = query.strip()
+        query = exact.lower()
+        dims_id = None
+        if dimension:
+            try:
+                vector = _dimension_vector_of(dimension)
+            except (pint.errors.PintError, ValueError):
+                return []
+            if vector not in self._dims_ids:
+                return []
+            dims_id = self._dims_ids[vector]
+        
+        matches = []
+        seen = set()
+        cap = max(4 * limit, 32)
+        rank = self._rank
+        for tier, (keys, entries) in enumerate(self._partitions.get(dims_id, [])):
+            found = 0
+            limit_found = len(keys) if tier == 0 else cap  # common units are few: rank them all
+            i = bisect_left(keys, query)
+            while i < len(keys) and found < limit_found and keys[i].startswith(query):
+                entry = entries[i]
+                i += 1
+                if entry[0] not in seen:
+                    seen.add(entry[0])
+                    order = rank.get(entry[0], 0) if tier == 0 else 0
+                    matches.append((tier, not entry[0].startswith(exact), order, len(entry[0]), entry))
+                    found += 1
+        matches.sort(key=lambda m: m[:4])
+        results = [self._result(m[4]) for m in matches[:limit]]
+        
+        if fuzzy and len(results) < limit and len(query) >= 3:
+            grams = _trigrams(query)
+            scores = {}
+            for gram in grams:
+                for i in self._trigram_index.get(gram, ()):
+                    scores[i] = scores.get(i, 0) + 1
+            threshold = max(1, len(grams) // 2)
+            candidates = [i for i, score in scores.items() if score >= threshold]
+            candidates.sort(key=lambda i: (-scores[i], len(self._fuzzy_entries[i][0])))
+            for i in candidates:
+                if len(results) >= limit:
+                    break
+                entry = self._fuzzy_entries[i]
+                if entry[0] in seen or (dims_id is not None and entry[2] != dims_id):
+                    continue
+                seen.add(entry[0])
+                results.append(self._result(entry))
+        return results
+
+
+_unit_index: Optional[UnitIndex] = None
+
+
+def get_unit_index() -> UnitIndex:
+    """
+    Return the shared UnitIndex of the module registry.
+    
+    Built on first use and rebuilt when registry_version() changes, i.e.
+    after new units are defined.
+    """
+    global _unit_index
+    if _unit_index is None or _unit_index.version != registry_version():
+        _unit_index = UnitIndex()
+    return _unit_index
+
+
+_SMALL_PREFIXES = ('pico', 'nano', 'micro', 'milli', '')
+_ENGINEERING_PREFIXES = _SMALL_PREFIXES + ('kilo', 'mega', 'giga', 'tera')
+
+# Candidate units for readable output: (unit expression, prefixes applied to
+# its first unit name). Per dimension, earlier entries win ties in scale.
+READABLE_UNITS: Dict[str, Tuple[Tuple[str, Tuple[str, ...]], ...]] = {
+    'metric': (
+        ('meter', _SMALL_PREFIXES + ('kilo',)),
+        ('gram', _SMALL_PREFIXES + ('kilo',)),
+        ('tonne', ('',)),
+        ('second', _SMALL_PREFIXES),
+        ('minute', ('',)),
+        ('hour', ('',)),
+        ('day', ('',)),
+        ('year', ('',)),
+        ('ampere', _ENGINEERING_PREFIXES),
+        ('kelvin', _SMALL_PREFIXES),
+        ('mole', _ENGINEERING_PREFIXES),
+        ('candela', ('',)),
+        ('newton', _ENGINEERING_PREFIXES),
+        ('pascal', _ENGINEERING_PREFIXES),
+        ('joule', _ENGINEERING_PREFIXES),
+        ('watt', _ENGINEERING_PREFIXES),
+        ('hertz', _ENGINEERING_PREFIXES),
+        ('coulomb', _ENGINEERING_PREFIXES),
+        ('volt', _ENGINEERING_PREFIXES),
+        ('ohm', _ENGINEERING_PREFIXES),
+        ('siemens', _ENGINEERING_PREFIXES),
+        ('farad', _ENGINEERING_PREFIXES),
+        ('henry', _ENGINEERING_PREFIXES),
+        ('weber', _ENGINEERING_PREFIXES),
+        ('tesla', _ENGINEERING_PREFIXES),
+        ('meter ** 2', ('milli', '', 'kilo')),
+        ('liter', ('micro', 'milli', '')),
+        ('meter ** 3', ('',)),
+        ('meter / second', ('milli', '', 'kilo')),
+        ('meter / second ** 2', ('milli', '')),
+        ('gram / meter ** 3', ('', 'kilo')),
+    ),
+    'imperial': (
+        ('inch', ('',)),
+        ('foot', ('',)),
+        ('yard', ('',)),
+        ('mile', ('',)),
+        ('ounce', ('',)),
+        ('pound', ('',)),
+        ('short_ton', ('',)),
+        ('force_pound', ('',)),
+        ('kip', ('',)),
+        ('psi', ('',)),
+        ('ksi', ('',)),
+        ('BTU', ('',)),
+        ('horsepower', ('',)),
+        ('fluid_ounce', ('',)),
+        ('gallon', ('',)),
+        ('foot / second', ('',)),
+        ('mile / hour', ('',)),
+    ),
+}
+
+
+@lru_cache(maxsize=4096)
+def _base_factor(units: pint.Unit) -> float:
+    """Internal cached function: SI magnitude of one `units`."""
+    return ureg.get_base_units(units)[0]
+
+
+class BestUnitIndex:
+    """
+    Index of readable candidate units, for picking the best unit for a value.
+    
+    Candidates (READABLE_UNITS) are grouped by dimension vector and sorted
+    by log10 of their SI scale, so choosing the unit for a value is one
+    binary search: the largest candidate not bigger than the value, giving
+    a magnitude of at least 1 (below the smallest candidate, the smallest).
+    Families other than 'metric' fall back to the metric candidates for
+    dimensions they do not cover.
+    
+    Example:
+        >>> index = BestUnitIndex()
+        >>> index.select(1.2e-7, (0, 1, 0, 0, 0, 0, 0))
+        (120.0, <Unit('nanometer')>)
+    """
+    
+    def __init__(self, families: Optional[Dict[str, Any]] = None):
+        """
+        Build the index.
+        
+        Args:
+            families: Candidate tables like READABLE_UNITS (the default)
+        """
+        families = READABLE_UNITS if families is None else families
+        metric = self._build(families.get('metric', ()))
+        self._families = {'metric': metric}
+        for family, entries in families.items():
+            if family != 'metric':
+                self._families[family] = {**metric, **self._build(entries)}
+    
+    @staticmethod
+    def _build(entries) -> Dict[tuple, Tuple[List[float], List[Tuple[float, pint.Unit]]]]:
+        """Internal function: sorted (log10 scales, (scale, Unit)) per dimension vector."""
+        groups = {}
+        for expr, prefixes in entries:
+            for prefix in prefixes:
+                try:
+                    units = ureg.parse_units(prefix + expr)
+                    vector = get_dimension_vector(units)
+                except (pint.errors.PintError, ValueError):
+                    continue
+                scale = _base_factor(units)
+                candidates = groups.setdefault(vector, {})
+                # Key on rounded log10 so that equal scales (mL, cm³) keep the first entry
+                candidates.setdefault(round(math.log10(scale), 9), (scale, units))
+        index = {}
+        for vector, candidates in groups.items():
+            logs = sorted(candidates)
+            index[vector] = (logs, [candidates[log] for log in logs])
+        return index
+    
+    def candidates(self, vector: tuple, family: str = 'metric') -> List[Tuple[float, pint.Unit]]:
+        """List the (SI scale, Unit) candidates for a dimension vector, smallest first."""
+        entry = self._families[family].get(vector)
+        return list(entry[1]) if entry else []
+    
+    def select(self, si_value: float, vector: tuple, family: str = 'metric') -> Optional[Tuple[float, pint.Unit]]:
+        """
+        Pick the readable unit for a value given in SI base units.
+        
+        Args:
+            si_value: Magnitude in SI base units
+            vector: Dimension vector of the value
+            family: 'metric' or 'imperial'
+            
+        Returns:
+            (magnitude, Unit), or None if there are no candidates
+        """
+        entry = self._families[family].get(vector)
+        if entry is None:
+            return None
+        logs, candidates = entry
+        size = abs(si_value)
+        if size == 0 or not math.isfinite(size):
+            position = min(bisect_left(logs, 0.0), len(logs) - 1)
+        else:
+            position = max(bisect_left(logs, math.log10(size) + 1e-9) - 1, 0)
+        scale, units = candidates[position]
+        return si_value / scale, units
+
+
+@lru_cache(maxsize=1)
+def get_best_unit_index() -> BestUnitIndex:
+    """Return the shared BestUnitIndex, built on first use."""
+    return BestUnitIndex()
+
+
+@lru_cache(maxsize=4096)
+def _readable_profile(units: pint.Unit) -> Optional[Tuple[tuple, float]]:
+    """Internal cached function: (dimension vector, SI factor) of `units`, None for offset units."""
+    if _is_offset_unit(units):
+        return None
+    return get_dimension_vector(units), _base_factor(units)
+
+
+@lru_cache(maxsize=256)
+def _scale_family(scales: tuple) -> str:
+    """Internal cached function: 'imperial' if a mass or length scale is not a power of ten."""
+    for scale in scales:
+        exponent = math.log10(scale)
+        if abs(exponent - round(exponent)) > 1e-9:
+            return 'imperial'
+    return 'metric'
+
+
+def best_unit(
+    value: Union[pint.Quantity, float],
+    system: Optional[Union[str, UnitSystem, "uniUnit"]] = None,
+    dimension: Optional[str] = None
+) -> Union[pint.Quantity, float]:
+    """
+    Express a value in its most readable unit and prefix.
+    
+    The unit is chosen from an index built once per process (see
+    BestUnitIndex), so this is cheap enough to call for every row of a
+    batch. Metric candidates are used, or imperial ones when `system` is
+    based on non-metric mass or length units (Imperial, FPS, ...).
+    Absolute temperatures (degC, degF) are returned unchanged.
+    
+    Args:
+        value: Quantity, or a magnitude in SI base units with `dimension`
+        system: Preset name, UnitSystem or uniUnit choosing the unit family
+        dimension: Dimensionality of a bare magnitude, e.g. '[length]'
+        
+    Returns:
+        Quantity in the readable unit; the value itself if no candidate fits
+        
+    Example:
+        >>> best_unit(1.2e-7 * ureg.m)
+        120.0 <Unit('nanometer')>
+        >>> best_unit(5400, dimension='[time]')
+        1.5 <Unit('hour')>
+        >>> best_unit(3000 * ureg.N, system='FPS')
+        674.4 <Unit('force_pound')>
+    """
+    if isinstance(value, pint.Quantity):
+        profile = _readable_profile(value.units)
+        if profile is None:
+            return value
+        vector, factor = profile
+        si_value = value.magnitude * factor
+    else:
+        if dimension is None:
+            raise ValueError("Give a Quantity, or a magnitude with its dimension")
+        dims = ureg.get_dimensionality(dimension)
+        vector = tuple(dims.get(dim, 0) for dim in BASE_DIMENSIONS)
+        si_value = value
+    
+    family = 'metric'
+    if system is not None:
+        if isinstance(system, str):
+            system = UnitSystem.get_preset(system)
+        scales = system.get_scale_vector()
+        family = _scale_family((scales['[mass]'], scales['[length]']))
+    
+    selected = get_best_unit_index().select(si_value, vector, family)
+    if selected is None:
+        return value
+    return ureg.Quantity(*selected)
+
+
 def to_unit(uin: Union[pint.Quantity, float, int], 
             units: Dict[str, str]) -> Union[pint.Quantity, List]:
     """
@@ -694,3 +3730,9 @@ UnitSystem.register_preset("FPS", {
 UnitSystem.register_preset("British", {
     'kilogram': 'pound', 'meter': 'inch', 'second': 'minute'
 }, "British units (pound-inch-minute)")
+
+if os.environ.get('UNIUNIT_PLAN_CACHE'):
+    try:
+        set_plan_store(os.environ['UNIUNIT_PLAN_CACHE'])
+    except sqlite3.Error as error:
+        logger.warning("Plan cache %s disabled: %s", os.environ['UNIUNIT_PLAN_CACHE'], error)